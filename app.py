@@ -1,16 +1,50 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, abort, g, Response
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
-import json
-from datetime import datetime
-from models.disease_predictor import DiseasePredictor
-from models.diagnostic_report import DiagnosticReport
+import atexit
+import hmac
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+from models.disease_predictor import DiseasePredictor, DISEASE_TYPES, SCHEMAS
+from models.diagnostic_report import DEFAULT_DEAD_LETTER_PATH, DiagnosticReport, RISK_LEVELS
+from models.report_export import EXPORT_FORMATS
+from models.batch_dispatcher import MicroBatchDispatcher
+from models.report_writer import DeadLetterFile, ReportIdAllocator, WriteBehindWriter
+from models.metrics import REGISTRY, REQUEST_SECONDS, STAGE_SECONDS, disease_label, process_memory
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'diagnosai-secret-key-2024'
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///../database/diagnosai.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['MODELS_DIR'] = os.environ.get('DIAGNOSAI_MODELS_DIR', 'saved_models')
+# Upper bounds on resident models per worker; unset means unlimited
+app.config['MODEL_CACHE_MAX_MODELS'] = os.environ.get('DIAGNOSAI_MODEL_CACHE_MAX_MODELS')
+app.config['MODEL_CACHE_MAX_BYTES'] = os.environ.get('DIAGNOSAI_MODEL_CACHE_MAX_BYTES')
+# 'compiled' evaluates array-backed tree tables instead of calling scikit-learn/XGBoost
+app.config['INFERENCE_BACKEND'] = os.environ.get('DIAGNOSAI_INFERENCE_BACKEND', 'sklearn')
+# Memoize identical single predictions; a size of 0 disables the cache
+app.config['RESULT_CACHE_SIZE'] = int(os.environ.get('DIAGNOSAI_RESULT_CACHE_SIZE', 4096))
+app.config['RESULT_CACHE_TTL'] = float(os.environ.get('DIAGNOSAI_RESULT_CACHE_TTL', 300))
+# Write reports from a background thread instead of committing inside /predict
+app.config['REPORT_WRITE_BEHIND'] = os.environ.get('DIAGNOSAI_REPORT_WRITE_BEHIND', '0') == '1'
+app.config['REPORT_QUEUE_SIZE'] = int(os.environ.get('DIAGNOSAI_REPORT_QUEUE_SIZE', 1000))
+app.config['REPORT_BATCH_SIZE'] = int(os.environ.get('DIAGNOSAI_REPORT_BATCH_SIZE', 100))
+# 'sync' writes in the request thread when the queue is full, 'block' waits for space
+app.config['REPORT_QUEUE_FULL_POLICY'] = os.environ.get('DIAGNOSAI_REPORT_QUEUE_FULL_POLICY', 'sync')
+app.config['DASHBOARD_PAGE_SIZE'] = int(os.environ.get('DIAGNOSAI_DASHBOARD_PAGE_SIZE', 20))
+app.config['HISTORY_MAX_PAGE_SIZE'] = int(os.environ.get('DIAGNOSAI_HISTORY_MAX_PAGE_SIZE', 100))
+app.config['MAX_BATCH_ROWS'] = int(os.environ.get('DIAGNOSAI_MAX_BATCH_ROWS', 50000))
+# Coalesce concurrent /api/predict calls into micro-batches
+app.config['MICRO_BATCHING'] = os.environ.get('DIAGNOSAI_MICRO_BATCHING', '0') == '1'
+app.config['MICRO_BATCH_MAX_SIZE'] = int(os.environ.get('DIAGNOSAI_MICRO_BATCH_MAX_SIZE', 32))
+app.config['MICRO_BATCH_MAX_WAIT_MS'] = float(os.environ.get('DIAGNOSAI_MICRO_BATCH_MAX_WAIT_MS', 2.0))
+# Let /api/predict callers ask for per-feature contributions with "explain": true
+app.config['EXPLANATIONS'] = os.environ.get('DIAGNOSAI_EXPLANATIONS', '0') == '1'
+# Bearer token for the /admin endpoints, /metrics and the stats APIs; they are disabled while it is unset
+app.config['ADMIN_TOKEN'] = os.environ.get('DIAGNOSAI_ADMIN_TOKEN')
 
 db = SQLAlchemy(app)
 
@@ -21,59 +55,129 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(120), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    reports = db.relationship('DiagnosisReport', backref='user', lazy=True)
 
-class DiagnosisReport(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    disease_type = db.Column(db.String(100), nullable=False)
-    symptoms = db.Column(db.Text, nullable=False)
-    prediction_result = db.Column(db.String(200), nullable=False)
-    confidence = db.Column(db.Float, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+# Diagnostic reports live in models.diagnostic_report (diagnostic_reports table
+# in database/diagnosai.db); run `python -m models.migrate_reports` once to
+# merge reports written by older versions
+
+# Initialize disease predictor (models are loaded lazily on first use)
+def _optional_int(value):
+    return int(value) if value else None
+
+predictor = DiseasePredictor(
+    models_dir=app.config['MODELS_DIR'],
+    max_models=_optional_int(app.config['MODEL_CACHE_MAX_MODELS']),
+    max_bytes=_optional_int(app.config['MODEL_CACHE_MAX_BYTES']),
+    backend=app.config['INFERENCE_BACKEND'],
+    result_cache_size=app.config['RESULT_CACHE_SIZE'],
+    result_cache_ttl=app.config['RESULT_CACHE_TTL']
+)
+
+dispatcher = None
+if app.config['MICRO_BATCHING']:
+    dispatcher = MicroBatchDispatcher(
+        predictor,
+        max_batch_size=app.config['MICRO_BATCH_MAX_SIZE'],
+        max_wait_ms=app.config['MICRO_BATCH_MAX_WAIT_MS']
+    )
+
+report_writer = None
+report_ids = None
+if app.config['REPORT_WRITE_BEHIND']:
+    report_writer = WriteBehindWriter(
+        DiagnosticReport.save_many,
+        max_queue=app.config['REPORT_QUEUE_SIZE'],
+        max_batch=app.config['REPORT_BATCH_SIZE'],
+        full_policy=app.config['REPORT_QUEUE_FULL_POLICY'],
+        # Reports that can't be committed are kept here; replay them with python -m models.replay_reports
+        dead_letter=DeadLetterFile(DEFAULT_DEAD_LETTER_PATH, DiagnosticReport.to_record)
+    )
+    # Write out everything still queued when the process exits
+    atexit.register(report_writer.close)
+
+def _allocate_report_id():
+    global report_ids
+    if report_ids is None:
+        report_ids = ReportIdAllocator(DiagnosticReport.storage.db_path, 'diagnostic_reports')
+    return report_ids.next_id()
+
+# Cache and queue statistics are sampled only when /metrics is scraped
+REGISTRY.register_collector(
+    'diagnosai_model_cache_events_total', 'Model cache lookups and loads', ['event'],
+    lambda: {(event,): predictor.cache_stats()[event] for event in ('hits', 'misses', 'loads', 'evictions')},
+    type='counter'
+)
+REGISTRY.register_collector(
+    'diagnosai_model_cache_resident_bytes', 'Approximate size of the models held in memory', [],
+    lambda: {(): predictor.cache_stats()['resident_bytes']}
+)
+REGISTRY.register_collector(
+    'diagnosai_result_cache_events_total', 'Prediction result cache activity', ['event'],
+    lambda: {(event,): value for event, value in predictor.result_cache_stats().items()
+             if event in ('hits', 'misses', 'evictions', 'expirations', 'invalidations')},
+    type='counter'
+)
+REGISTRY.register_collector(
+    'diagnosai_explanation_cache_events_total', 'Explanation cache activity', ['event'],
+    lambda: {(event,): value for event, value in predictor.explanation_cache_stats().items()
+             if event in ('hits', 'misses', 'evictions', 'expirations', 'invalidations')},
+    type='counter'
+)
+REGISTRY.register_collector(
+    'diagnosai_model_version', 'Version of the model each disease is served by, counting reloads',
+    ['disease', 'content_hash'],
+    lambda: {(disease, status['content_hash'] or ''): status['version']
+             for disease, status in predictor.model_status().items() if status['loaded']}
+)
+REGISTRY.register_collector(
+    'diagnosai_report_db_connections', 'Report database connections held by threads or idle in the pool', ['state'],
+    lambda: {(state,): DiagnosticReport.storage.stats()[state] for state in ('in_use', 'idle')}
+)
+# Per worker; summing pss across workers gives their real combined footprint
+REGISTRY.register_collector(
+    'diagnosai_process_memory_bytes', 'Memory of this worker process from /proc smaps_rollup', ['kind'],
+    lambda: {(kind,): value for kind, value in (process_memory() or {}).items()}
+)
+if dispatcher is not None:
+    REGISTRY.register_collector(
+        'diagnosai_dispatcher_queue_depth', 'Predictions waiting for a micro-batch', ['disease'],
+        lambda: {(disease,): depth for disease, depth in dispatcher.stats()['queue_depth'].items()}
+    )
+if report_writer is not None:
+    REGISTRY.register_collector(
+        'diagnosai_report_queue_depth', 'Reports waiting to be written', [],
+        lambda: {(): report_writer.stats()['queue_depth']}
+    )
+
+def _reload_changed_models(signum, frame):
+    # Load in the background so the signal returns at once and requests keep being served
+    threading.Thread(target=predictor.reload_changed, name='model-reload', daemon=True).start()
+
+# `kill -HUP <pid>` reloads every model whose saved artifact changed
+if hasattr(signal, 'SIGHUP') and threading.current_thread() is threading.main_thread():
+    signal.signal(signal.SIGHUP, _reload_changed_models)
 
-# Initialize disease predictor
-predictor = DiseasePredictor()
-
-# Available diseases and their symptoms
-DISEASES = {
-    'diabetes': [
-        'age', 'blood_pressure', 'glucose', 'bmi', 'pregnancies',
-        'skin_thickness', 'insulin', 'diabetes_pedigree'
-    ],
-    'covid': [
-        'fever', 'cough', 'fatigue', 'breathing_difficulty', 
-        'chest_pain', 'sore_throat', 'loss_of_taste'
-    ],
-    'pneumonia': [
-        'fever', 'cough', 'chest_pain', 'breathing_difficulty', 
-        'fatigue', 'sweating', 'chills'
-    ],
-    'kidney_disease': [
-        'age', 'blood_pressure', 'albumin', 'sugar', 
-        'red_blood_cells', 'pus_cells', 'blood_glucose'
-    ],
-    'breast_cancer': [
-        'radius_mean', 'texture_mean', 'perimeter_mean', 
-        'area_mean', 'smoothness_mean', 'compactness_mean'
-    ],
-    'alzheimer': [
-        'age', 'memory_loss', 'cognitive_decline', 
-        'behavior_changes', 'mri_findings', 'genetic_risk'
-    ],
-    'brain_tumor': [
-        'headaches', 'seizures', 'vision_problems', 
-        'nausea', 'mri_abnormalities', 'speech_difficulty'
-    ],
-    'hepatitis_c': [
-        'fatigue', 'jaundice', 'abdominal_pain', 
-        'nausea', 'liver_enzymes', 'bilirubin'
-    ]
-}
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _observe_request(response):
+    start = g.get('request_start')
+    if start is not None:
+        # Route templates, not raw paths, keep the label set bounded
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - start, route, str(response.status_code))
+    return response
+
+@app.teardown_appcontext
+def _release_report_connection(exception):
+    # The threaded server starts a thread per request, so give its connection back to the pool
+    DiagnosticReport.storage.release()
 
 @app.route('/')
 def index():
-    return render_template('index.html', diseases=DISEASES.keys())
+    return render_template('index.html', diseases=SCHEMAS.keys())
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -132,17 +236,25 @@ def logout():
 
 @app.route('/dashboard')
 def dashboard():
-    # Make sure DiagnosticReport is imported
-    from models.diagnostic_report import DiagnosticReport
-    
-    user_reports = DiagnosticReport.get_all()
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
     
-    # Calculate high risk reports
-    high_risk_reports = [report for report in user_reports if hasattr(report, 'risk_level') and report.risk_level == 'High']
+    user_id = session['user_id']
+    cursor = request.args.get('cursor')
+    try:
+        user_reports, next_cursor = DiagnosticReport.get_page(app.config['DASHBOARD_PAGE_SIZE'], cursor, user_id=user_id)
+    except ValueError:
+        return redirect(url_for('dashboard'))
     
+    # Totals come from the per-day aggregates, so they cost the same however many reports exist
+    summary = DiagnosticReport.summary(user_id=user_id)
     return render_template('dashboard.html', 
                          reports=user_reports, 
-                         high_risk_reports=high_risk_reports)
+                         total_reports=summary['total'],
+                         high_risk_count=summary['by_risk_level'].get('High', 0),
+                         summary=summary,
+                         next_cursor=next_cursor,
+                         is_first_page=not cursor)
 @app.route('/predict', methods=['GET', 'POST'])
 def predict():
     if 'user_id' not in session:
@@ -150,43 +262,67 @@ def predict():
         return redirect(url_for('login'))
     
     if request.method == 'POST':
-        disease_type = request.form['disease_type']
-        symptoms = {}
+        start = time.perf_counter()
+        disease_type = request.form.get('disease_type')
+        schema = SCHEMAS.get(disease_type)
+        if schema is None:
+            flash('Please choose a disease to predict')
+            return redirect(url_for('predict'))
+        label = disease_label(disease_type, SCHEMAS)
         
-        # Collect symptoms based on disease type
-        for symptom in DISEASES[disease_type]:
-            value = request.form.get(symptom, '0')
-            try:
-                symptoms[symptom] = float(value)
-            except ValueError:
-                symptoms[symptom] = 0.0
+        # Validate the form straight into the model's feature row
+        features, errors = schema.parse(request.form, required=True)
+        STAGE_SECONDS.observe(time.perf_counter() - start, label, 'parse')
+        if errors:
+            return render_template('predict.html',
+                                 disease_type=disease_type,
+                                 diseases=SCHEMAS.keys(),
+                                 schema=schema,
+                                 values=request.form,
+                                 errors={error['field']: error['message'] for error in errors}), 400
+        symptoms = schema.to_dict(features)
         
-        # Get prediction
-        result = predictor.predict(disease_type, symptoms)
+        # Get prediction (scaling and model stages are timed by the predictor)
+        result = predictor.predict_row(disease_type, features)
         
         # Save report to database
-        report = DiagnosisReport(
-            user_id=session['user_id'],
+        report = DiagnosticReport(
             disease_type=disease_type,
-            symptoms=json.dumps(symptoms),
+            symptoms=symptoms,
             prediction_result=result['prediction'],
-            confidence=result['confidence']
+            confidence=result['confidence'],
+            risk_level=result['risk_level'],
+            user_id=session['user_id']
         )
         
-        db.session.add(report)
-        db.session.commit()
+        start = time.perf_counter()
+        if report_writer is not None:
+            # The id is reserved up front so the results page can link to the report
+            report.id = _allocate_report_id()
+            report_writer.submit(report)
+        else:
+            report.save()
+        report_id = report.id
+        now = time.perf_counter()
+        STAGE_SECONDS.observe(now - start, label, 'persist')
         
-        return render_template('results.html', 
+        page = render_template('results.html', 
                              result=result, 
                              disease_type=disease_type,
                              symptoms=symptoms,
-                             report_id=report.id)
+                             report_id=report_id)
+        STAGE_SECONDS.observe(time.perf_counter() - now, label, 'render')
+        return page
     
     disease_type = request.args.get('disease', 'diabetes')
+    if disease_type not in SCHEMAS:
+        disease_type = 'diabetes'
     return render_template('predict.html', 
                          disease_type=disease_type, 
-                         diseases=DISEASES.keys(),
-                         symptoms=DISEASES.get(disease_type, []))
+                         diseases=SCHEMAS.keys(),
+                         schema=SCHEMAS[disease_type],
+                         values={},
+                         errors={})
 
 @app.route('/api/predict', methods=['POST'])
 def api_predict():
@@ -194,15 +330,61 @@ def api_predict():
         data = request.get_json()
         disease_type = data.get('disease_type')
         symptoms = data.get('symptoms', {})
+        schema = SCHEMAS.get(disease_type)
+        if schema is None:
+            return jsonify({'success': False, 'error': f"Unknown disease type {disease_type}"}), 400
+        if not isinstance(symptoms, dict):
+            return jsonify({'success': False, 'error': 'symptoms must be an object'}), 400
+        explain = bool(data.get('explain'))
+        if explain and not app.config['EXPLANATIONS']:
+            return jsonify({'success': False, 'error': 'Explanations are disabled on this server'}), 400
         
-        result = predictor.predict(disease_type, symptoms)
+        # Missing symptoms count as 0; anything present must be a number in range
+        features, errors = schema.parse(symptoms)
+        if errors:
+            return jsonify({'success': False, 'error': 'Invalid symptoms', 'errors': errors}), 400
         
-        return jsonify({
+        if dispatcher is not None:
+            result = dispatcher.predict_row(disease_type, features)
+        else:
+            result = predictor.predict_row(disease_type, features)
+        
+        response = {
             'success': True,
             'prediction': result['prediction'],
             'confidence': result['confidence'],
             'risk_level': result['risk_level'],
             'disease_type': disease_type
+        }
+        if explain and 'error' not in result:
+            response['explanation'] = predictor.explain_row(disease_type, features)
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/api/predict/batch', methods=['POST'])
+def api_predict_batch():
+    try:
+        data = request.get_json()
+        disease_type = data.get('disease_type')
+        rows = data.get('rows', [])
+        
+        if not isinstance(rows, list):
+            raise ValueError('rows must be a list of symptom objects')
+        if len(rows) > app.config['MAX_BATCH_ROWS']:
+            raise ValueError(f"Batch too large: at most {app.config['MAX_BATCH_ROWS']} rows per request")
+        
+        results = predictor.predict_batch(disease_type, rows)
+        
+        return jsonify({
+            'success': True,
+            'disease_type': disease_type,
+            'count': len(results),
+            'error_count': sum(1 for result in results if 'error' in result),
+            'results': results
         })
     except Exception as e:
         return jsonify({
@@ -210,24 +392,199 @@ def api_predict():
             'error': str(e)
         }), 400
 
+@app.route('/api/screen', methods=['POST'])
+def api_screen():
+    try:
+        data = request.get_json()
+        symptoms = data.get('symptoms', {})
+        if not isinstance(symptoms, dict):
+            raise ValueError('symptoms must be an object of symptom values')
+        
+        start = time.perf_counter()
+        diseases = data.get('diseases') or DISEASE_TYPES
+        results = predictor.screen(symptoms, diseases)
+        screened = {result['disease_type'] for result in results}
+        
+        return jsonify({
+            'success': True,
+            'count': len(results),
+            'results': results,
+            # Diseases for which the patient gave none of the inputs
+            'not_screened': [disease for disease in diseases if disease not in screened],
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 3)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/api/reports/summary')
+def api_report_summary():
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Login required'}), 401
+    
+    days = request.args.get('days', type=int)
+    since = (datetime.utcnow() - timedelta(days=days - 1)).strftime('%Y-%m-%d') if days else None
+    return jsonify({
+        'success': True,
+        'summary': DiagnosticReport.summary(user_id=session['user_id']),
+        'daily': DiagnosticReport.daily_stats(user_id=session['user_id'], since=since)
+    })
+
+def _history_filters(args):
+    """Report filters from /api/history query arguments, raising ValueError for invalid ones"""
+    filters = {}
+    disease_type = args.get('disease_type')
+    if disease_type:
+        if disease_type not in SCHEMAS:
+            raise ValueError(f'Unknown disease type: {disease_type}')
+        filters['disease_type'] = disease_type
+    risk_level = args.get('risk_level')
+    if risk_level:
+        if risk_level not in RISK_LEVELS:
+            raise ValueError(f"risk_level must be one of {', '.join(RISK_LEVELS)}")
+        filters['risk_level'] = risk_level
+    for name in ('since', 'until'):
+        if args.get(name):
+            try:
+                filters[name] = datetime.strptime(args[name], '%Y-%m-%d').date()
+            except ValueError:
+                raise ValueError(f'{name} must be a date formatted YYYY-MM-DD') from None
+    return filters
+
+@app.route('/api/history')
+def api_history():
+    """The user's reports, newest first: JSON pages, or the whole history streamed as NDJSON or CSV"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Login required'}), 401
+    
+    export_format = request.args.get('format', 'json')
+    if export_format != 'json' and export_format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': f"format must be json, {', '.join(EXPORT_FORMATS)}"}), 400
+    limit = request.args.get('limit', app.config['DASHBOARD_PAGE_SIZE'], type=int)
+    if not 1 <= limit <= app.config['HISTORY_MAX_PAGE_SIZE']:
+        return jsonify({'success': False,
+                        'error': f"limit must be between 1 and {app.config['HISTORY_MAX_PAGE_SIZE']}"}), 400
+    
+    cursor = request.args.get('cursor')
+    try:
+        filters = _history_filters(request.args)
+        if export_format == 'json':
+            reports, next_cursor = DiagnosticReport.get_page(limit, cursor, user_id=session['user_id'], **filters)
+        else:
+            reports = DiagnosticReport.iter_reports(cursor, user_id=session['user_id'], **filters)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    if export_format == 'json':
+        return jsonify({'success': True, 'reports': [report.to_dict() for report in reports], 'next_cursor': next_cursor})
+    
+    # Rows are serialized as the client reads them, so the export never sits in memory
+    serialize, mimetype = EXPORT_FORMATS[export_format]
+    return Response(serialize(reports), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=diagnosai-history.{export_format}'
+    })
+
+def _admin_authorized():
+    token = app.config['ADMIN_TOKEN']
+    if not token:
+        return False
+    supplied = request.headers.get('Authorization', '')
+    supplied = supplied[7:] if supplied.startswith('Bearer ') else request.headers.get('X-Admin-Token', '')
+    return hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8'))
+
+def _require_admin():
+    """Abort with 403 without the admin token, or 404 while none is configured"""
+    if not _admin_authorized():
+        abort(404 if not app.config['ADMIN_TOKEN'] else 403)
+
+# Operational endpoints expose traffic, cache and model internals, so they
+# take the same bearer token as /admin
+@app.route('/metrics')
+def metrics():
+    _require_admin()
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/models/cache')
+def api_model_cache():
+    _require_admin()
+    return jsonify(predictor.cache_stats())
+
+@app.route('/api/predict/cache')
+def api_result_cache():
+    _require_admin()
+    return jsonify(predictor.result_cache_stats())
+
+@app.route('/api/predict/dispatcher')
+def api_dispatcher_stats():
+    _require_admin()
+    if dispatcher is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(dispatcher.stats(), enabled=True))
+
+@app.route('/api/reports/writer')
+def api_report_writer():
+    _require_admin()
+    if report_writer is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(report_writer.stats(), enabled=True))
+
+@app.route('/admin/models')
+def admin_models():
+    _require_admin()
+    return jsonify(predictor.model_status())
+
+@app.route('/admin/models/<disease>')
+def admin_model(disease):
+    _require_admin()
+    if disease not in SCHEMAS:
+        return jsonify({'success': False, 'error': f'Unknown disease type: {disease}'}), 404
+    return jsonify(dict(predictor.model_status()[disease], disease=disease))
+
+@app.route('/admin/models/<disease>/reload', methods=['POST'])
+def admin_reload_model(disease):
+    _require_admin()
+    if disease not in SCHEMAS:
+        return jsonify({'success': False, 'error': f'Unknown disease type: {disease}'}), 404
+    
+    # Loading and checking a model can take seconds, so it happens off the request thread;
+    # poll the status URL until reload_pending is false and last_reload shows the outcome
+    started = predictor.reload_async(disease)
+    status_url = url_for('admin_model', disease=disease)
+    response = jsonify({
+        'success': True,
+        'disease': disease,
+        'started': started,
+        'version': predictor.model_versions.get(disease, 0),
+        'status_url': status_url
+    })
+    response.headers['Location'] = status_url
+    return response, 202
+
 @app.route('/report/<int:report_id>')
 def view_report(report_id):
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    report = DiagnosisReport.query.get_or_404(report_id)
+    report = DiagnosticReport.get_by_id(report_id)
+    if report is None and report_writer is not None and report_ids is not None and report_id <= report_ids.high_water:
+        # An id this process handed out may still be waiting in the write-behind queue
+        report_writer.flush(timeout=2.0)
+        report = DiagnosticReport.get_by_id(report_id)
+    if report is None:
+        abort(404)
     
     if report.user_id != session['user_id']:
         flash('Access denied')
         return redirect(url_for('dashboard'))
     
-    symptoms = json.loads(report.symptoms)
     return render_template('results.html', 
                          result={'prediction': report.prediction_result, 
                                 'confidence': report.confidence,
-                                'risk_level': 'High' if report.confidence > 70 else 'Medium' if report.confidence > 50 else 'Low'},
+                                'risk_level': report.risk_level},
                          disease_type=report.disease_type,
-                         symptoms=symptoms,
+                         symptoms=report.symptoms,
                          report_id=report.id,
                          from_history=True)
 
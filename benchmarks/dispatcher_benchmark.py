@@ -0,0 +1,91 @@
+"""Load-test concurrent single predictions with and without micro-batching
+
+Run from the project root:
+    python -m benchmarks.dispatcher_benchmark --clients 32 --requests 200
+"""
+import argparse
+import contextlib
+import io
+import threading
+import time
+
+import numpy as np
+
+from models.batch_dispatcher import MicroBatchDispatcher
+from models.disease_predictor import DiseasePredictor
+
+
+def load_test(predict, disease_type, clients, requests_per_client):
+    """Run concurrent clients against predict() and return throughput and latency figures"""
+    latencies = [[] for _ in range(clients)]
+    rng = np.random.default_rng(0)
+    payloads = [{'fever': float(v), 'cough': float(v > 2)} for v in rng.exponential(2, requests_per_client)]
+    barrier = threading.Barrier(clients + 1)
+
+    def client(index):
+        barrier.wait()
+        for symptoms in payloads:
+            start = time.perf_counter()
+            predict(disease_type, symptoms)
+            latencies[index].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = np.concatenate([np.array(l) for l in latencies]) * 1000
+    return {
+        'requests': len(all_latencies),
+        'seconds': elapsed,
+        'throughput_rps': len(all_latencies) / elapsed,
+        'p50_ms': float(np.percentile(all_latencies, 50)),
+        'p99_ms': float(np.percentile(all_latencies, 99))
+    }
+
+
+def run(disease_type='covid', clients=32, requests_per_client=200, max_batch_size=32, max_wait_ms=2.0):
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor = DiseasePredictor()
+        predictor.get_model(disease_type)
+
+    direct = load_test(predictor.predict, disease_type, clients, requests_per_client)
+
+    dispatcher = MicroBatchDispatcher(predictor, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    try:
+        batched = load_test(dispatcher.predict, disease_type, clients, requests_per_client)
+        batched['dispatcher'] = dispatcher.stats()
+    finally:
+        dispatcher.close()
+
+    return {
+        'direct': direct,
+        'micro_batched': batched,
+        'speedup': batched['throughput_rps'] / direct['throughput_rps']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--disease', default='covid')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=200, help='requests per client')
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    args = parser.parse_args()
+
+    results = run(args.disease, args.clients, args.requests, args.max_batch_size, args.max_wait_ms)
+    for name in ['direct', 'micro_batched']:
+        r = results[name]
+        print(f"{name:14s} {r['throughput_rps']:9.1f} req/s  p50 {r['p50_ms']:7.2f}ms  p99 {r['p99_ms']:7.2f}ms")
+    stats = results['micro_batched']['dispatcher']
+    print(f"mean batch size {stats['mean_batch_size']:.1f}, mean added latency {stats['mean_added_latency_ms']:.2f}ms")
+    print(f"Throughput gain: {results['speedup']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
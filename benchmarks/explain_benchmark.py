@@ -0,0 +1,88 @@
+"""Explanation latency per disease: single rows, memoized repeats and vectorized batches
+
+Also checks that every explanation adds up to the model's own output.
+
+Run from the project root:
+    python -m benchmarks.explain_benchmark --requests 200 --batch-size 1000
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from models.disease_predictor import BACKENDS, DiseasePredictor, DISEASE_TYPES, SCHEMAS
+
+
+def sample_rows(disease_type, n, seed=0):
+    """Random feature rows spread over each feature's accepted range"""
+    rng = np.random.default_rng(seed)
+    schema = SCHEMAS[disease_type]
+    return rng.uniform(schema.low, schema.high, (n, schema.size)).round(1)
+
+
+def latencies_ms(call, rows):
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        call(row)
+        timings.append(time.perf_counter() - start)
+    return np.array(timings) * 1000
+
+
+def additivity_error(predictor, disease_type, features):
+    """Largest gap between base_value plus contributions and the model's predicted probability"""
+    probabilities = predictor.predict_proba_matrix(disease_type, features)[:, 1]
+    values = np.array([e['value'] for e in predictor.explain_batch(disease_type, features)])
+    if predictor._get_explainer(disease_type).base_margin is not None:
+        values = 1.0 / (1.0 + np.exp(-values))
+    return float(np.abs(values - probabilities).max())
+
+
+def run(requests=200, batch_size=1000, backend='sklearn'):
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor = DiseasePredictor(backend=backend, result_cache_size=4096)
+        predictor.initialize_models()
+
+    results = {}
+    for disease_type in DISEASE_TYPES:
+        rows = sample_rows(disease_type, requests)
+        # Build the explainer outside the timed runs
+        predictor.explain_batch(disease_type, rows[:1])
+
+        predictor.explanation_cache.invalidate(disease_type)
+        uncached = latencies_ms(lambda row: predictor.explain_row(disease_type, row), rows)
+        cached = latencies_ms(lambda row: predictor.explain_row(disease_type, row), rows)
+
+        batch = sample_rows(disease_type, batch_size, seed=1)
+        start = time.perf_counter()
+        predictor.explain_batch(disease_type, batch)
+        batch_seconds = time.perf_counter() - start
+
+        results[disease_type] = {
+            'uncached_p50_ms': float(np.percentile(uncached, 50)),
+            'uncached_p99_ms': float(np.percentile(uncached, 99)),
+            'cached_p50_ms': float(np.percentile(cached, 50)),
+            'batch_rows_per_second': batch_size / batch_seconds,
+            'additivity_error': additivity_error(predictor, disease_type, batch[:100])
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='single-row explanations per disease')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--backend', choices=BACKENDS, default='sklearn')
+    args = parser.parse_args()
+
+    results = run(args.requests, args.batch_size, args.backend)
+    print(f"{'disease':16s} {'p50':>9s} {'p99':>9s} {'cached':>9s} {'batch':>12s} {'max error':>10s}")
+    for disease_type, r in results.items():
+        print(f"{disease_type:16s} {r['uncached_p50_ms']:6.3f} ms {r['uncached_p99_ms']:6.3f} ms "
+              f"{r['cached_p50_ms']:6.3f} ms {r['batch_rows_per_second']:7.0f} rows/s {r['additivity_error']:10.1e}")
+
+
+if __name__ == '__main__':
+    main()
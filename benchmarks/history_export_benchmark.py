@@ -0,0 +1,89 @@
+"""Throughput and peak memory of the streaming history export against loading every report first
+
+The naive export is what a handler built on DiagnosticReport.get_all()
+would do: load the whole table, keep the user's reports and serialize
+them into one body. The streaming export is /api/history?format=ndjson
+or csv, consumed chunk by chunk the way a WSGI server sends it. Peak
+memory is what tracemalloc sees allocated by Python during the export.
+
+Run from the project root:
+    python -m benchmarks.history_export_benchmark --reports 1000000
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.report_query_benchmark import fill
+from models.diagnostic_report import DiagnosticReport
+from models.report_export import EXPORT_FORMATS
+from models.storage import ReportStorage
+
+USER_ID = 1
+
+
+def naive_export(user_id):
+    reports = [report for report in DiagnosticReport.get_all() if report.user_id == user_id]
+    body = '\n'.join(json.dumps(report.to_dict()) for report in reports) + '\n'
+    return len(body)
+
+
+def streaming_export(export_format, user_id):
+    serialize, _ = EXPORT_FORMATS[export_format]
+    return sum(len(chunk) for chunk in serialize(DiagnosticReport.iter_reports(user_id=user_id)))
+
+
+def measure(export, reports):
+    """Rows per second of an untraced run, then the peak traced allocation of a second run in MB"""
+    start = time.perf_counter()
+    size = export()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        export()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'rows_per_second': reports / seconds, 'peak_mb': peak / 1024 / 1024, 'output_mb': size / 1024 / 1024}
+
+
+def run(reports=100000, formats=('ndjson', 'csv'), naive=True):
+    workdir = tempfile.mkdtemp(prefix='diagnosai_reports_')
+    original_storage = DiagnosticReport.storage
+    try:
+        DiagnosticReport.storage = ReportStorage(os.path.join(workdir, 'reports.db'))
+        DiagnosticReport.create_table()
+        # A single user, so the export covers every report in the table
+        fill(0, reports, users=1)
+
+        results = {export_format: measure(lambda: streaming_export(export_format, USER_ID), reports)
+                   for export_format in formats}
+        if naive:
+            results['naive_ndjson'] = measure(lambda: naive_export(USER_ID), reports)
+        return results
+    finally:
+        DiagnosticReport.storage.close()
+        DiagnosticReport.storage = original_storage
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reports', type=int, default=100000, help='reports in the exported history')
+    parser.add_argument('--formats', nargs='+', default=['ndjson', 'csv'], choices=sorted(EXPORT_FORMATS))
+    parser.add_argument('--skip-naive', action='store_true', help='skip the load-everything export')
+    args = parser.parse_args()
+
+    results = run(args.reports, args.formats, not args.skip_naive)
+    print(f"{args.reports:,d} reports")
+    print(f"{'export':14s} {'rows/s':>10s} {'peak memory':>12s} {'output':>10s}")
+    for name, r in results.items():
+        print(f"{name:14s} {r['rows_per_second']:10.0f} {r['peak_mb']:9.1f} MB {r['output_mb']:7.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Load-test the JSON prediction routes through the full Flask request stack
+
+By default requests go through Flask's test client in this process, so
+routing, JSON handling and the app's hooks are included without a server.
+Pass --url to load-test a running server instead.
+
+Run from the project root:
+    python -m benchmarks.http_benchmark --clients 8 --requests 200
+    python -m benchmarks.http_benchmark --url http://127.0.0.1:5000
+"""
+import argparse
+import contextlib
+import io
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+ROUTES = ['/api/predict', '/api/predict/batch', '/api/screen']
+
+
+def payloads(route, disease_type, n, seed=0):
+    rng = np.random.default_rng(seed)
+    fevers = rng.exponential(2, n).round(2)
+    if route == '/api/predict':
+        return [{'disease_type': disease_type, 'symptoms': {'fever': float(v), 'cough': float(v > 2)}} for v in fevers]
+    if route == '/api/predict/batch':
+        return [{'disease_type': disease_type, 'rows': [{'fever': float(v)} for v in fevers[:100]]}] * n
+    return [{'symptoms': {'fever': float(v), 'age': 50.0}} for v in fevers]
+
+
+def test_client_sender():
+    """Post through Flask's test client; one client per thread"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import app
+    local = threading.local()
+
+    def send(route, payload):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        return local.client.post(route, json=payload).status_code
+    return send
+
+
+def url_sender(base_url):
+    def send(route, payload):
+        request = urllib.request.Request(base_url.rstrip('/') + route, data=json.dumps(payload).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+    return send
+
+
+def load_test(send, route, disease_type, clients, requests_per_client):
+    """Run concurrent clients against one route and return throughput and latency figures"""
+    bodies = payloads(route, disease_type, requests_per_client)
+    # Warm up outside the timed run; this is where models get loaded
+    with contextlib.redirect_stdout(io.StringIO()):
+        send(route, bodies[0])
+    latencies = [[] for _ in range(clients)]
+    failures = [0] * clients
+    barrier = threading.Barrier(clients + 1)
+
+    def client(index):
+        barrier.wait()
+        for body in bodies:
+            start = time.perf_counter()
+            if send(route, body) != 200:
+                failures[index] += 1
+            latencies[index].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = np.concatenate([np.array(l) for l in latencies]) * 1000
+    return {
+        'requests': len(all_latencies),
+        'failures': sum(failures),
+        'seconds': elapsed,
+        'throughput_rps': len(all_latencies) / elapsed,
+        'p50_ms': float(np.percentile(all_latencies, 50)),
+        'p99_ms': float(np.percentile(all_latencies, 99))
+    }
+
+
+def run(routes=ROUTES, disease_type='covid', clients=8, requests_per_client=200, url=None):
+    send = url_sender(url) if url else test_client_sender()
+    return {route: load_test(send, route, disease_type, clients, requests_per_client) for route in routes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--routes', nargs='+', default=ROUTES, choices=ROUTES)
+    parser.add_argument('--disease', default='covid')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='requests per client')
+    parser.add_argument('--url', help='base URL of a running server (default: in-process test client)')
+    args = parser.parse_args()
+
+    results = run(args.routes, args.disease, args.clients, args.requests, args.url)
+    for route, r in results.items():
+        print(f"{route:20s} {r['throughput_rps']:8.0f} req/s  p50 {r['p50_ms']:7.3f} ms  "
+              f"p99 {r['p99_ms']:7.3f} ms  {r['failures']} failed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Single-row latency and batched throughput per disease for both inference backends
+
+Run from the project root:
+    python -m benchmarks.inference_benchmark --iterations 500 --batch-size 1000
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from models.disease_predictor import DiseasePredictor, DISEASE_TYPES, PARITY_TOLERANCE, SCHEMAS
+from models.fast_inference import parity_error
+
+
+def sample_rows(disease_type, n, seed=0):
+    """Random symptom dicts spread over each feature's accepted range"""
+    rng = np.random.default_rng(seed)
+    schema = SCHEMAS[disease_type]
+    X = rng.uniform(schema.low, schema.high, (n, schema.size)).round(1)
+    return [dict(zip(schema.features, row)) for row in X.tolist()]
+
+
+def check_results(disease_type, results):
+    """Fail loudly if any row was rejected, so error paths are never timed as inference"""
+    errors = [r for r in results if 'error' in r]
+    if errors:
+        raise SystemExit(f"{len(errors)} of {len(results)} {disease_type} rows failed: {errors[0]}")
+
+
+def latency(predict, disease_type, rows):
+    """p50/p99 latency in milliseconds of one predict() call per row"""
+    predict(disease_type, rows[0])
+    timings = []
+    results = []
+    for symptoms in rows:
+        start = time.perf_counter()
+        result = predict(disease_type, symptoms)
+        timings.append(time.perf_counter() - start)
+        results.append(result)
+    check_results(disease_type, results)
+    timings = np.array(timings) * 1000
+    return {'p50_ms': float(np.percentile(timings, 50)), 'p99_ms': float(np.percentile(timings, 99))}
+
+
+def batch_throughput(predictor, disease_type, rows, repeat=3):
+    """Rows per second through predict_batch, best of a few runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = predictor.predict_batch(disease_type, rows)
+        best = min(best, time.perf_counter() - start)
+        check_results(disease_type, results)
+    return len(rows) / best
+
+
+def run(iterations=500, diseases=None, batch_size=1000):
+    with contextlib.redirect_stdout(io.StringIO()):
+        reference = DiseasePredictor(lazy=False, backend='sklearn')
+        compiled = DiseasePredictor(lazy=False, backend='compiled')
+
+    results = {}
+    for disease_type in diseases or DISEASE_TYPES:
+        rows = sample_rows(disease_type, iterations)
+        batch = sample_rows(disease_type, batch_size, seed=1)
+        model, scaler, fast = compiled._get_entry(disease_type)
+        results[disease_type] = {
+            'sklearn': dict(latency(reference.predict, disease_type, rows),
+                            batch_rows_per_second=batch_throughput(reference, disease_type, batch)),
+            'compiled': dict(latency(compiled.predict, disease_type, rows),
+                             batch_rows_per_second=batch_throughput(compiled, disease_type, batch)),
+            'parity_error': parity_error(fast, model, scaler) if fast is not None else None
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    results = run(args.iterations, batch_size=args.batch_size)
+    print(f"{'disease':16s} {'sklearn p50':>12s} {'p99':>8s} {'batch':>10s} "
+          f"{'compiled p50':>13s} {'p99':>8s} {'batch':>10s} {'parity':>9s}")
+    for disease_type, r in results.items():
+        parity = r['parity_error']
+        status = 'n/a' if parity is None else f'{parity:.1e}'
+        print(f"{disease_type:16s} {r['sklearn']['p50_ms']:10.3f}ms {r['sklearn']['p99_ms']:6.3f}ms "
+              f"{r['sklearn']['batch_rows_per_second']:8.0f}/s "
+              f"{r['compiled']['p50_ms']:11.3f}ms {r['compiled']['p99_ms']:6.3f}ms "
+              f"{r['compiled']['batch_rows_per_second']:8.0f}/s {status:>9s}")
+    failures = [d for d, r in results.items() if r['parity_error'] is None or r['parity_error'] > PARITY_TOLERANCE]
+    if failures:
+        raise SystemExit(f"Parity check failed for: {', '.join(failures)}")
+
+
+if __name__ == '__main__':
+    main()
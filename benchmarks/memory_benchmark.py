@@ -0,0 +1,123 @@
+"""Per-worker RSS and PSS of the model serving modes with several worker processes
+
+Each mode forks --workers processes that load every disease model and
+serve a few predictions, the way WSGI workers would, then reads their
+/proc/<pid>/smaps_rollup while all of them are alive:
+
+    per_worker  every worker loads its own estimators (the current default)
+    preload     the parent loads the estimators once and forks the workers
+                (gunicorn --preload); pages stay shared until written
+    mmap        every worker maps the compiled tables written to models_dir
+                (DIAGNOSAI_INFERENCE_BACKEND=mmap); the page cache holds one copy
+
+Linux only. Run from the project root:
+    python -m benchmarks.memory_benchmark --workers 4
+"""
+import argparse
+import contextlib
+import gc
+import io
+import multiprocessing
+import shutil
+import tempfile
+
+import numpy as np
+
+from models.disease_predictor import DiseasePredictor, DISEASE_TYPES, SCREEN_SCHEMA
+from models.metrics import process_memory
+
+MODES = ['per_worker', 'preload', 'mmap']
+
+MB = 1024 * 1024
+
+
+def serve(predictor, patients):
+    """Touch every model the way live traffic would"""
+    rng = np.random.default_rng(0)
+    # Values inside every feature's accepted range, so every model is really evaluated
+    for row in rng.uniform(SCREEN_SCHEMA.low, SCREEN_SCHEMA.high, (patients, SCREEN_SCHEMA.size)).round(1):
+        predictor.screen(dict(zip(SCREEN_SCHEMA.features, row)))
+
+
+def worker(models_dir, backend, predictor, patients, ready, done):
+    with contextlib.redirect_stdout(io.StringIO()):
+        if predictor is None:
+            predictor = DiseasePredictor(models_dir=models_dir, backend=backend, result_cache_size=0)
+            predictor.initialize_models()
+        serve(predictor, patients)
+    ready.release()
+    done.wait()
+
+
+def measure_mode(mode, models_dir, workers, patients):
+    """Fork the workers of one mode and return their memory while all are running"""
+    context = multiprocessing.get_context('fork')
+    backend = 'mmap' if mode == 'mmap' else 'sklearn'
+    predictor = None
+    if mode == 'preload':
+        with contextlib.redirect_stdout(io.StringIO()):
+            predictor = DiseasePredictor(models_dir=models_dir, backend=backend, result_cache_size=0)
+            predictor.initialize_models()
+        # Keep the collector from writing to every object header after the fork
+        gc.freeze()
+
+    ready = context.Semaphore(0)
+    done = context.Event()
+    processes = [context.Process(target=worker, args=(models_dir, backend, predictor, patients, ready, done))
+                 for _ in range(workers)]
+    try:
+        for process in processes:
+            process.start()
+        for _ in processes:
+            ready.acquire()
+        memory = [process_memory(process.pid) for process in processes]
+        parent = process_memory()
+    finally:
+        done.set()
+        for process in processes:
+            process.join()
+        if mode == 'preload':
+            gc.unfreeze()
+
+    return {
+        'workers': workers,
+        'rss_mb_per_worker': float(np.mean([m['rss'] for m in memory])) / MB,
+        'pss_mb_per_worker': float(np.mean([m['pss'] for m in memory])) / MB,
+        'private_mb_per_worker': float(np.mean([m['private'] for m in memory])) / MB,
+        'total_pss_mb': sum(m['pss'] for m in memory) / MB,
+        # With preload the parent plays the gunicorn master and holds the models too
+        'parent_pss_mb': parent['pss'] / MB
+    }
+
+
+def run(workers=4, patients=50, modes=MODES):
+    if process_memory() is None:
+        raise RuntimeError('Memory reporting needs /proc/<pid>/smaps_rollup (Linux 4.14 or newer)')
+
+    models_dir = tempfile.mkdtemp(prefix='diagnosai_models_')
+    try:
+        # Write the artifacts and compiled tables up front so no worker trains
+        with contextlib.redirect_stdout(io.StringIO()):
+            DiseasePredictor(models_dir=models_dir, backend='mmap', result_cache_size=0).initialize_models()
+        return {mode: measure_mode(mode, models_dir, workers, patients) for mode in modes}
+    finally:
+        shutil.rmtree(models_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--patients', type=int, default=50, help='screenings each worker serves before measuring')
+    parser.add_argument('--modes', nargs='+', default=MODES, choices=MODES)
+    args = parser.parse_args()
+
+    results = run(args.workers, args.patients, args.modes)
+    print(f"{args.workers} workers, {len(DISEASE_TYPES)} models each")
+    print(f"{'mode':12s} {'RSS/worker':>11s} {'PSS/worker':>11s} {'private':>9s} {'total PSS':>10s} {'parent PSS':>11s}")
+    for mode, r in results.items():
+        print(f"{mode:12s} {r['rss_mb_per_worker']:8.1f} MB {r['pss_mb_per_worker']:8.1f} MB "
+              f"{r['private_mb_per_worker']:6.1f} MB {r['total_pss_mb']:7.1f} MB {r['parent_pss_mb']:8.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
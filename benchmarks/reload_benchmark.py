@@ -0,0 +1,101 @@
+"""Hot reload duration per disease and prediction latency while models are being swapped
+
+A client thread keeps predicting while the main thread reloads a model
+over and over. Every prediction must succeed; the latency percentiles
+show what a reload costs the requests that overlap it.
+
+Run from the project root:
+    python -m benchmarks.reload_benchmark --reloads 20
+"""
+import argparse
+import contextlib
+import io
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from models.disease_predictor import BACKENDS, DiseasePredictor, DISEASE_TYPES, SCHEMAS
+
+
+def predict_until(predictor, disease_type, stop):
+    """Predict random rows until stop is set, returning latencies in ms and the failure count"""
+    schema = SCHEMAS[disease_type]
+    rng = np.random.default_rng(0)
+    timings, failures = [], 0
+    while not stop.is_set():
+        row = rng.uniform(schema.low, schema.high).round(1)
+        start = time.perf_counter()
+        result = predictor.predict_row(disease_type, row)
+        timings.append(time.perf_counter() - start)
+        if 'error' in result:
+            failures += 1
+    return np.array(timings) * 1000, failures
+
+
+def latencies_during(predictor, disease_type, action):
+    """Run action while a client thread predicts, returning the client's latencies and failures"""
+    stop = threading.Event()
+    outcome = {}
+    client = threading.Thread(target=lambda: outcome.update(zip(('ms', 'failures'),
+                                                                predict_until(predictor, disease_type, stop))))
+    client.start()
+    try:
+        action()
+    finally:
+        stop.set()
+        client.join()
+    return outcome['ms'], outcome['failures']
+
+
+def run(reloads=20, backend='sklearn', disease_types=DISEASE_TYPES):
+    models_dir = tempfile.mkdtemp(prefix='diagnosai_models_')
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            predictor = DiseasePredictor(models_dir=models_dir, backend=backend, result_cache_size=0)
+            predictor.initialize_models()
+
+        results = {}
+        for disease_type in disease_types:
+            seconds = []
+
+            def reload_repeatedly():
+                for _ in range(reloads):
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        record = predictor.reload(disease_type)
+                    if record['outcome'] != 'success':
+                        raise RuntimeError(f"Reload of {disease_type} failed: {record['error']}")
+                    seconds.append(record['seconds'])
+
+            idle, _ = latencies_during(predictor, disease_type, lambda: time.sleep(0.2))
+            busy, failures = latencies_during(predictor, disease_type, reload_repeatedly)
+            results[disease_type] = {
+                'reload_p50_ms': float(np.percentile(seconds, 50)) * 1000,
+                'reload_max_ms': float(np.max(seconds)) * 1000,
+                'idle_p99_ms': float(np.percentile(idle, 99)),
+                'reloading_p99_ms': float(np.percentile(busy, 99)),
+                'predictions_during_reloads': len(busy),
+                'failed_predictions': failures
+            }
+        return results
+    finally:
+        shutil.rmtree(models_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reloads', type=int, default=20, help='reloads of each disease model')
+    parser.add_argument('--backend', choices=BACKENDS, default='sklearn')
+    args = parser.parse_args()
+
+    results = run(args.reloads, args.backend)
+    print(f"{'disease':16s} {'reload p50':>11s} {'reload max':>11s} {'idle p99':>10s} {'reload p99':>11s} {'failed':>7s}")
+    for disease_type, r in results.items():
+        print(f"{disease_type:16s} {r['reload_p50_ms']:8.2f} ms {r['reload_max_ms']:8.2f} ms "
+              f"{r['idle_p99_ms']:7.3f} ms {r['reloading_p99_ms']:8.3f} ms {r['failed_predictions']:7d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Report insert and dashboard query throughput as the report table grows
+
+Fills a scratch database to each size in turn and times the queries the
+dashboard and /report/<id> issue against it.
+
+Run from the project root:
+    python -m benchmarks.report_query_benchmark --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from models.diagnostic_report import DiagnosticReport, encode_cursor
+from models.disease_predictor import DISEASE_TYPES
+from models.storage import ReportStorage
+
+RISK_LEVELS = ['Low', 'Medium', 'High']
+
+# Reports per save_many transaction while filling the table
+FILL_BATCH_SIZE = 1000
+
+
+def fill(start, count, users, seed=0):
+    """Insert count synthetic reports, returning inserts per second"""
+    rng = np.random.default_rng(seed + start)
+    epoch = datetime(2024, 1, 1)
+    began = time.perf_counter()
+    for offset in range(0, count, FILL_BATCH_SIZE):
+        n = min(FILL_BATCH_SIZE, count - offset)
+        confidences = rng.uniform(50, 100, n).round(2)
+        diseases = rng.integers(0, len(DISEASE_TYPES), n)
+        user_ids = rng.integers(1, users + 1, n)
+        DiagnosticReport.save_many([
+            DiagnosticReport(
+                disease_type=DISEASE_TYPES[diseases[i]],
+                symptoms={'age': float(i % 90)},
+                prediction_result='Negative',
+                confidence=float(confidences[i]),
+                risk_level=RISK_LEVELS[int(confidences[i] > 70) + int(confidences[i] > 85)],
+                # One report a minute keeps timestamps unique and ordered by id
+                timestamp=epoch + timedelta(minutes=start + offset + i),
+                user_id=int(user_ids[i])
+            )
+            for i in range(n)
+        ])
+    return count / (time.perf_counter() - began)
+
+
+def queries_per_second(query, repeat):
+    began = time.perf_counter()
+    for _ in range(repeat):
+        query()
+    return repeat / (time.perf_counter() - began)
+
+
+def measure_queries(total, users, repeat=200):
+    """Queries per second for each dashboard access pattern at the current table size"""
+    _, cursor = DiagnosticReport.get_page(20)
+    # A cursor halfway down the table, as if a user paged far back
+    conn = DiagnosticReport.storage.connection()
+    middle = conn.execute('SELECT timestamp, id FROM diagnostic_reports ORDER BY id LIMIT 1 OFFSET ?',
+                          (total // 2,)).fetchone()
+    deep_cursor = encode_cursor(*middle)
+    report_ids = np.random.default_rng(1).integers(1, total + 1, repeat)
+    user_id = users // 2 or 1
+    lookups = iter(report_ids)
+
+    return {
+        'first_page': queries_per_second(lambda: DiagnosticReport.get_page(20), repeat),
+        'next_page': queries_per_second(lambda: DiagnosticReport.get_page(20, cursor), repeat),
+        'deep_page': queries_per_second(lambda: DiagnosticReport.get_page(20, deep_cursor), repeat),
+        'user_first_page': queries_per_second(lambda: DiagnosticReport.get_page(20, user_id=user_id), repeat),
+        'count_all': queries_per_second(DiagnosticReport.count, max(repeat // 10, 1)),
+        'count_high_risk': queries_per_second(lambda: DiagnosticReport.count(risk_level='High'), max(repeat // 10, 1)),
+        'user_counts': queries_per_second(
+            lambda: (DiagnosticReport.count(user_id=user_id), DiagnosticReport.count(risk_level='High', user_id=user_id)),
+            repeat
+        ),
+        'summary': queries_per_second(DiagnosticReport.summary, repeat),
+        'user_summary': queries_per_second(lambda: DiagnosticReport.summary(user_id=user_id), repeat),
+        'get_by_id': queries_per_second(lambda: DiagnosticReport.get_by_id(int(next(lookups))), repeat)
+    }
+
+
+def run(sizes=(10000, 100000, 1000000), users=100, repeat=200):
+    """Grow one scratch table through each size, timing inserts and queries at every step"""
+    workdir = tempfile.mkdtemp(prefix='diagnosai_reports_')
+    original_storage = DiagnosticReport.storage
+    results = {}
+    try:
+        DiagnosticReport.storage = ReportStorage(os.path.join(workdir, 'reports.db'))
+        DiagnosticReport.create_table()
+
+        total = 0
+        for size in sorted(sizes):
+            inserts_per_second = fill(total, size - total, users)
+            total = size
+            results[str(size)] = {
+                'insert_rows_per_second': inserts_per_second,
+                'queries_per_second': measure_queries(total, users, repeat)
+            }
+    finally:
+        DiagnosticReport.storage.close()
+        DiagnosticReport.storage = original_storage
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200, help='calls per query pattern')
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.users, args.repeat)
+    for size, r in results.items():
+        print(f"{int(size):>9,d} reports: {r['insert_rows_per_second']:9.0f} inserts/s")
+        for name, qps in r['queries_per_second'].items():
+            print(f"    {name:16s} {qps:10.0f} queries/s")
+
+
+if __name__ == '__main__':
+    main()
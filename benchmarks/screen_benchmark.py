@@ -0,0 +1,83 @@
+"""Compare screening one patient model by model against DiseasePredictor.screen()
+
+Run from the project root:
+    python -m benchmarks.screen_benchmark --patients 200
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from models.disease_predictor import BACKENDS, DiseasePredictor, DISEASE_TYPES, SCREEN_SCHEMA
+
+
+def sample_patients(n, seed=0):
+    """Random patients covering the union of every disease's features, within their accepted ranges"""
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(SCREEN_SCHEMA.low, SCREEN_SCHEMA.high, (n, SCREEN_SCHEMA.size)).round(1)
+    return [dict(zip(SCREEN_SCHEMA.features, row)) for row in X.tolist()]
+
+
+def check_results(results):
+    """Fail loudly if any disease rejected the patient, so error paths are never timed as inference"""
+    errors = [r for r in results if 'error' in r]
+    if errors:
+        raise SystemExit(f"{len(errors)} screening results failed: {errors[0]}")
+
+
+def run(patients=200, backend='sklearn'):
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor = DiseasePredictor(backend=backend, result_cache_size=0)
+        predictor.initialize_models()
+    rows = sample_patients(patients)
+    # Warm up the thread pool and any lazy library state
+    predictor.screen(rows[0])
+
+    sequential = []
+    per_model = {disease: [] for disease in DISEASE_TYPES}
+    for symptoms in rows:
+        start = time.perf_counter()
+        for disease in DISEASE_TYPES:
+            model_start = time.perf_counter()
+            result = predictor.predict(disease, symptoms)
+            per_model[disease].append(time.perf_counter() - model_start)
+            check_results([result])
+        sequential.append(time.perf_counter() - start)
+
+    screened = []
+    for symptoms in rows:
+        start = time.perf_counter()
+        results = predictor.screen(symptoms)
+        screened.append(time.perf_counter() - start)
+        check_results(results)
+
+    return {
+        'patients': patients,
+        'backend': backend,
+        'sequential_p50_ms': float(np.percentile(sequential, 50) * 1000),
+        'screen_p50_ms': float(np.percentile(screened, 50) * 1000),
+        'screen_p99_ms': float(np.percentile(screened, 99) * 1000),
+        'slowest_model_p50_ms': max(float(np.percentile(t, 50) * 1000) for t in per_model.values()),
+        'per_model_p50_ms': {d: float(np.percentile(t, 50) * 1000) for d, t in per_model.items()}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=200)
+    parser.add_argument('--backend', choices=BACKENDS, default='sklearn')
+    args = parser.parse_args()
+
+    result = run(args.patients, args.backend)
+    for disease, ms in result['per_model_p50_ms'].items():
+        print(f"  {disease:16s} {ms:8.3f} ms")
+    print(f"Sequential, one model after another: p50 {result['sequential_p50_ms']:.3f} ms")
+    print(f"screen():                            p50 {result['screen_p50_ms']:.3f} ms, "
+          f"p99 {result['screen_p99_ms']:.3f} ms")
+    print(f"Slowest single model:                p50 {result['slowest_model_p50_ms']:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Compare cold-train startup of DiseasePredictor with warm loading from saved artifacts
+
+Run from the project root:
+    python -m benchmarks.startup_benchmark
+"""
+import argparse
+import contextlib
+import io
+import shutil
+import tempfile
+import time
+
+from models.disease_predictor import DiseasePredictor
+
+
+def time_startup(models_dir):
+    """Return the seconds taken to construct a DiseasePredictor"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        DiseasePredictor(models_dir=models_dir, lazy=False)
+    return time.perf_counter() - start
+
+
+def run(repeats=3):
+    """Measure cold (train and save) and warm (load) startup times"""
+    cold, warm = [], []
+    for _ in range(repeats):
+        models_dir = tempfile.mkdtemp(prefix='diagnosai_models_')
+        try:
+            cold.append(time_startup(models_dir))
+            warm.append(time_startup(models_dir))
+        finally:
+            shutil.rmtree(models_dir, ignore_errors=True)
+
+    return {
+        'cold_train_seconds': min(cold),
+        'warm_load_seconds': min(warm),
+        'speedup': min(cold) / min(warm)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    results = run(args.repeats)
+    print(f"Cold start (train all models): {results['cold_train_seconds']:.3f}s")
+    print(f"Warm start (load artifacts):   {results['warm_load_seconds']:.3f}s")
+    print(f"Speedup:                       {results['speedup']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Report insert throughput under concurrent writer threads
+
+Compares the old connect-per-insert pattern with the pooled WAL storage
+used by DiagnosticReport, for both single saves and save_many batches.
+
+Run from the project root:
+    python -m benchmarks.storage_benchmark --threads 8 --inserts 500
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from models.diagnostic_report import DiagnosticReport, CREATE_TABLE_SQL, INSERT_SQL
+from models.storage import ReportStorage
+
+
+def make_report(i):
+    return DiagnosticReport(
+        disease_type='covid',
+        symptoms={'fever': float(i % 5), 'cough': 1.0},
+        prediction_result='COVID Negative',
+        confidence=80.0,
+        risk_level='High'
+    )
+
+
+def connect_per_insert(db_path, report):
+    """The previous DiagnosticReport.save: open, insert, commit and close each time"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    cursor = conn.cursor()
+    cursor.execute(INSERT_SQL, report._row())
+    conn.commit()
+    conn.close()
+
+
+def run_threads(threads, work):
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index):
+        barrier.wait()
+        work(index)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    return time.perf_counter() - start
+
+
+def run(threads=8, inserts=500, batch_size=100):
+    workdir = tempfile.mkdtemp(prefix='diagnosai_storage_')
+    original_storage = DiagnosticReport.storage
+    results = {}
+    try:
+        # Baseline: a fresh rollback-journal database with per-call connections
+        legacy_path = os.path.join(workdir, 'legacy.db')
+        conn = sqlite3.connect(legacy_path)
+        conn.execute(CREATE_TABLE_SQL)
+        conn.close()
+
+        def legacy(index):
+            for i in range(inserts):
+                connect_per_insert(legacy_path, make_report(i))
+
+        elapsed = run_threads(threads, legacy)
+        results['connect_per_insert'] = threads * inserts / elapsed
+
+        DiagnosticReport.storage = ReportStorage(os.path.join(workdir, 'pooled.db'))
+        DiagnosticReport.create_table()
+
+        def pooled(index):
+            for i in range(inserts):
+                make_report(i).save()
+
+        elapsed = run_threads(threads, pooled)
+        results['pooled_save'] = threads * inserts / elapsed
+
+        def bulk(index):
+            for start in range(0, inserts, batch_size):
+                DiagnosticReport.save_many([make_report(i) for i in range(start, min(start + batch_size, inserts))])
+
+        elapsed = run_threads(threads, bulk)
+        results['pooled_save_many'] = threads * inserts / elapsed
+    finally:
+        DiagnosticReport.storage.close()
+        DiagnosticReport.storage = original_storage
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--inserts', type=int, default=500, help='inserts per thread')
+    parser.add_argument('--batch-size', type=int, default=100)
+    args = parser.parse_args()
+
+    results = run(args.threads, args.inserts, args.batch_size)
+    for name, rate in results.items():
+        print(f"{name:20s} {rate:10.0f} inserts/s")
+
+
+if __name__ == '__main__':
+    main()
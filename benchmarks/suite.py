@@ -0,0 +1,277 @@
+"""Run every benchmark, save the results as JSON and flag regressions against a baseline
+
+Run from the project root:
+    python -m benchmarks.suite --output baseline.json
+    python -m benchmarks.suite --baseline baseline.json --output current.json
+    python -m benchmarks.suite --baseline baseline.json --current current.json
+
+The quick profile (default) finishes in a few minutes; --profile full
+grows the report table to 1M rows and runs longer load tests. Compare
+results only against a baseline from the same profile and machine.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import sklearn
+import xgboost
+
+from benchmarks import (
+    dispatcher_benchmark, explain_benchmark, history_export_benchmark, http_benchmark, inference_benchmark, memory_benchmark,
+    report_query_benchmark, reload_benchmark, screen_benchmark, startup_benchmark, storage_benchmark, symptom_codec_benchmark,
+    validation_benchmark
+)
+
+RESULTS_VERSION = 1
+
+# Relative change in the wrong direction that counts as a regression
+DEFAULT_THRESHOLD = 0.15
+
+PROFILES = {
+    'quick': {
+        'startup': {'repeats': 1},
+        'inference': {'iterations': 200, 'batch_size': 1000},
+        'screen': {'patients': 50},
+        'dispatcher': {'clients': 16, 'requests_per_client': 100},
+        'storage': {'threads': 4, 'inserts': 500},
+        'report_queries': {'sizes': (10000,), 'repeat': 100},
+        'symptom_codec': {'n': 20000},
+        'http': {'clients': 4, 'requests_per_client': 100},
+        'memory': {'workers': 2, 'patients': 20},
+        'validation': {'iterations': 2000},
+        'explain': {'requests': 100, 'batch_size': 1000},
+        'reload': {'reloads': 5},
+        'history_export': {'reports': 100000}
+    },
+    'full': {
+        'startup': {'repeats': 3},
+        'inference': {'iterations': 1000, 'batch_size': 10000},
+        'screen': {'patients': 200},
+        'dispatcher': {'clients': 32, 'requests_per_client': 200},
+        'storage': {'threads': 8, 'inserts': 500},
+        'report_queries': {'sizes': (10000, 100000, 1000000), 'repeat': 200},
+        'symptom_codec': {'n': 100000},
+        'http': {'clients': 8, 'requests_per_client': 500},
+        'memory': {'workers': 4, 'patients': 100},
+        'validation': {'iterations': 10000},
+        'explain': {'requests': 500, 'batch_size': 10000},
+        'reload': {'reloads': 20},
+        'history_export': {'reports': 1000000, 'naive': False}
+    }
+}
+
+BENCHMARKS = {
+    'startup': startup_benchmark.run,
+    'inference': inference_benchmark.run,
+    'screen': screen_benchmark.run,
+    'dispatcher': dispatcher_benchmark.run,
+    'storage': storage_benchmark.run,
+    'report_queries': report_query_benchmark.run,
+    'symptom_codec': symptom_codec_benchmark.run,
+    'http': http_benchmark.run,
+    'memory': memory_benchmark.run,
+    'validation': validation_benchmark.run,
+    'explain': explain_benchmark.run,
+    'reload': reload_benchmark.run,
+    'history_export': history_export_benchmark.run
+}
+
+
+def extract_metrics(name, result):
+    """Flatten one benchmark's result into {metric: (value, unit, 'lower' or 'higher' is better)}"""
+    metrics = {}
+    if name == 'startup':
+        metrics['startup.cold_train_seconds'] = (result['cold_train_seconds'], 's', 'lower')
+        metrics['startup.warm_load_seconds'] = (result['warm_load_seconds'], 's', 'lower')
+    elif name == 'inference':
+        for disease, r in result.items():
+            for backend in ('sklearn', 'compiled'):
+                prefix = f'inference.{disease}.{backend}'
+                metrics[f'{prefix}.p50_ms'] = (r[backend]['p50_ms'], 'ms', 'lower')
+                metrics[f'{prefix}.p99_ms'] = (r[backend]['p99_ms'], 'ms', 'lower')
+                metrics[f'{prefix}.batch_rows_per_second'] = (r[backend]['batch_rows_per_second'], 'rows/s', 'higher')
+    elif name == 'screen':
+        metrics['screen.sequential_p50_ms'] = (result['sequential_p50_ms'], 'ms', 'lower')
+        metrics['screen.screen_p50_ms'] = (result['screen_p50_ms'], 'ms', 'lower')
+        metrics['screen.screen_p99_ms'] = (result['screen_p99_ms'], 'ms', 'lower')
+    elif name == 'dispatcher':
+        for mode in ('direct', 'micro_batched'):
+            metrics[f'dispatcher.{mode}.throughput_rps'] = (result[mode]['throughput_rps'], 'req/s', 'higher')
+            metrics[f'dispatcher.{mode}.p99_ms'] = (result[mode]['p99_ms'], 'ms', 'lower')
+    elif name == 'storage':
+        for mode, rate in result.items():
+            metrics[f'storage.{mode}.inserts_per_second'] = (rate, 'rows/s', 'higher')
+    elif name == 'report_queries':
+        for size, r in result.items():
+            metrics[f'report_queries.{size}.insert_rows_per_second'] = (r['insert_rows_per_second'], 'rows/s', 'higher')
+            for query, qps in r['queries_per_second'].items():
+                metrics[f'report_queries.{size}.{query}'] = (qps, 'queries/s', 'higher')
+    elif name == 'symptom_codec':
+        for fmt, rate in result['decode_rows_per_second'].items():
+            metrics[f'symptom_codec.{fmt}.decode_rows_per_second'] = (rate, 'rows/s', 'higher')
+    elif name == 'http':
+        for route, r in result.items():
+            prefix = f'http.{route}'
+            metrics[f'{prefix}.throughput_rps'] = (r['throughput_rps'], 'req/s', 'higher')
+            metrics[f'{prefix}.p50_ms'] = (r['p50_ms'], 'ms', 'lower')
+            metrics[f'{prefix}.p99_ms'] = (r['p99_ms'], 'ms', 'lower')
+            metrics[f'{prefix}.failures'] = (r['failures'], 'requests', 'lower')
+    elif name == 'memory':
+        for mode, r in result.items():
+            metrics[f'memory.{mode}.pss_mb_per_worker'] = (r['pss_mb_per_worker'], 'MB', 'lower')
+            metrics[f'memory.{mode}.private_mb_per_worker'] = (r['private_mb_per_worker'], 'MB', 'lower')
+    elif name == 'validation':
+        for disease, r in result.items():
+            metrics[f'validation.{disease}.schema_form_us'] = (r['schema_form_us'], 'us', 'lower')
+            metrics[f'validation.{disease}.schema_assemble_us'] = (r['schema_assemble_us'], 'us', 'lower')
+    elif name == 'explain':
+        for disease, r in result.items():
+            metrics[f'explain.{disease}.uncached_p50_ms'] = (r['uncached_p50_ms'], 'ms', 'lower')
+            metrics[f'explain.{disease}.batch_rows_per_second'] = (r['batch_rows_per_second'], 'rows/s', 'higher')
+    elif name == 'reload':
+        for disease, r in result.items():
+            metrics[f'reload.{disease}.reload_p50_ms'] = (r['reload_p50_ms'], 'ms', 'lower')
+            metrics[f'reload.{disease}.reloading_p99_ms'] = (r['reloading_p99_ms'], 'ms', 'lower')
+            metrics[f'reload.{disease}.failed_predictions'] = (r['failed_predictions'], 'requests', 'lower')
+    elif name == 'history_export':
+        for export, r in result.items():
+            metrics[f'history_export.{export}.rows_per_second'] = (r['rows_per_second'], 'rows/s', 'higher')
+            metrics[f'history_export.{export}.peak_mb'] = (r['peak_mb'], 'MB', 'lower')
+    return metrics
+
+
+def run_suite(profile='quick', only=None, repeat=1):
+    """Run the selected benchmarks and return the results document
+
+    With repeat > 1 every benchmark runs several times and each metric
+    keeps its best value, which filters out most scheduling noise.
+    """
+    settings = PROFILES[profile]
+    results, metrics = {}, {}
+    for name, run in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        for attempt in range(repeat):
+            print(f"Running {name} ({attempt + 1}/{repeat})...", file=sys.stderr)
+            start = time.perf_counter()
+            results[name] = run(**settings[name])
+            print(f"  done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+            for metric, (value, unit, better) in extract_metrics(name, results[name]).items():
+                best = metrics.get(metric)
+                if best is None or (value < best['value'] if better == 'lower' else value > best['value']):
+                    metrics[metric] = {'value': float(value), 'unit': unit, 'better': better}
+
+    return {
+        'version': RESULTS_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'profile': profile,
+        'repeat': repeat,
+        'environment': environment(),
+        'metrics': metrics,
+        'results': results
+    }
+
+
+def environment():
+    """Details that make results from different runs (in)comparable"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'xgboost': xgboost.__version__,
+        'git_commit': commit
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Per-metric relative change between two results documents, with regressions flagged"""
+    rows = []
+    for metric, now in sorted(current['metrics'].items()):
+        before = baseline['metrics'].get(metric)
+        if before is None:
+            continue
+        if before['value']:
+            change = (now['value'] - before['value']) / before['value']
+        else:
+            change = 0.0 if not now['value'] else float('inf')
+        worse = change if now['better'] == 'lower' else -change
+        rows.append({
+            'metric': metric,
+            'baseline': before['value'],
+            'current': now['value'],
+            'unit': now['unit'],
+            'change': change,
+            'regression': worse > threshold,
+            'improvement': worse < -threshold
+        })
+    return rows
+
+
+def print_comparison(rows, threshold):
+    print(f"{'metric':60s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for row in rows:
+        flag = 'REGRESSION' if row['regression'] else 'improved' if row['improvement'] else ''
+        print(f"{row['metric']:60s} {row['baseline']:12.4g} {row['current']:12.4g} {row['change']:+7.1%}  {flag}")
+    regressions = sum(row['regression'] for row in rows)
+    print(f"{len(rows)} metrics compared, {regressions} regressed by more than {threshold:.0%}")
+
+
+def _load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        document = json.load(f)
+    if document.get('version') != RESULTS_VERSION:
+        raise ValueError(f"{path} has results version {document.get('version')}, expected {RESULTS_VERSION}")
+    return document
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='quick')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='run only these benchmarks')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per benchmark, keeping the best value of each metric')
+    parser.add_argument('--output', help='write the results JSON here')
+    parser.add_argument('--baseline', help='results JSON to compare against')
+    parser.add_argument('--current', help='compare this results JSON instead of running the suite')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='relative slowdown that counts as a regression (default 0.15)')
+    args = parser.parse_args()
+
+    try:
+        baseline = _load(args.baseline) if args.baseline else None
+        current = _load(args.current) if args.current else run_suite(args.profile, args.only, args.repeat)
+    except (OSError, ValueError) as e:
+        parser.exit(2, f"Error: {e}\n")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+        print(f"Results written to {args.output}", file=sys.stderr)
+
+    if baseline is None:
+        for metric, m in sorted(current['metrics'].items()):
+            print(f"{metric:60s} {m['value']:12.4g} {m['unit']}")
+        return
+
+    if baseline.get('profile') != current.get('profile'):
+        print(f"Warning: comparing a {current.get('profile')} run against a {baseline.get('profile')} baseline",
+              file=sys.stderr)
+    rows = compare(baseline, current, args.threshold)
+    print_comparison(rows, args.threshold)
+    if any(row['regression'] for row in rows):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Row size and decode throughput of stored symptom formats
+
+Compares str()/eval(), JSON and the packed float32 encoding, decoded
+either to dicts or straight into a NumPy matrix.
+
+Run from the project root:
+    python -m benchmarks.symptom_codec_benchmark --rows 20000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from models.disease_predictor import DISEASE_FEATURES
+from models.symptom_codec import encode_symptoms, decode_symptoms, decode_matrix
+
+
+def make_rows(disease_type, n, seed=0):
+    rng = np.random.default_rng(seed)
+    features = DISEASE_FEATURES[disease_type]
+    values = np.round(rng.normal(50, 20, (n, len(features))), 1)
+    return [dict(zip(features, row)) for row in values.tolist()]
+
+
+def throughput(decode, values):
+    start = time.perf_counter()
+    decode(values)
+    return len(values) / (time.perf_counter() - start)
+
+
+def run(disease_type='diabetes', n=20000):
+    rows = make_rows(disease_type, n)
+    formats = {
+        'str_eval': [str(r) for r in rows],
+        'json': [json.dumps(r) for r in rows],
+        'packed': [encode_symptoms(disease_type, r) for r in rows]
+    }
+
+    sizes = {}
+    for name, values in formats.items():
+        sizes[name] = sum(len(v if isinstance(v, bytes) else v.encode('utf-8')) for v in values) / n
+
+    rates = {
+        'str_eval': throughput(lambda vs: [eval(v) for v in vs], formats['str_eval']),
+        'json': throughput(lambda vs: [json.loads(v) for v in vs], formats['json']),
+        'packed_dict': throughput(lambda vs: [decode_symptoms(v) for v in vs], formats['packed']),
+        'packed_matrix': throughput(decode_matrix, formats['packed'])
+    }
+    return {'disease_type': disease_type, 'rows': n, 'mean_row_bytes': sizes, 'decode_rows_per_second': rates}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--disease', default='diabetes')
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    results = run(args.disease, args.rows)
+    print(f"Mean stored size per row ({results['disease_type']}):")
+    for name, size in results['mean_row_bytes'].items():
+        print(f"  {name:14s} {size:8.1f} bytes")
+    print("Decode throughput:")
+    for name, rate in results['decode_rows_per_second'].items():
+        print(f"  {name:14s} {rate:12.0f} rows/s")
+
+
+if __name__ == '__main__':
+    main()
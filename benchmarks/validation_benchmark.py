@@ -0,0 +1,88 @@
+"""Request parsing and feature assembly cost of the compiled schemas against the old per-call code
+
+The old path is what /predict and DiseasePredictor.predict did before
+schemas: a float() per form field with bad values silently turned into
+0.0, then a Python list of the features converted with np.array. The
+new path validates the form straight into a preallocated row.
+
+Run from the project root:
+    python -m benchmarks.validation_benchmark --iterations 5000
+"""
+import argparse
+import time
+
+import numpy as np
+from werkzeug.datastructures import ImmutableMultiDict
+
+from models.disease_predictor import DISEASE_FEATURES, DISEASE_TYPES, SCHEMAS
+
+
+def old_parse(disease_type, form):
+    symptoms = {}
+    for symptom in DISEASE_FEATURES[disease_type]:
+        value = form.get(symptom, '0')
+        try:
+            symptoms[symptom] = float(value)
+        except ValueError:
+            symptoms[symptom] = 0.0
+
+    features = []
+    for feature in DISEASE_FEATURES[disease_type]:
+        features.append(symptoms.get(feature, 0))
+    return np.array(features).reshape(1, -1)
+
+
+def make_form(disease_type, seed=0):
+    """A submitted prediction form: every value a string, as request.form holds them"""
+    rng = np.random.default_rng(seed)
+    schema = SCHEMAS[disease_type]
+    values = {name: f'{rng.uniform(low, high):.1f}' for name, low, high in zip(schema.features, schema.low, schema.high)}
+    return ImmutableMultiDict(dict(values, disease_type=disease_type))
+
+
+def microseconds_per_call(call, iterations, repeats=5):
+    """Best of several timed loops, which filters out scheduling noise"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            call()
+        best = min(best, time.perf_counter() - start)
+    return best / iterations * 1e6
+
+
+def run(iterations=5000):
+    results = {}
+    for disease_type in DISEASE_TYPES:
+        schema = SCHEMAS[disease_type]
+        form = make_form(disease_type)
+        payload = {name: float(value) for name, value in form.items() if name in schema.index}
+        row = schema.new_row()
+
+        # Both paths must produce the same model input for a valid form
+        if not np.array_equal(old_parse(disease_type, form)[0], schema.parse(form, required=True)[0]):
+            raise AssertionError(f'{disease_type}: schema row differs from the old feature array')
+
+        results[disease_type] = {
+            'old_form_us': microseconds_per_call(lambda: old_parse(disease_type, form), iterations),
+            'schema_form_us': microseconds_per_call(lambda: schema.parse(form, out=row, required=True), iterations),
+            'schema_json_us': microseconds_per_call(lambda: schema.parse(payload, out=row), iterations),
+            'schema_assemble_us': microseconds_per_call(lambda: schema.assemble(payload, out=row), iterations)
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=5000)
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    print(f"{'disease':16s} {'old form':>10s} {'schema form':>12s} {'schema json':>12s} {'assemble':>10s}  (us per request)")
+    for disease_type, r in results.items():
+        print(f"{disease_type:16s} {r['old_form_us']:10.2f} {r['schema_form_us']:12.2f} "
+              f"{r['schema_json_us']:12.2f} {r['schema_assemble_us']:10.2f}")
+
+
+if __name__ == '__main__':
+    main()
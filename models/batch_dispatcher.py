@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from models.disease_predictor import DISEASE_TYPES, SCHEMAS, parse_symptoms
+
+# Upper bounds (in rows) of the batch size histogram buckets
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+class MicroBatchDispatcher:
+    """Coalesce concurrent single predictions into one predict_batch call per disease"""
+
+    def __init__(self, predictor, max_batch_size=32, max_wait_ms=2.0):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queues = {}
+        self._workers = {}
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.requests = 0
+        self.batches = 0
+        self.requests_batched = 0
+        self.batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def submit(self, disease_type, symptoms):
+        """Queue one prediction and return a Future that resolves to its result"""
+        if disease_type not in DISEASE_TYPES:
+            # Unknown diseases never reach a queue; predict() reports the error
+            future = Future()
+            future.set_result(self.predictor.predict(disease_type, symptoms))
+            return future
+
+        # Invalid symptoms are answered at once, like predict() answers them
+        features, errors = parse_symptoms(SCHEMAS[disease_type], symptoms)
+        if errors:
+            future = Future()
+            future.set_result(self.predictor.predict(disease_type, symptoms))
+            return future
+        return self.submit_row(disease_type, features)
+
+    def submit_row(self, disease_type, features):
+        """Queue a feature row already validated by the disease's schema
+
+        Rows with a memoized result are answered at once without queueing.
+        """
+        future = Future()
+        cached = self.predictor.cached_result(disease_type, features)
+        if cached is not None:
+            future.set_result(cached)
+            return future
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('Dispatcher is closed')
+            if disease_type not in self._queues:
+                self._queues[disease_type] = deque()
+                worker = threading.Thread(target=self._run, args=(disease_type,),
+                                          name=f'predict-batcher-{disease_type}', daemon=True)
+                self._workers[disease_type] = worker
+                worker.start()
+            self._queues[disease_type].append((features, future, time.perf_counter()))
+            self.requests += 1
+            self._cond.notify_all()
+        return future
+
+    def predict(self, disease_type, symptoms, timeout=None):
+        """Blocking equivalent of DiseasePredictor.predict"""
+        return self.submit(disease_type, symptoms).result(timeout)
+
+    def predict_row(self, disease_type, features, timeout=None):
+        """Blocking equivalent of DiseasePredictor.predict_row"""
+        return self.submit_row(disease_type, features).result(timeout)
+
+    def close(self):
+        """Flush queued requests and stop the worker threads"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for worker in list(self._workers.values()):
+            worker.join()
+
+    def stats(self):
+        with self._cond:
+            histogram = {}
+            cumulative = 0
+            for bound, count in zip(BATCH_SIZE_BUCKETS + ['+Inf'], self.batch_size_counts):
+                cumulative += count
+                histogram[str(bound)] = cumulative
+            return {
+                'queue_depth': {disease: len(queue) for disease, queue in self._queues.items()},
+                'requests': self.requests,
+                'batches': self.batches,
+                'mean_batch_size': self.requests_batched / self.batches if self.batches else 0.0,
+                'batch_size_histogram': histogram,
+                'mean_added_latency_ms': 1000 * self.wait_seconds_total / self.requests_batched if self.requests_batched else 0.0,
+                'max_added_latency_ms': 1000 * self.wait_seconds_max,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': 1000 * self.max_wait
+            }
+
+    def _run(self, disease_type):
+        queue = self._queues[disease_type]
+        while True:
+            with self._cond:
+                while not queue and not self._closed:
+                    self._cond.wait()
+                if not queue:
+                    return
+
+                # Hold the batch open until it is full or its oldest request has waited long enough
+                deadline = queue[0][2] + self.max_wait
+                while len(queue) < self.max_batch_size and not self._closed:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = [queue.popleft() for _ in range(min(len(queue), self.max_batch_size))]
+                self._record_batch(batch)
+
+            self._execute(disease_type, batch)
+
+    def _record_batch(self, batch):
+        now = time.perf_counter()
+        self.batches += 1
+        self.requests_batched += len(batch)
+        for _, _, enqueued_at in batch:
+            waited = now - enqueued_at
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        for i, bound in enumerate(BATCH_SIZE_BUCKETS):
+            if len(batch) <= bound:
+                self.batch_size_counts[i] += 1
+                break
+        else:
+            self.batch_size_counts[-1] += 1
+
+    def _execute(self, disease_type, batch):
+        version = self.predictor.model_versions.get(disease_type, 0)
+        features = np.vstack([row for row, _, _ in batch])
+        try:
+            results = self.predictor.predict_rows(disease_type, features)
+        except Exception as e:
+            # One dict per request, so callers can't see each other's edits
+            results = [{
+                'prediction': 'Error in prediction',
+                'confidence': 0.0,
+                'risk_level': 'Unknown',
+                'error': str(e)
+            } for _ in batch]
+        else:
+            self.predictor.cache_results(disease_type, version, features, results)
+
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
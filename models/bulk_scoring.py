@@ -0,0 +1,287 @@
+"""Score a CSV or Parquet file of patients for one disease, chunk by chunk
+
+Run from the project root:
+    python -m models.bulk_scoring diabetes patients.csv scored.csv --chunk-size 50000 --workers 4
+
+Input columns are matched to the disease's features by name (case-insensitive)
+or through --map feature=column. Missing features and empty cells score as 0,
+like a blank form field; rows with non-numeric values, or values outside the
+disease's schema ranges, get an error instead of a prediction. Every input
+column is copied to the output followed by prediction, confidence and
+risk_level. Only a few chunks are held in memory at any time, so memory use
+depends on --chunk-size, not on the file size.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from models.disease_predictor import BACKENDS, DiseasePredictor, DISEASE_TYPES, DISEASE_FEATURES, RESULT_LABELS, SCHEMAS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Chunks submitted ahead of the writer per worker process
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+_worker_predictor = None
+
+
+def read_chunks(path, chunk_size):
+    """Yield DataFrames of at most chunk_size rows from a CSV or Parquet file"""
+    if _is_parquet(path):
+        pa, pq = _require_pyarrow()
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file
+
+    CSV chunks arrive already serialized (see score_chunk), so the
+    writer only appends text; Parquet chunks arrive as DataFrames.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = _is_parquet(path)
+        self._writer = None
+        self._file = None
+        if self.parquet:
+            _require_pyarrow()
+
+    def write(self, payload):
+        if self.parquet:
+            pa, pq = _require_pyarrow()
+            table = pa.Table.from_pandas(payload, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            if self._file is None:
+                self._file = open(self.path, 'w', newline='', encoding='utf-8')
+            self._file.write(payload)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def resolve_columns(disease, columns, mapping=None):
+    """Input column for every feature of a disease, or None where the input lacks it"""
+    mapping = dict(mapping or {})
+    unknown = sorted(set(mapping) - set(DISEASE_FEATURES[disease]))
+    if unknown:
+        raise ValueError(f"Unknown feature(s) for {disease}: {', '.join(unknown)}")
+    by_name = {str(column).strip().lower(): column for column in columns}
+    resolved = []
+    for feature in DISEASE_FEATURES[disease]:
+        if feature in mapping:
+            if mapping[feature] not in columns:
+                raise ValueError(f"Column {mapping[feature]} (mapped to {feature}) is not in the input")
+            resolved.append(mapping[feature])
+        else:
+            resolved.append(by_name.get(feature))
+    return resolved
+
+
+def feature_matrix(frame, columns, schema=None):
+    """Float matrix in feature order plus a mask of rows holding invalid values
+
+    Non-numeric values are always invalid; with a schema, so are values
+    outside its feature ranges, as FeatureSchema.parse rejects them.
+    """
+    features = np.zeros((len(frame), len(columns)))
+    invalid = np.zeros(len(frame), dtype=bool)
+    for j, column in enumerate(columns):
+        if column is None:
+            continue
+        raw = frame[column]
+        values = pd.to_numeric(raw, errors='coerce').to_numpy(dtype=np.float64)
+        bad = np.isnan(values)
+        # Empty cells count as 0; anything else that isn't a number is an error
+        invalid |= bad & raw.notna().to_numpy()
+        features[:, j] = np.where(bad, 0.0, values)
+    if schema is not None:
+        invalid |= ((features < schema.low) | (features > schema.high)).any(axis=1)
+    return features, invalid
+
+
+def score_matrix(predictor, disease, features, invalid):
+    """Prediction, confidence (percent) and risk level columns for a feature matrix"""
+    predictions = np.full(len(features), 'Error in prediction', dtype=object)
+    confidences = np.zeros(len(features))
+    risk_levels = np.full(len(features), 'Unknown', dtype=object)
+
+    valid = ~invalid
+    if valid.any():
+        probabilities = predictor.predict_proba_matrix(disease, features[valid])
+        labels = probabilities.argmax(axis=1)
+        confidence = probabilities.max(axis=1)
+        # Same wording and thresholds as DiseasePredictor._format_result
+        predictions[valid] = np.asarray(RESULT_LABELS.get(disease, ['Negative', 'Positive']), dtype=object)[labels]
+        confidences[valid] = np.round(confidence * 100, 2)
+        risk_levels[valid] = np.select([confidence > 0.7, confidence > 0.5], ['High', 'Medium'], 'Low')
+    return predictions, confidences, risk_levels
+
+
+def score_chunk(predictor, disease, frame, columns, as_csv=True, header=False):
+    """Score one input chunk; returns (output payload, rows, rows with errors)
+
+    Serializing CSV here rather than in the writer lets worker processes
+    share the formatting cost, which dominates for wide files.
+    """
+    features, invalid = feature_matrix(frame, columns, SCHEMAS[disease])
+    predictions, confidences, risk_levels = score_matrix(predictor, disease, features, invalid)
+    frame = frame.assign(prediction=predictions, confidence=confidences, risk_level=risk_levels)
+    payload = frame.to_csv(index=False, header=header) if as_csv else frame
+    return payload, len(frame), int(invalid.sum())
+
+
+def _init_worker(models_dir, backend):
+    global _worker_predictor
+    _worker_predictor = DiseasePredictor(models_dir=models_dir, backend=backend, result_cache_size=0)
+
+
+def _score_in_worker(disease, frame, columns, as_csv, header):
+    return score_chunk(_worker_predictor, disease, frame, columns, as_csv, header)
+
+
+def score_file(disease, input_path, output_path, models_dir='saved_models', chunk_size=50000,
+               workers=1, backend='sklearn', mapping=None, progress=True):
+    """Stream input_path through one disease model into output_path and return run statistics"""
+    if disease not in DISEASE_TYPES:
+        raise ValueError(f"Unknown disease type: {disease}")
+    start = time.perf_counter()
+    stats = {'rows': 0, 'errors': 0, 'chunks': 0}
+
+    # Load (or train and save) the model once up front so workers only ever load it
+    predictor = DiseasePredictor(models_dir=models_dir, backend=backend, result_cache_size=0)
+    predictor.get_model(disease)
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(models_dir, backend))
+
+    writer = ChunkWriter(output_path)
+    pending = deque()
+    columns = None
+
+    def write_next():
+        result = pending.popleft()
+        payload, rows, errors = result.result() if pool else result
+        writer.write(payload)
+        stats['rows'] += rows
+        stats['errors'] += errors
+        stats['chunks'] += 1
+        if progress:
+            elapsed = time.perf_counter() - start
+            print(f"  {stats['rows']} rows scored ({stats['rows'] / elapsed:.0f} rows/s)", file=sys.stderr)
+
+    try:
+        for frame in read_chunks(input_path, chunk_size):
+            if columns is None:
+                columns = resolve_columns(disease, list(frame.columns), mapping)
+                missing = [f for f, c in zip(DISEASE_FEATURES[disease], columns) if c is None]
+                if missing and progress:
+                    print(f"  No input column for {', '.join(missing)}; scoring them as 0", file=sys.stderr)
+            args = (disease, frame, columns, not writer.parquet, stats['chunks'] + len(pending) == 0)
+
+            if pool:
+                # Bound the chunks held in memory while workers catch up
+                while len(pending) >= workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                    write_next()
+                pending.append(pool.submit(_score_in_worker, *args))
+            else:
+                pending.append(score_chunk(predictor, *args))
+                write_next()
+        while pending:
+            write_next()
+    finally:
+        writer.close()
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    stats['seconds'] = time.perf_counter() - start
+    stats['rows_per_second'] = stats['rows'] / stats['seconds'] if stats['seconds'] else 0.0
+    stats['peak_rss_mb'] = peak_rss_mb()
+    return stats
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its largest finished child, in MB"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    unit = 1 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit
+    return {'main': own / 2**20, 'workers': children / 2**20}
+
+
+def _require_pyarrow():
+    # Parquet support is optional; CSV needs nothing beyond pandas
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('Parquet files require pyarrow (pip install pyarrow)')
+    return pa, pq
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+
+
+def _parse_mapping(items):
+    mapping = {}
+    for item in items:
+        feature, sep, column = item.partition('=')
+        if not sep or not feature or not column:
+            raise ValueError(f"Expected feature=column, got {item}")
+        mapping[feature] = column
+    return mapping
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('disease', choices=DISEASE_TYPES)
+    parser.add_argument('input', help='.csv or .parquet file of patients')
+    parser.add_argument('output', help='.csv or .parquet file to write')
+    parser.add_argument('--models-dir', default='saved_models')
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--workers', type=int, default=1, help='worker processes scoring chunks')
+    # The native libraries beat the compiled tables once chunks reach thousands of rows
+    parser.add_argument('--backend', choices=BACKENDS, default='sklearn')
+    parser.add_argument('--map', action='append', default=[], metavar='FEATURE=COLUMN',
+                        help='read a feature from a differently named column (repeatable)')
+    args = parser.parse_args()
+
+    try:
+        mapping = _parse_mapping(args.map)
+        stats = score_file(args.disease, args.input, args.output, args.models_dir, args.chunk_size,
+                           args.workers, args.backend, mapping)
+    except (OSError, ValueError, RuntimeError) as e:
+        parser.exit(1, f"Error: {e}\n")
+
+    print(f"Scored {stats['rows']} rows in {stats['chunks']} chunks ({stats['errors']} with errors) "
+          f"in {stats['seconds']:.2f}s: {stats['rows_per_second']:.0f} rows/s")
+    rss = stats['peak_rss_mb']
+    if rss is not None:
+        print(f"Peak RSS: {rss['main']:.1f} MB main process, {rss['workers']:.1f} MB largest worker")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
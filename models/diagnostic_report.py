@@ -1,108 +1,427 @@
-import sqlite3
-from datetime import datetime
+import base64
+import os
+from datetime import datetime, timedelta
+from models.storage import ReportStorage
+from models.symptom_codec import encode_symptoms, decode_symptoms
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+RISK_LEVELS = ('Low', 'Medium', 'High')
+
+# Rows pulled from the database per fetch while streaming reports
+STREAM_BATCH_SIZE = 1000
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Single report store shared by /predict, /report/<id> and the dashboard,
+# kept next to the users table
+DEFAULT_DB_PATH = os.environ.get('DIAGNOSAI_REPORTS_DB', os.path.join(PROJECT_ROOT, 'database', 'diagnosai.db'))
+
+# Reports the write-behind writer could not commit, for models.replay_reports
+DEFAULT_DEAD_LETTER_PATH = os.environ.get(
+    'DIAGNOSAI_REPORT_DEAD_LETTER', os.path.join(os.path.dirname(DEFAULT_DB_PATH), 'report_dead_letter.jsonl')
+)
+
+# Statements are kept as constants so each connection's statement cache reuses them
+CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS diagnostic_reports (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        disease_type TEXT NOT NULL,
+        symptoms TEXT NOT NULL,
+        prediction_result TEXT NOT NULL,
+        confidence REAL NOT NULL,
+        risk_level TEXT NOT NULL,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        user_id INTEGER
+    )
+'''
+
+CREATE_INDEXES_SQL = [
+    'CREATE INDEX IF NOT EXISTS idx_reports_timestamp ON diagnostic_reports (timestamp DESC, id DESC)',
+    'CREATE INDEX IF NOT EXISTS idx_reports_risk_level ON diagnostic_reports (risk_level)',
+    'CREATE INDEX IF NOT EXISTS idx_reports_disease_type ON diagnostic_reports (disease_type, timestamp DESC)',
+    'CREATE INDEX IF NOT EXISTS idx_reports_user_timestamp ON diagnostic_reports (user_id, timestamp DESC, id DESC)',
+    'CREATE INDEX IF NOT EXISTS idx_reports_user_risk_level ON diagnostic_reports (user_id, risk_level)'
+]
+
+REPORT_COLUMNS = 'id, disease_type, symptoms, prediction_result, confidence, risk_level, timestamp, user_id'
+
+INSERT_SQL = '''
+    INSERT INTO diagnostic_reports 
+    (disease_type, symptoms, prediction_result, confidence, risk_level, timestamp, user_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Used when the id was reserved up front (write-behind mode, migrations)
+INSERT_WITH_ID_SQL = '''
+    INSERT INTO diagnostic_reports 
+    (disease_type, symptoms, prediction_result, confidence, risk_level, timestamp, user_id, id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Report counts and confidence totals, kept up to date on every insert so
+# dashboard totals never scan reports: report_stats holds all-time totals per
+# user, disease and risk level, report_daily_stats splits them by day for trends.
+# Reports without a user are counted under user_id 0.
+STATS_TABLES = {
+    'report_stats': ('user_id', 'disease_type', 'risk_level'),
+    'report_daily_stats': ('user_id', 'day', 'disease_type', 'risk_level')
+}
+
+# How each key column is derived from a diagnostic_reports row
+STATS_KEY_SQL = {
+    'user_id': 'COALESCE(user_id, 0)',
+    'day': 'substr(timestamp, 1, 10)',
+    'disease_type': 'disease_type',
+    'risk_level': 'risk_level'
+}
+
+
+def _stats_sql(table):
+    """CREATE, upsert and rebuild statements for one aggregate table"""
+    keys = STATS_TABLES[table]
+    columns = ', '.join(keys)
+    key_types = ''.join(f"{key} {'INTEGER' if key == 'user_id' else 'TEXT'} NOT NULL, " for key in keys)
+    create = f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            {key_types}report_count INTEGER NOT NULL,
+            confidence_sum REAL NOT NULL,
+            PRIMARY KEY ({columns})
+        )
+    '''
+    upsert = f'''
+        INSERT INTO {table} ({columns}, report_count, confidence_sum)
+        VALUES ({', '.join('?' * (len(keys) + 2))})
+        ON CONFLICT ({columns}) DO UPDATE SET
+            report_count = report_count + excluded.report_count,
+            confidence_sum = confidence_sum + excluded.confidence_sum
+    '''
+    rebuild = f'''
+        INSERT INTO {table} ({columns}, report_count, confidence_sum)
+        SELECT {', '.join(STATS_KEY_SQL[key] for key in keys)}, COUNT(*), SUM(confidence)
+        FROM diagnostic_reports
+        GROUP BY {', '.join(str(i + 1) for i in range(len(keys)))}
+    '''
+    return create, upsert, rebuild
+
+
+STATS_SQL = {table: _stats_sql(table) for table in STATS_TABLES}
+
+SELECT_ALL_SQL = f'''
+    SELECT {REPORT_COLUMNS}
+    FROM diagnostic_reports 
+    ORDER BY timestamp DESC
+'''
+
+SELECT_BY_ID_SQL = f'''
+    SELECT {REPORT_COLUMNS}
+    FROM diagnostic_reports 
+    WHERE id = ?
+'''
 
 class DiagnosticReport:
+    storage = ReportStorage(DEFAULT_DB_PATH)
+
     def __init__(self, id=None, disease_type=None, symptoms=None, prediction_result=None, 
-                 confidence=None, risk_level=None, timestamp=None):
+                 confidence=None, risk_level=None, timestamp=None, user_id=None):
         self.id = id
+        self.user_id = user_id
         self.disease_type = disease_type
-        self.symptoms = symptoms or {}
+        self._symptoms = symptoms or {}
+        self._raw_symptoms = None
         self.prediction_result = prediction_result
         self.confidence = confidence
         self.risk_level = risk_level
-        self.timestamp = timestamp or datetime.now()
+        # Stored in UTC, like SQLite's CURRENT_TIMESTAMP, so days bucket the same in every process
+        self.timestamp = timestamp or datetime.utcnow()
     
-    @staticmethod
-    def create_table():
-        """Create the diagnostic_reports table if it doesn't exist"""
-        conn = sqlite3.connect('diagnosai.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS diagnostic_reports (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                disease_type TEXT NOT NULL,
-                symptoms TEXT NOT NULL,
-                prediction_result TEXT NOT NULL,
-                confidence REAL NOT NULL,
-                risk_level TEXT NOT NULL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn.commit()
-        conn.close()
+    @property
+    def symptoms(self):
+        # Stored symptoms are only decoded when a caller actually looks at them
+        if self._raw_symptoms is not None:
+            self._symptoms = decode_symptoms(self._raw_symptoms)
+            self._raw_symptoms = None
+        return self._symptoms
+    
+    @symptoms.setter
+    def symptoms(self, value):
+        self._symptoms = value or {}
+        self._raw_symptoms = None
+    
+    @classmethod
+    def create_table(cls):
+        """Create the diagnostic_reports table and its indexes if they don't exist"""
+        with cls.storage.transaction() as conn:
+            conn.execute(CREATE_TABLE_SQL)
+            # Tables created before reports were tied to users lack user_id
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(diagnostic_reports)')]
+            if 'user_id' not in columns:
+                conn.execute('ALTER TABLE diagnostic_reports ADD COLUMN user_id INTEGER')
+            for sql in CREATE_INDEXES_SQL:
+                conn.execute(sql)
+            
+            # Backfill the aggregates the first time they are created
+            for table, (create_sql, _, rebuild_sql) in STATS_SQL.items():
+                exists = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+                ).fetchone()
+                conn.execute(create_sql)
+                if not exists:
+                    conn.execute(rebuild_sql)
+    
+    @classmethod
+    def rebuild_stats(cls):
+        """Recompute the aggregate tables from all reports, returning the number of daily groups"""
+        with cls.storage.transaction() as conn:
+            for table, (create_sql, _, rebuild_sql) in STATS_SQL.items():
+                conn.execute(create_sql)
+                conn.execute(f'DELETE FROM {table}')
+                conn.execute(rebuild_sql)
+            return conn.execute('SELECT COUNT(*) FROM report_daily_stats').fetchone()[0]
     
     def save(self):
         """Save the report to database"""
-        conn = sqlite3.connect('diagnosai.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO diagnostic_reports 
-            (disease_type, symptoms, prediction_result, confidence, risk_level, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            self.disease_type,
-            str(self.symptoms),
-            self.prediction_result,
-            self.confidence,
-            self.risk_level,
-            self.timestamp
-        ))
-        self.id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        with self.storage.transaction() as conn:
+            row = self._insert(conn)
+            self._add_stats(conn, [row])
         return self.id
     
+    @classmethod
+    def save_many(cls, reports):
+        """Save several reports in a single transaction, returning their ids"""
+        with cls.storage.transaction() as conn:
+            cls._add_stats(conn, [report._insert(conn) for report in reports])
+        return [report.id for report in reports]
+    
     @staticmethod
-    def get_all():
+    def _add_stats(conn, rows):
+        # Fold a batch into one upsert per group; it commits with the reports themselves
+        daily = {}
+        for disease_type, _, _, confidence, risk_level, timestamp, user_id in rows:
+            key = (user_id or 0, str(timestamp)[:10], disease_type, risk_level)
+            count, total = daily.get(key, (0, 0.0))
+            daily[key] = (count + 1, total + confidence)
+        
+        totals = {}
+        for (user_id, _, disease_type, risk_level), (count, total) in daily.items():
+            key = (user_id, disease_type, risk_level)
+            previous_count, previous_total = totals.get(key, (0, 0.0))
+            totals[key] = (previous_count + count, previous_total + total)
+        
+        conn.executemany(STATS_SQL['report_daily_stats'][1], [key + value for key, value in daily.items()])
+        conn.executemany(STATS_SQL['report_stats'][1], [key + value for key, value in totals.items()])
+    
+    @classmethod
+    def get_all(cls):
         """Get all diagnostic reports"""
-        conn = sqlite3.connect('diagnosai.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id, disease_type, symptoms, prediction_result, confidence, risk_level, timestamp
-            FROM diagnostic_reports 
-            ORDER BY timestamp DESC
-        ''')
-        rows = cursor.fetchall()
-        conn.close()
+        rows = cls.storage.connection().execute(SELECT_ALL_SQL).fetchall()
+        return [cls._from_row(row) for row in rows]
+    
+    @classmethod
+    def get_page(cls, limit=20, cursor=None, user_id=None, disease_type=None, risk_level=None, since=None, until=None):
+        """Get one page of matching reports, newest first, and the cursor for the next page"""
+        sql, params = cls._select_sql(cursor, user_id, disease_type, risk_level, since, until)
+        # Fetch one extra row to know whether another page follows
+        rows = cls.storage.connection().execute(f'{sql} LIMIT ?', params + [limit + 1]).fetchall()
+        
+        next_cursor = encode_cursor(rows[limit - 1][6], rows[limit - 1][0]) if len(rows) > limit else None
+        return [cls._from_row(row) for row in rows[:limit]], next_cursor
+    
+    @classmethod
+    def iter_reports(cls, cursor=None, user_id=None, disease_type=None, risk_level=None, since=None, until=None,
+                     batch_size=STREAM_BATCH_SIZE):
+        """Iterate over every matching report, newest first, with constant memory
+
+        Rows come from one server-side cursor on a snapshot connection,
+        batch_size at a time, so the iteration sees the table as it was when
+        it started. A malformed cursor raises ValueError here rather than
+        partway through the iteration.
+        """
+        sql, params = cls._select_sql(cursor, user_id, disease_type, risk_level, since, until)
+        return cls._stream(sql, params, batch_size)
+    
+    @classmethod
+    def _stream(cls, sql, params, batch_size):
+        with cls.storage.snapshot() as conn:
+            rows = conn.execute(sql, params)
+            while True:
+                batch = rows.fetchmany(batch_size)
+                if not batch:
+                    break
+                for row in batch:
+                    yield cls._from_row(row)
+    
+    @classmethod
+    def _select_sql(cls, cursor=None, user_id=None, disease_type=None, risk_level=None, since=None, until=None):
+        """Query for matching reports after a cursor, in (timestamp, id) order so the indexes avoid a sort"""
+        conditions, params = cls._filters(user_id, disease_type, risk_level, since, until)
+        if cursor:
+            conditions.append('(timestamp, id) < (?, ?)')
+            params.extend(decode_cursor(cursor))
         
-        reports = []
-        for row in rows:
-            report = DiagnosticReport(
-                id=row[0],
-                disease_type=row[1],
-                symptoms=eval(row[2]) if row[2] else {},
-                prediction_result=row[3],
-                confidence=row[4],
-                risk_level=row[5],
-                timestamp=datetime.strptime(row[6], '%Y-%m-%d %H:%M:%S') if row[6] else None
-            )
-            reports.append(report)
-        return reports
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return f'SELECT {REPORT_COLUMNS} FROM diagnostic_reports {where} ORDER BY timestamp DESC, id DESC', params
     
     @staticmethod
-    def get_by_id(report_id):
-        """Get a report by ID"""
-        conn = sqlite3.connect('diagnosai.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id, disease_type, symptoms, prediction_result, confidence, risk_level, timestamp
-            FROM diagnostic_reports 
-            WHERE id = ?
-        ''', (report_id,))
-        row = cursor.fetchone()
-        conn.close()
+    def _filters(user_id=None, disease_type=None, risk_level=None, since=None, until=None):
+        """WHERE conditions and parameters for report filters; since and until are inclusive dates"""
+        conditions, params = [], []
+        if user_id is not None:
+            conditions.append('user_id = ?')
+            params.append(user_id)
+        if disease_type is not None:
+            conditions.append('disease_type = ?')
+            params.append(disease_type)
+        if risk_level is not None:
+            conditions.append('risk_level = ?')
+            params.append(risk_level)
+        # Timestamps are stored as text, so whole days compare as string prefixes
+        if since is not None:
+            conditions.append('timestamp >= ?')
+            params.append(since.strftime('%Y-%m-%d'))
+        if until is not None:
+            conditions.append('timestamp < ?')
+            params.append((until + timedelta(days=1)).strftime('%Y-%m-%d'))
+        return conditions, params
+    
+    @classmethod
+    def count(cls, risk_level=None, user_id=None):
+        """Count reports, optionally only those of one user or risk level"""
+        conditions, params = cls._filters(user_id=user_id, risk_level=risk_level)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return cls.storage.connection().execute(f'SELECT COUNT(*) FROM diagnostic_reports {where}', params).fetchone()[0]
+    
+    @classmethod
+    def summary(cls, user_id=None):
+        """Report totals by risk level and disease, read from the aggregates instead of the reports"""
+        where, params = ('WHERE user_id = ?', (user_id,)) if user_id is not None else ('', ())
+        rows = cls.storage.connection().execute(f'''
+            SELECT disease_type, risk_level, SUM(report_count), SUM(confidence_sum)
+            FROM report_stats {where}
+            GROUP BY disease_type, risk_level
+        ''', params).fetchall()
+        
+        summary = {'total': 0, 'mean_confidence': None, 'by_risk_level': {}, 'by_disease': {}}
+        confidence_total = 0.0
+        for disease_type, risk_level, count, confidence_sum in rows:
+            summary['total'] += count
+            confidence_total += confidence_sum
+            summary['by_risk_level'][risk_level] = summary['by_risk_level'].get(risk_level, 0) + count
+            disease = summary['by_disease'].setdefault(disease_type, {'count': 0, 'confidence_sum': 0.0})
+            disease['count'] += count
+            disease['confidence_sum'] += confidence_sum
         
+        for disease in summary['by_disease'].values():
+            disease['mean_confidence'] = round(disease.pop('confidence_sum') / disease['count'], 2)
+        if summary['total']:
+            summary['mean_confidence'] = round(confidence_total / summary['total'], 2)
+        return summary
+    
+    @classmethod
+    def daily_stats(cls, user_id=None, since=None):
+        """Per-day report counts and mean confidence by disease and risk level, oldest first"""
+        conditions, params = [], []
+        if user_id is not None:
+            conditions.append('user_id = ?')
+            params.append(user_id)
+        if since is not None:
+            conditions.append('day >= ?')
+            params.append(since.strftime('%Y-%m-%d') if isinstance(since, datetime) else since)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        rows = cls.storage.connection().execute(f'''
+            SELECT day, disease_type, risk_level, SUM(report_count), SUM(confidence_sum)
+            FROM report_daily_stats {where}
+            GROUP BY day, disease_type, risk_level
+            ORDER BY day, disease_type, risk_level
+        ''', params).fetchall()
+        return [
+            {'day': day, 'disease_type': disease_type, 'risk_level': risk_level,
+             'count': count, 'mean_confidence': round(confidence_sum / count, 2)}
+            for day, disease_type, risk_level, count, confidence_sum in rows
+        ]
+    
+    @classmethod
+    def get_by_id(cls, report_id):
+        """Get a report by ID"""
+        row = cls.storage.connection().execute(SELECT_BY_ID_SQL, (report_id,)).fetchone()
         if row:
-            return DiagnosticReport(
-                id=row[0],
-                disease_type=row[1],
-                symptoms=eval(row[2]) if row[2] else {},
-                prediction_result=row[3],
-                confidence=row[4],
-                risk_level=row[5],
-                timestamp=datetime.strptime(row[6], '%Y-%m-%d %H:%M:%S') if row[6] else None
-            )
+            return cls._from_row(row)
         return None
+    
+    def to_dict(self):
+        """JSON-serializable fields of the report"""
+        return {
+            'id': self.id,
+            'timestamp': self.timestamp.strftime(TIMESTAMP_FORMAT) if isinstance(self.timestamp, datetime) else self.timestamp,
+            'disease_type': self.disease_type,
+            'prediction_result': self.prediction_result,
+            'confidence': self.confidence,
+            'risk_level': self.risk_level,
+            'symptoms': self.symptoms
+        }
+    
+    def to_record(self):
+        """Every stored field, JSON-serializable; DiagnosticReport(**record) rebuilds the report"""
+        return dict(self.to_dict(), user_id=self.user_id)
+    
+    @classmethod
+    def existing_ids(cls, report_ids):
+        """The subset of report_ids already stored"""
+        report_ids = list(report_ids)
+        if not report_ids:
+            return set()
+        placeholders = ', '.join('?' * len(report_ids))
+        rows = cls.storage.connection().execute(
+            f'SELECT id FROM diagnostic_reports WHERE id IN ({placeholders})', report_ids).fetchall()
+        return {row[0] for row in rows}
+    
+    def _insert(self, conn):
+        row = self._row()
+        if self.id is None:
+            self.id = conn.execute(INSERT_SQL, row).lastrowid
+        else:
+            conn.execute(INSERT_WITH_ID_SQL, row + (self.id,))
+        return row
+    
+    def _row(self):
+        return (
+            self.disease_type,
+            encode_symptoms(self.disease_type, self.symptoms),
+            self.prediction_result,
+            self.confidence,
+            self.risk_level,
+            self.timestamp.strftime(TIMESTAMP_FORMAT) if isinstance(self.timestamp, datetime) else self.timestamp,
+            self.user_id
+        )
+    
+    @classmethod
+    def _from_row(cls, row):
+        report = cls(
+            id=row[0],
+            disease_type=row[1],
+            prediction_result=row[3],
+            confidence=row[4],
+            risk_level=row[5],
+            timestamp=datetime.fromisoformat(row[6]) if row[6] else None,
+            user_id=row[7]
+        )
+        report._raw_symptoms = row[2]
+        return report
+
+
+def encode_cursor(timestamp, report_id):
+    """Opaque pagination cursor for the position of a report"""
+    return base64.urlsafe_b64encode(f'{timestamp}|{report_id}'.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor, raising ValueError for malformed cursors"""
+    try:
+        timestamp, report_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').rsplit('|', 1)
+        return timestamp, int(report_id)
+    except (UnicodeError, ValueError, TypeError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
 
 # Create table when module is imported
-DiagnosticReport.create_table()
\ No newline at end of file
+DiagnosticReport.create_table()
@@ -5,98 +5,514 @@ from xgboost import XGBClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 import joblib
+import hashlib
+import json
 import os
+import pickle
+import time
+import sklearn
+import threading
+import xgboost
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from models.fast_inference import CompiledForest, compile_model, parity_error
+from models.metrics import MODEL_LOAD_SECONDS, MODEL_RELOAD_SECONDS, PREDICTIONS, PREDICTION_ERRORS, STAGE_SECONDS, disease_label
+from models.model_cache import ModelCache
+from models.model_loader import ModelLoader
+from models.prediction_cache import PredictionCache
+from models.schemas import DISEASE_FEATURES, DISEASE_TYPES, FeatureSchema
+
+# Bump whenever the training data or model setup changes so that
+# persisted artifacts are rebuilt instead of loaded
+MODEL_VERSION = 2
+
+# Base seed combined with the disease name into a per-disease training seed
+BASE_SEED = 42
+
+# Largest predict_proba difference allowed between the compiled and reference backends
+PARITY_TOLERANCE = 1e-5
+
+# 'sklearn' calls the fitted estimators, 'compiled' walks array-backed copies
+# of their trees, and 'mmap' memory-maps those tables from models_dir so every
+# worker process shares one copy instead of holding its own models
+BACKENDS = ('sklearn', 'compiled', 'mmap')
+
+RESULT_LABELS = {
+    'diabetes': ['No Diabetes', 'Diabetes Detected'],
+    'covid': ['COVID Negative', 'COVID Positive'],
+    'pneumonia': ['No Pneumonia', 'Pneumonia Detected'],
+    'kidney_disease': ['Healthy Kidneys', 'Kidney Disease Detected'],
+    'breast_cancer': ['Benign', 'Malignant Tumor'],
+    'alzheimer': ['No Alzheimer', 'Alzheimer Detected'],
+    'brain_tumor': ['No Tumor', 'Brain Tumor Detected'],
+    'hepatitis_c': ['No Hepatitis C', 'Hepatitis C Detected']
+}
+
+# Compiled input schema per disease: feature order, ranges and result labels
+SCHEMAS = {disease: FeatureSchema(disease, DISEASE_FEATURES[disease], RESULT_LABELS[disease])
+           for disease in DISEASE_TYPES}
+
+# Every feature of every disease, so screen() validates shared symptoms once,
+# and where each disease's features sit in its rows
+SCREEN_SCHEMA = FeatureSchema('screen', sorted({f for features in DISEASE_FEATURES.values() for f in features}), ())
+SCREEN_COLUMNS = {disease: np.array([SCREEN_SCHEMA.index[f] for f in DISEASE_FEATURES[disease]])
+                  for disease in DISEASE_TYPES}
+
+def parse_symptoms(schema, symptoms, out=None):
+    """FeatureSchema.parse for untrusted input, which may not be a mapping at all"""
+    if not hasattr(symptoms, 'get'):
+        return None, [{'field': None, 'code': 'invalid', 'message': 'Symptoms must be an object of symptom values'}]
+    return schema.parse(symptoms, out=out)
+
+def disease_seed(disease, base_seed=BASE_SEED):
+    """Deterministic training seed for a disease, independent of training order"""
+    return (zlib.crc32(disease.encode('utf-8')) ^ base_seed) & 0x7fffffff
 
 class DiseasePredictor:
-    def __init__(self):
-        self.models = {}
-        self.scalers = {}
-        self.initialize_models()
+    def __init__(self, models_dir='saved_models', lazy=True, max_models=None, max_bytes=None,
+                 backend='sklearn', result_cache_size=4096, result_cache_ttl=300):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend {backend}")
+        self.backend = backend
+        self.model_info = {}
+        # Bumped every time a disease's model is (re)loaded or retrained
+        self.model_versions = {}
+        self.result_cache = PredictionCache(result_cache_size, result_cache_ttl) if result_cache_size else None
+        # Explanations are memoized the same way, keyed by the input vector
+        self.explanation_cache = PredictionCache(result_cache_size, result_cache_ttl) if result_cache_size else None
+        # Compiled trees used to explain models served by the sklearn backend, by disease
+        self._explainers = {}
+        # Outcome of the most recent reload() of each disease
+        self.last_reloads = {}
+        self._reload_lock = threading.Lock()
+        # Diseases with a reload_async() that has not finished yet
+        self._pending_reloads = set()
+        self._pending_lock = threading.Lock()
+        self.model_loader = ModelLoader(models_dir) if models_dir else None
+        # Models are loaded on first use and evicted least recently used first
+        self.model_cache = ModelCache(self._load_model, max_models=max_models, max_bytes=max_bytes)
+        # Thread pool for screen(), created on first use
+        self._screen_pool = None
+        self._screen_pool_lock = threading.Lock()
+        if not lazy:
+            self.initialize_models()
+    
+    @property
+    def models(self):
+        """Currently loaded models by disease"""
+        return {disease: entry[0] for disease, entry in self.model_cache.items()}
+    
+    @property
+    def scalers(self):
+        """Currently loaded scalers by disease"""
+        return {disease: entry[1] for disease, entry in self.model_cache.items()}
     
     def initialize_models(self):
         """Initialize ML models for different diseases"""
-        diseases = ['diabetes', 'covid', 'pneumonia', 'kidney_disease', 
-                   'breast_cancer', 'alzheimer', 'brain_tumor', 'hepatitis_c']
+        for disease in DISEASE_TYPES:
+            self.model_cache.get(disease)
+    
+    def get_model(self, disease_type):
+        """Return the (model, scaler) pair for a disease, loading it on first use
+
+        Both are None for models served from mapped tables by the mmap backend.
+        """
+        return self._get_entry(disease_type)[:2]
+    
+    def _get_entry(self, disease_type):
+        """Return the cached (model, scaler, compiled) entry for a disease"""
+        if disease_type not in DISEASE_TYPES:
+            raise ValueError(f"Model for {disease_type} not found")
+        return self.model_cache.get(disease_type)
+    
+    def cache_stats(self):
+        """Hit, miss, load-time and eviction counters of the model cache"""
+        return self.model_cache.stats()
+    
+    def result_cache_stats(self):
+        """Hit ratio and eviction counters of the prediction result cache"""
+        if self.result_cache is None:
+            return {'enabled': False}
+        return dict(self.result_cache.stats(), enabled=True)
+    
+    def explanation_cache_stats(self):
+        """Hit ratio and eviction counters of the explanation cache"""
+        if self.explanation_cache is None:
+            return {'enabled': False}
+        return dict(self.explanation_cache.stats(), enabled=True)
+    
+    def _load_model(self, disease):
+        """Load or train the model and scaler for a disease, returning them with their size"""
+        start = time.perf_counter()
+        loaded, source, info = self._read_model(disease)
+        loaded = self._commit_model(disease, loaded, info)
+        MODEL_LOAD_SECONDS.observe(time.perf_counter() - start, disease, source)
+        self._activate(disease)
+        return loaded
+    
+    def _read_model(self, disease, train=True):
+        """Build a servable ((model, scaler, compiled), size) entry, name its source and describe it
+
+        Only memory is touched (apart from training, which saves its artifact):
+        the description is returned for _commit_model instead of being stored
+        in model_info, and compiled tables are not written yet. Returns
+        (None, None, None) when train is False and there is no usable artifact.
+        """
+        mapped = self._load_mapped_model(disease) if self.backend == 'mmap' else None
+        if mapped is not None:
+            return mapped[0], 'mmap', mapped[1]
+        return self._load_full_model(disease, train)
+    
+    def _commit_model(self, disease, loaded, info):
+        """Record a checked entry in model_info and, for the mmap backend, publish its tables
+
+        Returns the entry to serve, which is the mapped copy once the tables are written.
+        """
+        self.model_info[disease] = info
+        (model, _, compiled), _ = loaded
+        if self.backend == 'mmap' and model is not None and compiled is not None:
+            if self._save_compiled(disease, compiled, info.get('content_hash')):
+                # Serve from the mapped file like every other worker will, and let the estimators go
+                mapped = self._load_mapped_model(disease)
+                if mapped is not None:
+                    loaded, self.model_info[disease] = mapped
+        return loaded
+    
+    def _activate(self, disease):
+        """Start a new version of a disease's model once it is the one being served"""
+        # Results computed by a previous copy of this model must not be served again
+        self.model_versions[disease] = self.model_versions.get(disease, 0) + 1
+        if self.result_cache is not None:
+            self.result_cache.invalidate(disease)
+        if self.explanation_cache is not None:
+            self.explanation_cache.invalidate(disease)
+    
+    def reload(self, disease):
+        """Load a disease's saved artifact again and swap it in once it passes a smoke test
+
+        The new model is read while the old one keeps serving. Requests that
+        already hold the old model finish with it, and later ones get the new one.
+        Nothing is trained: if there is no valid artifact or the parity or
+        smoke test fails, the current model stays active, and model_info and
+        the mapped tables other workers read are left untouched. Returns a
+        record of the outcome, duration and active version, also kept in
+        last_reloads.
+        """
+        if disease not in DISEASE_TYPES:
+            raise ValueError(f"Model for {disease} not found")
         
-        for disease in diseases:
-            # Initialize appropriate models
-            if disease in ['diabetes', 'covid', 'pneumonia', 'kidney_disease']:
-                self.models[disease] = XGBClassifier(random_state=42, n_estimators=100)
+        with self._reload_lock:
+            start = time.perf_counter()
+            record = {'disease': disease, 'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}
+            try:
+                loaded, source, info = self._read_model(disease, train=False)
+                if loaded is None:
+                    raise ValueError(f"No valid saved artifact for {disease}")
+                if loaded[0][2] is None and 'parity_error' in info:
+                    raise ValueError(f"Compiled {disease} model differs from reference by {info['parity_error']:.2e}")
+                self._smoke_test(disease, loaded[0])
+                # Only a model that passed its checks is described and published to other workers
+                loaded = self._commit_model(disease, loaded, info)
+            except Exception as e:
+                record.update(outcome='failed', error=str(e))
             else:
-                self.models[disease] = RandomForestClassifier(random_state=42, n_estimators=100)
+                # Swap before bumping the version so no result of the old model is cached under the new one
+                self.model_cache.put(disease, *loaded)
+                self._activate(disease)
+                record.update(outcome='success', source=source)
             
-            self.scalers[disease] = StandardScaler()
-            
-            # Train demo models with synthetic data
-            self._train_demo_model(disease)
+            seconds = time.perf_counter() - start
+            MODEL_RELOAD_SECONDS.observe(seconds, disease, record['outcome'])
+            record.update(
+                seconds=round(seconds, 6),
+                version=self.model_versions.get(disease, 0),
+                content_hash=self.model_info.get(disease, {}).get('content_hash')
+            )
+            self.last_reloads[disease] = record
+        
+        if record['outcome'] == 'success':
+            print(f"✓ Reloaded {disease} model (version {record['version']}) in {seconds:.3f}s")
+        else:
+            print(f"Reload of {disease} model failed, keeping version {record['version']}: {record['error']}")
+        return record
     
-    def _train_demo_model(self, disease):
+    def reload_async(self, disease):
+        """Start reload(disease) on a background thread
+
+        Returns False without starting another when a reload of the disease
+        is already pending. The outcome lands in last_reloads.
+        """
+        if disease not in DISEASE_TYPES:
+            raise ValueError(f"Model for {disease} not found")
+        
+        with self._pending_lock:
+            if disease in self._pending_reloads:
+                return False
+            self._pending_reloads.add(disease)
+        
+        def run():
+            try:
+                self.reload(disease)
+            except Exception as e:
+                print(f"Reload of {disease} model failed: {e}")
+            finally:
+                with self._pending_lock:
+                    self._pending_reloads.discard(disease)
+        
+        threading.Thread(target=run, name=f'model-reload-{disease}', daemon=True).start()
+        return True
+    
+    def reload_changed(self):
+        """Reload every loaded model whose saved artifact differs from the one being served"""
+        records = {}
+        for disease, _ in self.model_cache.items():
+            info = self.model_loader.load_metadata(disease) if self.model_loader else None
+            if info is not None and info.get('content_hash') != self.model_info.get(disease, {}).get('content_hash'):
+                records[disease] = self.reload(disease)
+        return records
+    
+    def _smoke_test(self, disease, entry):
+        """Check that a candidate model gives well-formed probabilities for fixed inputs"""
+        schema = SCHEMAS[disease]
+        # All zeros (the form default) and the middle of every feature's range
+        vectors = np.vstack([schema.new_row(), (np.array(schema.low) + np.array(schema.high)) / 2])
+        probabilities = self._entry_proba(entry, vectors)
+        if (probabilities.shape != (len(vectors), 2) or not np.all(np.isfinite(probabilities))
+                or probabilities.min() < 0 or probabilities.max() > 1
+                or np.abs(probabilities.sum(axis=1) - 1).max() > 1e-6):
+            raise ValueError(f"Smoke test failed for {disease}: got {probabilities.tolist()}")
+    
+    def model_status(self):
+        """Active version, artifact and last reload of every disease"""
+        loaded = {disease for disease, _ in self.model_cache.items()}
+        with self._pending_lock:
+            pending = set(self._pending_reloads)
+        status = {}
+        for disease in DISEASE_TYPES:
+            info = self.model_info.get(disease, {})
+            status[disease] = {
+                'loaded': disease in loaded,
+                'version': self.model_versions.get(disease, 0),
+                'content_hash': info.get('content_hash'),
+                'trained_at': info.get('trained_at'),
+                'reload_pending': disease in pending,
+                'last_reload': self.last_reloads.get(disease)
+            }
+        return status
+    
+    def _load_full_model(self, disease, train=True):
+        """Load or train the reference model, compiling it for the compiled backends"""
+        # Reuse a persisted artifact when its training spec is unchanged
+        loaded = self._load_saved_model(disease)
+        source = 'artifact'
+        if loaded is None:
+            if not train:
+                return None, None, None
+            entry = self.train_model(disease)
+            info = dict(self.model_info[disease])
+            source = 'train'
+        else:
+            entry, info = loaded
+        
+        size = info.get('size_bytes') or len(pickle.dumps(entry))
+        compiled = self._compile_model(disease, *entry, info) if self.backend != 'sklearn' else None
+        if compiled is None:
+            return (entry + (None,), size), source, info
+        return (entry + (compiled,), size + compiled.nbytes), source, info
+    
+    def _load_mapped_model(self, disease):
+        """Map the compiled tables of a disease as (entry, info), or None if they must be (re)built
+
+        Only the artifact metadata is read; the estimators themselves stay on
+        disk, so a worker's private memory holds no model at all.
+        """
+        if self.model_loader is None:
+            return None
+        info = self.model_loader.load_metadata(disease)
+        if info is None or info.get('spec_hash') != self._spec_hash(disease):
+            return None
+        
+        start = time.perf_counter()
+        tables = self.model_loader.load_compiled(disease, info.get('content_hash'))
+        if tables is None:
+            return None
+        compiled = CompiledForest.from_arrays(*tables)
+        info = dict(info, load_seconds=time.perf_counter() - start,
+                    compiled_path=self.model_loader.compiled_path(disease))
+        print(f"✓ Mapped {disease} model from {self.model_loader.compiled_path(disease)}")
+        return ((None, None, compiled), compiled.nbytes), info
+    
+    def _save_compiled(self, disease, compiled, content_hash):
+        """Persist compiled tables next to their artifact, returning whether they were written"""
+        if self.model_loader is None or content_hash is None:
+            return False
+        try:
+            self.model_loader.save_compiled(disease, compiled.arrays(), compiled.params(), content_hash)
+        except OSError as e:
+            print(f"Could not save compiled {disease} tables: {e}")
+            return False
+        return True
+    
+    def _compile_model(self, disease, model, scaler, info):
+        """Build the array-backed fast path, keeping the reference model if parity fails"""
+        compiled = compile_model(model, scaler)
+        if compiled is None:
+            return None
+        
+        error = parity_error(compiled, model, scaler)
+        info['parity_error'] = error
+        if error > PARITY_TOLERANCE:
+            print(f"Compiled {disease} model differs from reference by {error:.2e}, using reference model")
+            return None
+        return compiled
+    
+    def train_model(self, disease, n_jobs=None):
+        """Train a disease model from scratch and persist it, returning (model, scaler)"""
+        # Initialize appropriate models
+        model = self._create_model(disease)
+        scaler = StandardScaler()
+        
+        # Thread count only affects training speed, so restore the default before saving
+        default_n_jobs = model.get_params()['n_jobs']
+        if n_jobs is not None:
+            model.set_params(n_jobs=n_jobs)
+        
+        # Train demo models with synthetic data
+        start = time.perf_counter()
+        self._train_demo_model(disease, model, scaler)
+        train_seconds = time.perf_counter() - start
+        model.set_params(n_jobs=default_n_jobs)
+        
+        self._save_model(disease, model, scaler, train_seconds)
+        return model, scaler
+    
+    def _create_model(self, disease):
+        """Create an unfitted estimator for a disease"""
+        if disease in ['diabetes', 'covid', 'pneumonia', 'kidney_disease']:
+            return XGBClassifier(random_state=42, n_estimators=100)
+        return RandomForestClassifier(random_state=42, n_estimators=100)
+    
+    def _spec_hash(self, disease):
+        """Fingerprint everything that determines the trained model for a disease"""
+        model = self._create_model(disease)
+        spec = {
+            'disease': disease,
+            'model_version': MODEL_VERSION,
+            'estimator': type(model).__name__,
+            'params': {k: v for k, v in model.get_params().items() if k != 'n_jobs'},
+            'seed': disease_seed(disease),
+            'feature_names': self._get_feature_names(disease),
+            'sklearn_version': sklearn.__version__,
+            'xgboost_version': xgboost.__version__
+        }
+        encoded = json.dumps(spec, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+    
+    def _load_saved_model(self, disease):
+        """Load a persisted ((model, scaler), info) pair, returning None if it must be retrained"""
+        if self.model_loader is None:
+            return None
+        
+        start = time.perf_counter()
+        artifact = self.model_loader.load_artifact(disease, spec_hash=self._spec_hash(disease))
+        if artifact is None:
+            return None
+        if artifact['feature_names'] != self._get_feature_names(disease):
+            return None
+        
+        info = dict(artifact['metadata'], load_seconds=time.perf_counter() - start)
+        print(f"✓ Loaded {disease} model from {self.model_loader.artifact_path(disease)}")
+        return (artifact['model'], artifact['scaler']), info
+    
+    def _save_model(self, disease, model, scaler, train_seconds):
+        """Persist a freshly trained model and scaler"""
+        metadata = {
+            'disease': disease,
+            'model_version': MODEL_VERSION,
+            'spec_hash': self._spec_hash(disease),
+            'seed': disease_seed(disease),
+            'estimator': type(model).__name__,
+            'trained_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'train_seconds': round(train_seconds, 4)
+        }
+        if self.model_loader is None:
+            self.model_info[disease] = metadata
+            return
+        
+        try:
+            self.model_info[disease] = self.model_loader.save_artifact(
+                disease, model, scaler, self._get_feature_names(disease), metadata)
+        except OSError as e:
+            print(f"Could not save {disease} model artifact: {e}")
+            self.model_info[disease] = metadata
+    
+    def _train_demo_model(self, disease, model, scaler):
         """Create and train demo models with synthetic data"""
-        np.random.seed(42)
+        rng = np.random.RandomState(disease_seed(disease))
         n_samples = 1000
         
         if disease == 'diabetes':
             X = np.column_stack([
-                np.random.normal(50, 15, n_samples),  # age
-                np.random.normal(120, 20, n_samples), # blood_pressure
-                np.random.normal(100, 30, n_samples), # glucose
-                np.random.normal(25, 5, n_samples),   # bmi
-                np.random.poisson(1, n_samples),      # pregnancies
-                np.random.normal(20, 10, n_samples),  # skin_thickness
-                np.random.normal(80, 40, n_samples),  # insulin
-                np.random.normal(0.5, 0.2, n_samples) # diabetes_pedigree
+                rng.normal(50, 15, n_samples),  # age
+                rng.normal(120, 20, n_samples), # blood_pressure
+                rng.normal(100, 30, n_samples), # glucose
+                rng.normal(25, 5, n_samples),   # bmi
+                rng.poisson(1, n_samples),      # pregnancies
+                rng.normal(20, 10, n_samples),  # skin_thickness
+                rng.normal(80, 40, n_samples),  # insulin
+                rng.normal(0.5, 0.2, n_samples) # diabetes_pedigree
             ])
             # Create balanced labels with proper distribution
-            risk_score = (X[:, 1] * 0.05 + X[:, 2] * 0.1 + np.random.normal(0, 0.5, n_samples))
+            risk_score = (X[:, 1] * 0.05 + X[:, 2] * 0.1 + rng.normal(0, 0.5, n_samples))
             y = (risk_score > np.percentile(risk_score, 50)).astype(int)
             
         elif disease == 'covid':
             X = np.column_stack([
-                np.random.exponential(2, n_samples),  # fever
-                np.random.binomial(1, 0.5, n_samples), # cough
-                np.random.binomial(1, 0.5, n_samples), # fatigue
-                np.random.binomial(1, 0.4, n_samples), # breathing_difficulty
-                np.random.binomial(1, 0.3, n_samples), # chest_pain
-                np.random.binomial(1, 0.4, n_samples), # sore_throat
-                np.random.binomial(1, 0.3, n_samples)  # loss_of_taste
+                rng.exponential(2, n_samples),  # fever
+                rng.binomial(1, 0.5, n_samples), # cough
+                rng.binomial(1, 0.5, n_samples), # fatigue
+                rng.binomial(1, 0.4, n_samples), # breathing_difficulty
+                rng.binomial(1, 0.3, n_samples), # chest_pain
+                rng.binomial(1, 0.4, n_samples), # sore_throat
+                rng.binomial(1, 0.3, n_samples)  # loss_of_taste
             ])
             # Create balanced labels
-            risk_score = (X[:, 0] * 0.2 + X[:, 1] * 0.3 + X[:, 2] * 0.2 + np.random.normal(0, 0.3, n_samples))
+            risk_score = (X[:, 0] * 0.2 + X[:, 1] * 0.3 + X[:, 2] * 0.2 + rng.normal(0, 0.3, n_samples))
             y = (risk_score > np.percentile(risk_score, 60)).astype(int)
             
         elif disease == 'pneumonia':
             X = np.column_stack([
-                np.random.exponential(1.5, n_samples),  # fever
-                np.random.binomial(1, 0.6, n_samples),  # cough
-                np.random.binomial(1, 0.4, n_samples),  # chest_pain
-                np.random.binomial(1, 0.5, n_samples),  # breathing_difficulty
-                np.random.binomial(1, 0.5, n_samples),  # fatigue
-                np.random.binomial(1, 0.3, n_samples),  # sweating
-                np.random.binomial(1, 0.4, n_samples)   # chills
+                rng.exponential(1.5, n_samples),  # fever
+                rng.binomial(1, 0.6, n_samples),  # cough
+                rng.binomial(1, 0.4, n_samples),  # chest_pain
+                rng.binomial(1, 0.5, n_samples),  # breathing_difficulty
+                rng.binomial(1, 0.5, n_samples),  # fatigue
+                rng.binomial(1, 0.3, n_samples),  # sweating
+                rng.binomial(1, 0.4, n_samples)   # chills
             ])
-            risk_score = (X[:, 0] * 0.3 + X[:, 1] * 0.2 + X[:, 2] * 0.2 + np.random.normal(0, 0.3, n_samples))
+            risk_score = (X[:, 0] * 0.3 + X[:, 1] * 0.2 + X[:, 2] * 0.2 + rng.normal(0, 0.3, n_samples))
             y = (risk_score > np.percentile(risk_score, 55)).astype(int)
             
         elif disease == 'kidney_disease':
             X = np.column_stack([
-                np.random.normal(50, 15, n_samples),    # age
-                np.random.normal(120, 20, n_samples),   # blood_pressure
-                np.random.normal(1.5, 0.5, n_samples),  # albumin
-                np.random.normal(100, 30, n_samples),   # sugar
-                np.random.binomial(1, 0.3, n_samples),  # red_blood_cells
-                np.random.binomial(1, 0.4, n_samples),  # pus_cells
-                np.random.normal(90, 25, n_samples)     # blood_glucose
+                rng.normal(50, 15, n_samples),    # age
+                rng.normal(120, 20, n_samples),   # blood_pressure
+                rng.normal(1.5, 0.5, n_samples),  # albumin
+                rng.normal(100, 30, n_samples),   # sugar
+                rng.binomial(1, 0.3, n_samples),  # red_blood_cells
+                rng.binomial(1, 0.4, n_samples),  # pus_cells
+                rng.normal(90, 25, n_samples)     # blood_glucose
             ])
-            risk_score = (X[:, 0] * 0.05 + X[:, 1] * 0.05 + X[:, 2] * 0.3 + np.random.normal(0, 0.4, n_samples))
+            risk_score = (X[:, 0] * 0.05 + X[:, 1] * 0.05 + X[:, 2] * 0.3 + rng.normal(0, 0.4, n_samples))
             y = (risk_score > np.percentile(risk_score, 50)).astype(int)
             
         else:
             # Generic model for other diseases with balanced classes
             n_features = len(self._get_feature_names(disease))
-            X = np.random.normal(0, 1, (n_samples, n_features))
-            coefficients = np.random.normal(0, 0.5, n_features)
+            X = rng.normal(0, 1, (n_samples, n_features))
+            coefficients = rng.normal(0, 0.5, n_features)
             # Create balanced labels
-            risk_score = X @ coefficients + np.random.normal(0, 0.5, n_samples)
+            risk_score = X @ coefficients + rng.normal(0, 0.5, n_samples)
             y = (risk_score > np.percentile(risk_score, 50)).astype(int)
         
         # Ensure we have both classes (0 and 1)
@@ -105,74 +521,336 @@ class DiseasePredictor:
             # Force some diversity if we only have one class
             y[:n_samples//2] = 0
             y[n_samples//2:] = 1
-            np.random.shuffle(y)
+            rng.shuffle(y)
         
         print(f"Training {disease} - Classes: {np.unique(y)}, Counts: {np.bincount(y)}")
         
-        X_scaled = self.scalers[disease].fit_transform(X)
-        self.models[disease].fit(X_scaled, y)
+        X_scaled = scaler.fit_transform(X)
+        model.fit(X_scaled, y)
         print(f"✓ Trained {disease} model - {np.sum(y)} positive, {len(y)-np.sum(y)} negative cases")
     
     def predict(self, disease_type, symptoms):
         """Predict disease based on symptoms"""
+        schema = SCHEMAS.get(disease_type)
+        if schema is None:
+            PREDICTION_ERRORS.inc('unknown', 'model')
+            return self._error_result(f"Model for {disease_type} not found")
+        
+        # Validate symptoms into the feature array
+        start = time.perf_counter()
+        features, errors = parse_symptoms(schema, symptoms)
+        if errors:
+            PREDICTION_ERRORS.inc(disease_type, 'features')
+            return self._error_result('Invalid symptoms', errors)
+        STAGE_SECONDS.observe(time.perf_counter() - start, disease_type, 'features')
+        return self.predict_row(disease_type, features)
+    
+    def predict_row(self, disease_type, features):
+        """Predict one patient from a feature row built by the disease's schema"""
+        if self.result_cache is None:
+            return self._predict_uncached(disease_type, features)
+        
+        key = tuple(features.tolist())
+        version = self.model_versions.get(disease_type, 0)
+        cached = self.result_cache.get((disease_type, version, key))
+        if cached is not None:
+            PREDICTIONS.inc(disease_type, cached['risk_level'])
+            return dict(cached)
+        
+        result = self._predict_uncached(disease_type, features)
+        # Skip caching if the model was swapped while predicting, unless this call loaded it
+        if 'error' not in result and version in (0, self.model_versions.get(disease_type)):
+            self.result_cache.put((disease_type, self.model_versions[disease_type], key), dict(result))
+        return result
+    
+    def cached_result(self, disease_type, features):
+        """Memoized result for a feature row, or None when it isn't cached"""
+        if self.result_cache is None:
+            return None
+        version = self.model_versions.get(disease_type, 0)
+        cached = self.result_cache.get((disease_type, version, tuple(features.tolist())))
+        if cached is None:
+            return None
+        PREDICTIONS.inc(disease_type, cached['risk_level'])
+        return dict(cached)
+    
+    def cache_results(self, disease_type, version, features, results):
+        """Memoize predict_rows results computed while model_versions[disease_type] was version"""
+        # Skip caching if the model was swapped while predicting, unless the batch loaded it
+        if self.result_cache is None or version not in (0, self.model_versions.get(disease_type)):
+            return
+        version = self.model_versions[disease_type]
+        for row, result in zip(features.tolist(), results):
+            if 'error' not in result:
+                self.result_cache.put((disease_type, version, tuple(row)), dict(result))
+    
+    def _predict_uncached(self, disease_type, features):
+        """Run the model for one patient"""
+        label = disease_label(disease_type, DISEASE_TYPES)
+        stage = 'model'
         try:
-            if disease_type not in self.models:
-                raise ValueError(f"Model for {disease_type} not found")
-            
-            # Convert symptoms to feature array
-            feature_names = self._get_feature_names(disease_type)
-            features = []
-            
-            for feature in feature_names:
-                features.append(symptoms.get(feature, 0))
+            model, scaler, compiled = self._get_entry(disease_type)
+            features = features.reshape(1, -1)
+            now = time.perf_counter()
             
-            features = np.array(features).reshape(1, -1)
-            features_scaled = self.scalers[disease_type].transform(features)
-            
-            # Get prediction and probability
-            prediction = self.models[disease_type].predict(features_scaled)[0]
-            probability = self.models[disease_type].predict_proba(features_scaled)[0]
-            
-            confidence = max(probability)
-            
-            result_map = {
-                'diabetes': ['No Diabetes', 'Diabetes Detected'],
-                'covid': ['COVID Negative', 'COVID Positive'],
-                'pneumonia': ['No Pneumonia', 'Pneumonia Detected'],
-                'kidney_disease': ['Healthy Kidneys', 'Kidney Disease Detected'],
-                'breast_cancer': ['Benign', 'Malignant Tumor'],
-                'alzheimer': ['No Alzheimer', 'Alzheimer Detected'],
-                'brain_tumor': ['No Tumor', 'Brain Tumor Detected'],
-                'hepatitis_c': ['No Hepatitis C', 'Hepatitis C Detected']
-            }
-            
-            prediction_text = result_map.get(disease_type, ['Negative', 'Positive'])[int(prediction)]
+            if compiled is not None:
+                # Fast path: the compiled trees take raw features and skip per-call validation
+                stage = 'predict'
+                probability = compiled.predict_proba(features)[0]
+                prediction = probability.argmax()
+            else:
+                stage = 'scale'
+                features_scaled = scaler.transform(features)
+                start, now = now, time.perf_counter()
+                STAGE_SECONDS.observe(now - start, label, 'scale')
+                
+                # Get prediction and probability
+                stage = 'predict'
+                prediction = model.predict(features_scaled)[0]
+                probability = model.predict_proba(features_scaled)[0]
+            STAGE_SECONDS.observe(time.perf_counter() - now, label, 'predict')
             
-            return {
-                'prediction': prediction_text,
-                'confidence': round(confidence * 100, 2),
-                'risk_level': 'High' if confidence > 0.7 else 'Medium' if confidence > 0.5 else 'Low'
-            }
+            result = self._format_result(disease_type, int(prediction), max(probability))
+            PREDICTIONS.inc(label, result['risk_level'])
+            return result
             
         except Exception as e:
-            return {
-                'prediction': 'Error in prediction',
-                'confidence': 0.0,
-                'risk_level': 'Unknown',
-                'error': str(e)
-            }
+            PREDICTION_ERRORS.inc(label, stage)
+            return self._error_result(str(e))
+    
+    def predict_proba_matrix(self, disease_type, features):
+        """Class probabilities for a (rows, features) matrix of raw values in feature order"""
+        return self._entry_proba(self._get_entry(disease_type), features)
+    
+    @staticmethod
+    def _entry_proba(entry, features):
+        model, scaler, compiled = entry
+        if compiled is not None:
+            return compiled.predict_proba(features)
+        return model.predict_proba(scaler.transform(features))
+    
+    def predict_batch(self, disease_type, rows):
+        """Predict many patients at once, returning one result or error per row
+
+        Rows are validated like predict(); an invalid row gets an error
+        result with the per-field 'errors' and the others are still scored.
+        """
+        # Fail for an unknown disease before validating any rows
+        self._get_entry(disease_type)
+        schema = SCHEMAS[disease_type]
+        start = time.perf_counter()
+        
+        # Validate every row straight into one feature matrix
+        features = np.zeros((len(rows), schema.size), dtype=schema.dtype)
+        results = [None] * len(rows)
+        valid = []
+        for i, symptoms in enumerate(rows):
+            _, errors = parse_symptoms(schema, symptoms, out=features[i])
+            if errors:
+                results[i] = self._error_result('Invalid symptoms', errors)
+            else:
+                valid.append(i)
+        if len(valid) < len(rows):
+            PREDICTION_ERRORS.inc(disease_type, 'features', amount=len(rows) - len(valid))
+        STAGE_SECONDS.observe(time.perf_counter() - start, disease_type, 'batch_features')
+        
+        if valid:
+            for i, result in zip(valid, self.predict_rows(disease_type, features[valid])):
+                results[i] = result
+        return results
+    
+    def predict_rows(self, disease_type, features):
+        """Predict a (rows, features) matrix already validated by the disease's schema"""
+        start = time.perf_counter()
+        # One predict_proba call for the whole batch; labels follow the most likely class
+        probabilities = self.predict_proba_matrix(disease_type, features)
+        STAGE_SECONDS.observe(time.perf_counter() - start, disease_type, 'batch_predict')
+        labels = probabilities.argmax(axis=1)
+        confidences = probabilities.max(axis=1)
+        results = []
+        risk_counts = {}
+        for label, confidence in zip(labels, confidences):
+            result = self._format_result(disease_type, int(label), float(confidence))
+            risk_counts[result['risk_level']] = risk_counts.get(result['risk_level'], 0) + 1
+            results.append(result)
+        for risk_level, count in risk_counts.items():
+            PREDICTIONS.inc(disease_type, risk_level, amount=count)
+        return results
+    
+    def explain(self, disease_type, symptoms):
+        """Per-feature contributions behind the prediction for one patient"""
+        schema = SCHEMAS.get(disease_type)
+        if schema is None:
+            raise ValueError(f"Model for {disease_type} not found")
+        features, errors = parse_symptoms(schema, symptoms)
+        if errors:
+            raise ValueError('; '.join(error['message'] for error in errors))
+        return self.explain_row(disease_type, features)
+    
+    def explain_row(self, disease_type, features):
+        """Explain one feature row built by the disease's schema, memoized by its values"""
+        if self.explanation_cache is None:
+            return self.explain_batch(disease_type, features.reshape(1, -1))[0]
+        
+        key = tuple(features.tolist())
+        version = self.model_versions.get(disease_type, 0)
+        cached = self.explanation_cache.get((disease_type, version, key))
+        if cached is not None:
+            return dict(cached)
+        
+        explanation = self.explain_batch(disease_type, features.reshape(1, -1))[0]
+        if version in (0, self.model_versions.get(disease_type)):
+            self.explanation_cache.put((disease_type, self.model_versions[disease_type], key), dict(explanation))
+        return explanation
+    
+    def explain_batch(self, disease_type, features):
+        """Explanations for a (rows, features) matrix of raw values in feature order
+
+        Contributions follow the path each row takes through every tree
+        (Saabas), computed for all rows and trees at once on the compiled
+        node tables. base_value plus all contributions equals 'value', the
+        model's raw output: the probability of the disease for random
+        forests, its log-odds for XGBoost, as named by 'output'.
+        Contributions are listed largest effect first.
+        """
+        forest = self._get_explainer(disease_type)
+        start = time.perf_counter()
+        features = np.asarray(features, dtype=np.float64)
+        contributions, bias = forest.contributions(features)
+        STAGE_SECONDS.observe(time.perf_counter() - start, disease_type, 'explain')
+        
+        names = self._get_feature_names(disease_type)
+        output = 'probability' if forest.base_margin is None else 'log_odds'
+        explanations = []
+        for values, row in zip(features.tolist(), contributions.tolist()):
+            ranked = sorted(zip(names, values, row), key=lambda item: abs(item[2]), reverse=True)
+            explanations.append({
+                'output': output,
+                'base_value': round(bias, 6),
+                'value': round(bias + sum(row), 6),
+                'contributions': [
+                    {'feature': name, 'value': value, 'contribution': round(contribution, 6)}
+                    for name, value, contribution in ranked
+                ]
+            })
+        return explanations
+    
+    def _get_explainer(self, disease_type):
+        """Compiled trees of the current model, built on first use for the sklearn backend"""
+        model, scaler, compiled = self._get_entry(disease_type)
+        if compiled is not None:
+            return compiled
+        
+        # Keyed by the model object so a reloaded model is never explained with old trees
+        cached = self._explainers.get(disease_type)
+        if cached is not None and cached[0] is model:
+            return cached[1]
+        explainer = compile_model(model, scaler)
+        if explainer is None:
+            raise ValueError(f"Explanations are not supported for {type(model).__name__} models")
+        self._explainers[disease_type] = (model, explainer)
+        return explainer
+    
+    def screen(self, symptoms, diseases=None):
+        """Score one patient against every disease model at once, highest risk first
+
+        Shared symptoms (age, fever, ...) are converted once and reused for
+        every disease. The models run concurrently on a thread pool since
+        scikit-learn and XGBoost release the GIL while predicting, so the
+        total latency is close to that of the slowest model. Each entry has
+        the usual prediction fields plus 'probability', the chance of the
+        disease in percent, which the table is ranked by, and
+        'defaulted_features', the disease's features the patient left out
+        and that were scored as 0. Diseases none of whose features were
+        given are left out rather than ranked on defaults alone. A symptom
+        that is not a number or out of range fails only the diseases using
+        it, with per-field 'errors' as in predict().
+        """
+        diseases = list(diseases or DISEASE_TYPES)
+        unknown = [disease for disease in diseases if disease not in DISEASE_TYPES]
+        if unknown:
+            raise ValueError(f"Unknown disease type(s): {', '.join(unknown)}")
+        
+        # Validate every symptom once; a bad value only fails the diseases that use it
+        row, errors = parse_symptoms(SCREEN_SCHEMA, symptoms)
+        if row is None:
+            raise ValueError(errors[0]['message'])
+        given = {name for name in SCREEN_SCHEMA.features if symptoms.get(name) not in (None, '')}
+        vectors = []
+        invalid = []
+        defaulted = {}
+        for disease in diseases:
+            defaulted[disease] = [name for name in SCHEMAS[disease].features if name not in given]
+            if len(defaulted[disease]) == SCHEMAS[disease].size:
+                continue
+            disease_errors = [error for error in errors if error['field'] in SCHEMAS[disease].index]
+            if disease_errors:
+                PREDICTION_ERRORS.inc(disease, 'features')
+                invalid.append(dict(self._error_result('Invalid symptoms', disease_errors),
+                                    disease_type=disease, latency_ms=0.0))
+            else:
+                vectors.append((disease, row[SCREEN_COLUMNS[disease]]))
+        
+        if self.backend != 'sklearn':
+            # Compiled (and memory-mapped) models answer in well under a millisecond; handing them
+            # to other threads would cost more than it saves
+            results = [self._screen_one(disease, features) for disease, features in vectors]
+        else:
+            pool = self._get_screen_pool()
+            futures = [pool.submit(self._screen_one, disease, features) for disease, features in vectors]
+            results = [future.result() for future in futures]
+        for result in results:
+            result['defaulted_features'] = defaulted[result['disease_type']]
+        results.extend(invalid)
+        # Failed models sort last; the rest by probability of the disease
+        results.sort(key=lambda result: -1 if 'error' in result else result['probability'], reverse=True)
+        return results
+    
+    def _screen_one(self, disease_type, features):
+        start = time.perf_counter()
+        try:
+            # Load first so a cold model shows up in the load metrics, not as a slow prediction
+            self._get_entry(disease_type)
+            predict_start = time.perf_counter()
+            probabilities = self.predict_proba_matrix(disease_type, features.reshape(1, -1))[0]
+            STAGE_SECONDS.observe(time.perf_counter() - predict_start, disease_type, 'screen_predict')
+            result = self._format_result(disease_type, int(probabilities.argmax()), float(probabilities.max()))
+            result['probability'] = round(float(probabilities[1]) * 100, 2)
+            PREDICTIONS.inc(disease_type, result['risk_level'])
+        except Exception as e:
+            PREDICTION_ERRORS.inc(disease_type, 'screen_predict')
+            result = self._error_result(str(e))
+        result['disease_type'] = disease_type
+        result['latency_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        return result
+    
+    def _get_screen_pool(self):
+        with self._screen_pool_lock:
+            if self._screen_pool is None:
+                self._screen_pool = ThreadPoolExecutor(max_workers=len(DISEASE_TYPES), thread_name_prefix='screen')
+            return self._screen_pool
+    
+    def _format_result(self, disease_type, label, confidence):
+        """Build the prediction result dict for a class label and its probability"""
+        return {
+            'prediction': SCHEMAS[disease_type].labels[label],
+            'confidence': round(confidence * 100, 2),
+            'risk_level': 'High' if confidence > 0.7 else 'Medium' if confidence > 0.5 else 'Low'
+        }
+    
+    @staticmethod
+    def _error_result(message, errors=None):
+        result = {
+            'prediction': 'Error in prediction',
+            'confidence': 0.0,
+            'risk_level': 'Unknown',
+            'error': message
+        }
+        if errors:
+            # Per-field {'field', 'code', 'message'} dicts from FeatureSchema.parse
+            result['errors'] = errors
+        return result
     
     def _get_feature_names(self, disease_type):
         """Get feature names for each disease type"""
-        feature_map = {
-            'diabetes': ['age', 'blood_pressure', 'glucose', 'bmi', 'pregnancies', 'skin_thickness', 'insulin', 'diabetes_pedigree'],
-            'covid': ['fever', 'cough', 'fatigue', 'breathing_difficulty', 'chest_pain', 'sore_throat', 'loss_of_taste'],
-            'pneumonia': ['fever', 'cough', 'chest_pain', 'breathing_difficulty', 'fatigue', 'sweating', 'chills'],
-            'kidney_disease': ['age', 'blood_pressure', 'albumin', 'sugar', 'red_blood_cells', 'pus_cells', 'blood_glucose'],
-            'breast_cancer': ['radius_mean', 'texture_mean', 'perimeter_mean', 'area_mean', 'smoothness_mean', 'compactness_mean'],
-            'alzheimer': ['age', 'memory_loss', 'cognitive_decline', 'behavior_changes', 'mri_findings', 'genetic_risk'],
-            'brain_tumor': ['headaches', 'seizures', 'vision_problems', 'nausea', 'mri_abnormalities', 'speech_difficulty'],
-            'hepatitis_c': ['fatigue', 'jaundice', 'abdominal_pain', 'nausea', 'liver_enzymes', 'bilirubin']
-        }
-        
-        return feature_map.get(disease_type, [])
\ No newline at end of file
+        return DISEASE_FEATURES.get(disease_type, [])
\ No newline at end of file
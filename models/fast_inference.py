@@ -0,0 +1,265 @@
+import json
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from xgboost import XGBClassifier
+
+class CompiledForest:
+    """Array-backed tree ensemble that applies its model's StandardScaler itself
+
+    All trees are stored in flat node tables. Leaves point back to
+    themselves, so every row can be walked through every tree at once for
+    max_depth steps without per-tree Python loops. Internal nodes carry
+    the value of the subtree below them, which contributions() uses.
+    """
+
+    # Node tables and scaler parameters, in the order they are stored on disk
+    ARRAYS = ('feature', 'threshold', 'left', 'right', 'missing', 'value', 'roots', 'mean', 'scale')
+
+    def __init__(self, feature, threshold, left, right, missing, value, roots, mean, scale,
+                 max_depth, n_features, strict, base_margin=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing = missing
+        self.value = value
+        self.roots = roots
+        self.mean = mean
+        self.scale = scale
+        self.max_depth = max_depth
+        self.n_features = n_features
+        # XGBoost goes left on x < threshold, scikit-learn on x <= threshold
+        self.strict = strict
+        # XGBoost sums leaf margins and applies a sigmoid; forests average probabilities
+        self.base_margin = base_margin
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self.arrays().values())
+
+    def arrays(self):
+        """Node tables by name, leaving out the ones this ensemble doesn't use"""
+        return {name: getattr(self, name) for name in self.ARRAYS if getattr(self, name) is not None}
+
+    def params(self):
+        """Scalar settings that, with arrays(), fully describe the ensemble"""
+        return {'max_depth': self.max_depth, 'n_features': self.n_features,
+                'strict': self.strict, 'base_margin': self.base_margin}
+
+    @classmethod
+    def from_arrays(cls, arrays, params):
+        """Rebuild an ensemble from arrays() and params(), e.g. memory-mapped tables"""
+        return cls(missing=arrays.get('missing'), **{k: v for k, v in arrays.items() if k != 'missing'}, **params)
+
+    def leaves(self, X):
+        """Return the leaf node reached in every tree for every row of raw (unscaled) features"""
+        X = self._scale(X)
+        nodes = np.repeat(self.roots[np.newaxis, :], X.shape[0], axis=0)
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        for _ in range(self.max_depth):
+            nodes = self._step(X, rows, nodes)
+        return nodes
+
+    def _scale(self, X):
+        # Both libraries compare float32 features against the thresholds; folding
+        # the scaler into the thresholds instead disagrees when a value ties a split
+        X = (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+        return X.astype(np.float32).astype(np.float64)
+
+    def _step(self, X, rows, nodes):
+        """Move every (row, tree) one level down from its current node"""
+        x = X[rows, self.feature[nodes]]
+        if self.strict:
+            go_left = x < self.threshold[nodes]
+        else:
+            go_left = x <= self.threshold[nodes]
+        children = np.where(go_left, self.left[nodes], self.right[nodes])
+        if self.missing is not None:
+            children = np.where(np.isnan(x), self.missing[nodes], children)
+        return children
+
+    def contributions(self, X):
+        """Per-feature path contributions of every row, and the bias they start from
+
+        Each split on a row's path credits its feature with the change in
+        node value from parent to child (Saabas), so bias plus a row's
+        contributions equals the model's raw output: the probability of the
+        positive class for forests, its log-odds margin for XGBoost.
+        """
+        X = self._scale(X)
+        n_rows, n_trees = X.shape[0], len(self.roots)
+        nodes = np.repeat(self.roots[np.newaxis, :], n_rows, axis=0)
+        rows = np.arange(n_rows)[:, np.newaxis]
+        # Offset of each (row, tree) pair's row in the flattened result
+        offsets = np.repeat(np.arange(n_rows) * self.n_features, n_trees)
+        totals = np.zeros(n_rows * self.n_features)
+        for _ in range(self.max_depth):
+            children = self._step(X, rows, nodes)
+            # Leaves point back to themselves, so finished paths add zero
+            delta = self.value[children] - self.value[nodes]
+            totals += np.bincount(offsets + self.feature[nodes].ravel(), weights=delta.ravel(),
+                                  minlength=totals.size)
+            nodes = children
+
+        contributions = totals.reshape(n_rows, self.n_features)
+        bias = float(self.value[self.roots].sum())
+        if self.base_margin is None:
+            return contributions / n_trees, bias / n_trees
+        return contributions, bias + self.base_margin
+
+    def predict_proba(self, X):
+        """Class probabilities, matching the reference model's predict_proba"""
+        leaf_values = self.value[self.leaves(X)]
+        if self.base_margin is None:
+            positive = leaf_values.mean(axis=1)
+        else:
+            positive = 1.0 / (1.0 + np.exp(-(self.base_margin + leaf_values.sum(axis=1))))
+        return np.column_stack([1.0 - positive, positive])
+
+    @classmethod
+    def from_random_forest(cls, model, scaler):
+        """Compile a fitted binary RandomForestClassifier"""
+        tables = []
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            counts = tree.value[:, 0, :]
+            positive = counts[:, 1] / counts.sum(axis=1)
+            tables.append((tree.feature, tree.threshold, tree.children_left,
+                           tree.children_right, None, positive, tree.max_depth))
+        return cls._build(tables, scaler, model.n_features_in_, strict=False)
+
+    @classmethod
+    def from_xgboost(cls, model, scaler):
+        """Compile a fitted binary:logistic XGBClassifier"""
+        config = json.loads(model.get_booster().save_raw(raw_format='json'))
+        learner = config['learner']
+        if learner['objective']['name'] != 'binary:logistic':
+            raise ValueError(f"Unsupported XGBoost objective {learner['objective']['name']}")
+
+        base_score = float(learner['learner_model_param']['base_score'])
+        base_margin = float(np.log(base_score / (1.0 - base_score)))
+
+        tables = []
+        for tree in learner['gradient_booster']['model']['trees']:
+            left = np.array(tree['left_children'], dtype=np.int64)
+            right = np.array(tree['right_children'], dtype=np.int64)
+            default_left = np.array(tree['default_left'], dtype=bool)
+            missing = np.where(default_left, left, right)
+            # Leaf nodes keep their output value in split_conditions, stored as float32
+            conditions = np.array(tree['split_conditions'], dtype=np.float32).astype(np.float64)
+            is_leaf = left == -1
+            feature = np.where(is_leaf, -2, np.array(tree['split_indices'], dtype=np.int64))
+            value = _node_means(left, right, np.where(is_leaf, conditions, 0.0),
+                                np.array(tree['sum_hessian'], dtype=np.float64))
+            tables.append((feature, conditions, left, right, missing, value, _tree_depth(left, right)))
+        return cls._build(tables, scaler, model.n_features_in_, strict=True, base_margin=base_margin)
+
+    @classmethod
+    def _build(cls, tables, scaler, n_features, strict, base_margin=None):
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+
+        features, thresholds, lefts, rights, missings, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for feature, threshold, left, right, missing, value, depth in tables:
+            feature = np.asarray(feature, dtype=np.int64)
+            is_leaf = np.asarray(left) < 0
+            node_ids = np.arange(len(feature)) + offset
+            split_feature = np.where(is_leaf, 0, feature)
+
+            features.append(split_feature)
+            thresholds.append(np.where(is_leaf, np.inf, np.asarray(threshold, dtype=np.float64)))
+            lefts.append(np.where(is_leaf, node_ids, np.asarray(left) + offset))
+            rights.append(np.where(is_leaf, node_ids, np.asarray(right) + offset))
+            if missing is not None:
+                missings.append(np.where(is_leaf, node_ids, np.asarray(missing) + offset))
+            values.append(np.asarray(value, dtype=np.float64))
+            roots.append(offset)
+            offset += len(feature)
+            max_depth = max(max_depth, depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            missing=np.concatenate(missings) if missings else None,
+            value=np.concatenate(values),
+            roots=np.array(roots, dtype=np.int64),
+            mean=np.array(mean, dtype=np.float64),
+            scale=np.array(scale, dtype=np.float64),
+            max_depth=max_depth,
+            n_features=n_features,
+            strict=strict,
+            base_margin=base_margin
+        )
+
+
+def compile_model(model, scaler):
+    """Compile a fitted model and scaler, or return None if the model type is unsupported"""
+    if isinstance(model, XGBClassifier):
+        return CompiledForest.from_xgboost(model, scaler)
+    if isinstance(model, RandomForestClassifier):
+        return CompiledForest.from_random_forest(model, scaler)
+    return None
+
+
+def parity_probes(compiled, n_random=256, max_splits=None, seed=0):
+    """Raw feature rows that exercise every way a compiled ensemble can disagree with its model
+
+    Random rows around the training distribution, a grid of whole and half
+    values as the prediction form submits them, and rows that put one
+    feature exactly on a split threshold or on the float32 values either
+    side of it, where a scaling or comparison mismatch takes the wrong
+    branch. max_splits caps how many split nodes are probed.
+    """
+    rng = np.random.default_rng(seed)
+    n_features = compiled.n_features
+    random_rows = compiled.mean + compiled.scale * rng.normal(0, 1.5, (n_random, n_features))
+
+    grid = np.arange(0, 20.5, 0.5)
+    grid_rows = np.vstack([np.repeat(grid[:, np.newaxis], n_features, axis=1),
+                           rng.choice(grid, (n_random, n_features))])
+
+    # Leaves have infinite thresholds
+    splits = np.flatnonzero(np.isfinite(compiled.threshold))
+    if max_splits is not None and len(splits) > max_splits:
+        splits = rng.choice(splits, max_splits, replace=False)
+    threshold = compiled.threshold[splits].astype(np.float32)
+    scaled = np.concatenate([threshold, np.nextafter(threshold, np.float32(-np.inf)),
+                             np.nextafter(threshold, np.float32(np.inf))]).astype(np.float64)
+    features = np.tile(compiled.feature[splits], 3)
+    tie_rows = random_rows[np.arange(len(scaled)) % n_random]
+    tie_rows[np.arange(len(scaled)), features] = scaled * compiled.scale[features] + compiled.mean[features]
+
+    return np.vstack([random_rows, grid_rows, tie_rows])
+
+
+def parity_error(compiled, model, scaler, n_probes=256, seed=0):
+    """Largest absolute predict_proba difference between compiled and reference models"""
+    probes = parity_probes(compiled, n_random=n_probes, max_splits=4 * n_probes, seed=seed)
+    expected = model.predict_proba(scaler.transform(probes))
+    return float(np.abs(compiled.predict_proba(probes) - expected).max())
+
+
+def _node_means(left, right, value, cover):
+    """Give internal nodes the cover-weighted mean of their leaves, as XGBoost's approximate contributions do"""
+    value = value.copy()
+    # Children are numbered after their parents, so a reverse pass sees them first
+    for node in range(len(left) - 1, -1, -1):
+        if left[node] != -1:
+            l, r = left[node], right[node]
+            value[node] = (value[l] * cover[l] + value[r] * cover[r]) / cover[node]
+    return value
+
+
+def _tree_depth(left, right):
+    depth = np.zeros(len(left), dtype=np.int64)
+    # XGBoost numbers children after their parents, so one forward pass suffices
+    for node in range(len(left)):
+        if left[node] != -1:
+            depth[left[node]] = depth[node] + 1
+            depth[right[node]] = depth[node] + 1
+    return int(depth.max())
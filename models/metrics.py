@@ -0,0 +1,214 @@
+"""In-process counters and histograms rendered in the Prometheus text exposition format
+
+Metrics are module-level objects so any layer can record into them
+without threading a registry through constructors. Recording takes one
+lock and a bisect, a microsecond or two, so instrumentation stays on.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds; request stages range from microseconds to seconds
+LATENCY_BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# Loading an artifact takes milliseconds, training takes seconds
+LOAD_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+
+def disease_label(disease_type, known):
+    """Label value for a disease; names a client made up are folded into 'unknown'"""
+    return disease_type if disease_type in known else 'unknown'
+
+
+def process_memory(pid='self'):
+    """Resident (rss), proportional (pss), shared and private memory of a process in bytes
+
+    Read from /proc/<pid>/smaps_rollup, so only available on Linux; returns
+    None elsewhere. PSS splits every shared page evenly between the
+    processes mapping it, so summing it over workers gives their true
+    combined footprint where summing RSS counts shared models once per worker.
+    """
+    fields = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    except OSError:
+        return None
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'shared': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        'private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    }
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = list(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def count(self, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            return sum(series[0]) if series else 0
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = sorted((labels, list(series[0]), series[1]) for labels, series in self._series.items())
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ['+Inf'], counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames + ('le',), labels + (_format_value(bound),))
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(total)}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Renders registered metrics plus values sampled from callbacks at scrape time"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, name, help, labelnames, collect, type='gauge'):
+        """collect() returns {label tuple: value}; it runs only when /metrics is scraped
+
+        Registering a name again replaces its collector, so components
+        that are rebuilt (e.g. in tests) don't report twice.
+        """
+        with self._lock:
+            self._collectors[name] = (help, type, tuple(labelnames), collect)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors.items())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for name, (help, type, labelnames, collect) in collectors:
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {type}')
+            for labels, value in sorted(collect().items()):
+                lines.append(f'{name}{_format_labels(labelnames, labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value) if value == value else 'NaN'
+    return str(value)
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'diagnosai_stage_seconds',
+    'Time spent in each stage of a prediction request',
+    ['disease', 'stage']
+))
+
+PREDICTIONS = REGISTRY.register(Counter(
+    'diagnosai_predictions_total',
+    'Predictions served, by resulting risk level',
+    ['disease', 'risk_level']
+))
+
+PREDICTION_ERRORS = REGISTRY.register(Counter(
+    'diagnosai_prediction_errors_total',
+    'Predictions that returned an error instead of a result',
+    ['disease', 'stage']
+))
+
+MODEL_LOAD_SECONDS = REGISTRY.register(Histogram(
+    'diagnosai_model_load_seconds',
+    'Time to make a model servable, from a saved artifact, mapped tables or by training',
+    ['disease', 'source'],
+    buckets=LOAD_BUCKETS
+))
+
+MODEL_RELOAD_SECONDS = REGISTRY.register(Histogram(
+    'diagnosai_model_reload_seconds',
+    'Time to load, check and swap in a model on reload, by outcome',
+    ['disease', 'outcome'],
+    buckets=LOAD_BUCKETS
+))
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'diagnosai_request_seconds',
+    'End-to-end request latency by route',
+    ['route', 'status']
+))
@@ -0,0 +1,163 @@
+"""Merge reports from the legacy report tables into the unified diagnostic_reports store
+
+The source databases are located from the package and the target from
+DIAGNOSAI_REPORTS_DB, like DiagnosticReport does, not from the working
+directory. Run from the project root:
+    python -m models.migrate_reports [--chunk-size 1000] [--drop-sources]
+
+Rows are copied in id order, one chunk per transaction, and the last copied
+id of every source is recorded in the target database, so an interrupted
+run picks up where it stopped instead of copying rows twice.
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+from models.diagnostic_report import DiagnosticReport
+from models.migrate_symptoms import APP_DB_PATH, LEGACY_DB_PATH, _pack_legacy
+
+# name -> (database file, table, SELECT returning id, user_id, disease_type,
+#          symptoms, prediction_result, confidence, risk_level, timestamp)
+SOURCES = {
+    # Written by /predict through the old SQLAlchemy DiagnosisReport model
+    'diagnosis_report': (APP_DB_PATH, 'diagnosis_report', '''
+        SELECT id, user_id, disease_type, symptoms, prediction_result, confidence,
+               CASE WHEN confidence > 70 THEN 'High' WHEN confidence > 50 THEN 'Medium' ELSE 'Low' END,
+               created_at
+        FROM diagnosis_report WHERE id > ? ORDER BY id LIMIT ?
+    '''),
+    # Written by DiagnosticReport when it kept its own database in the working directory
+    'diagnostic_reports_legacy': (LEGACY_DB_PATH, 'diagnostic_reports', '''
+        SELECT id, NULL, disease_type, symptoms, prediction_result, confidence, risk_level, timestamp
+        FROM diagnostic_reports WHERE id > ? ORDER BY id LIMIT ?
+    ''')
+}
+
+PROGRESS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS migration_progress (
+        source TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL
+    )
+'''
+
+INSERT_KEEP_ID_SQL = '''
+    INSERT OR IGNORE INTO diagnostic_reports
+    (id, user_id, disease_type, symptoms, prediction_result, confidence, risk_level, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_NEW_ID_SQL = '''
+    INSERT INTO diagnostic_reports
+    (user_id, disease_type, symptoms, prediction_result, confidence, risk_level, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def migrate_source(name, chunk_size=1000, keep_ids=None):
+    """Copy every not yet migrated row of one source into diagnostic_reports"""
+    db_path, table, select_sql = SOURCES[name]
+    storage = DiagnosticReport.storage
+    if os.path.realpath(db_path) == os.path.realpath(storage.db_path) and table == 'diagnostic_reports':
+        raise ValueError(f'Source {name} is the unified store itself')
+    # Only ids from the database the store lives in are worth keeping, since
+    # those are the ones /report/<id> links already point at
+    if keep_ids is None:
+        keep_ids = os.path.realpath(db_path) == os.path.realpath(storage.db_path)
+
+    stats = {'source': name, 'copied': 0, 'renumbered': 0}
+    source = sqlite3.connect(db_path)
+    try:
+        with storage.transaction() as conn:
+            conn.execute(PROGRESS_TABLE_SQL)
+            row = conn.execute('SELECT last_id FROM migration_progress WHERE source = ?', (name,)).fetchone()
+            if keep_ids:
+                # Renumbered rows must not take an id that a later source row keeps
+                _reserve_ids(conn, source.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0])
+        last_id = row[0] if row else 0
+
+        while True:
+            rows = source.execute(select_sql, (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+
+            with storage.transaction() as conn:
+                for report_id, *fields in rows:
+                    fields = _convert(*fields)
+                    if not (keep_ids and conn.execute(INSERT_KEEP_ID_SQL, (report_id, *fields)).rowcount):
+                        conn.execute(INSERT_NEW_ID_SQL, fields)
+                        stats['renumbered'] += 1
+                last_id = rows[-1][0]
+                # Progress commits together with the chunk it describes
+                conn.execute('INSERT OR REPLACE INTO migration_progress (source, last_id) VALUES (?, ?)',
+                             (name, last_id))
+            stats['copied'] += len(rows)
+            print(f"  {name}: {stats['copied']} copied (last id {last_id})")
+    finally:
+        source.close()
+    return stats
+
+
+def _reserve_ids(conn, max_id):
+    """Make AUTOINCREMENT inserts into diagnostic_reports start after max_id"""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+        return
+    if conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'diagnostic_reports'",
+                    (max_id,)).rowcount == 0:
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('diagnostic_reports', ?)", (max_id,))
+
+
+def drop_source(name):
+    """Drop a fully migrated legacy table"""
+    db_path, table, _ = SOURCES[name]
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute(f'DROP TABLE IF EXISTS {table}')
+    finally:
+        conn.close()
+
+
+def _convert(user_id, disease_type, symptoms, prediction_result, confidence, risk_level, timestamp):
+    if isinstance(symptoms, str):
+        # Pack text symptoms on the way; values packing can't represent stay text
+        symptoms = _pack_legacy(disease_type, symptoms) or symptoms
+    if timestamp is not None:
+        # SQLAlchemy stored microseconds; the store keeps whole seconds
+        timestamp = str(timestamp)[:len('0000-00-00 00:00:00')]
+    return (user_id, disease_type, symptoms, prediction_result, confidence, risk_level, timestamp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--drop-sources', action='store_true',
+                        help='drop each legacy table once all of its rows are copied')
+    args = parser.parse_args()
+
+    print(f"Target: {DiagnosticReport.storage.db_path}")
+    copied = 0
+    for name, (db_path, table, _) in SOURCES.items():
+        if not os.path.exists(db_path):
+            print(f"Skipping {name}: {db_path} not found")
+            continue
+        try:
+            start = time.perf_counter()
+            stats = migrate_source(name, args.chunk_size)
+        except (sqlite3.OperationalError, ValueError) as e:
+            print(f"Skipping {name}: {e}")
+            continue
+        print(f"{db_path}:{table}: {stats['copied']} reports copied, {stats['renumbered']} with new ids "
+              f"in {time.perf_counter() - start:.2f}s")
+        copied += stats['copied']
+        if args.drop_sources:
+            drop_source(name)
+            print(f"Dropped {db_path}:{table}")
+
+    if copied:
+        # Copied rows bypass DiagnosticReport.save, so recount the dashboard aggregates
+        print(f"Rebuilt {DiagnosticReport.rebuild_stats()} dashboard aggregate rows")
+
+
+if __name__ == '__main__':
+    main()
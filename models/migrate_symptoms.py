@@ -0,0 +1,110 @@
+"""Rewrite stored symptoms from text (str() or JSON) to the packed binary format
+
+The databases are located from the package and DIAGNOSAI_REPORTS_DB, like
+DiagnosticReport does, not from the working directory. Run from the project root:
+    python -m models.migrate_symptoms [--chunk-size 1000] [--vacuum]
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+from models.diagnostic_report import DEFAULT_DB_PATH, PROJECT_ROOT
+from models.symptom_codec import SCHEMA_IDS, SCHEMAS, encode_symptoms, decode_legacy_symptoms
+
+# Legacy stores, until models.migrate_reports has merged them: the users
+# database of app.py, which held the SQLAlchemy diagnosis_report table, and
+# the database DiagnosticReport used to keep in the working directory
+APP_DB_PATH = os.path.join(PROJECT_ROOT, 'database', 'diagnosai.db')
+LEGACY_DB_PATH = os.path.join(PROJECT_ROOT, 'diagnosai.db')
+
+# (database file, table) pairs holding a symptoms column
+TARGETS = [
+    (DEFAULT_DB_PATH, 'diagnostic_reports'),
+    (LEGACY_DB_PATH, 'diagnostic_reports'),
+    (APP_DB_PATH, 'diagnosis_report')
+]
+
+
+def migrate_table(db_path, table, chunk_size=1000, vacuum=False):
+    """Pack every text symptoms value in a table, one chunk per transaction"""
+    if table not in {t for _, t in TARGETS}:
+        raise ValueError(f'Unknown report table {table}')
+
+    conn = sqlite3.connect(db_path)
+    select_sql = f'''
+        SELECT id, disease_type, symptoms FROM {table}
+        WHERE id > ? AND typeof(symptoms) = 'text'
+        ORDER BY id LIMIT ?
+    '''
+    update_sql = f'UPDATE {table} SET symptoms = ? WHERE id = ?'
+
+    stats = {'table': table, 'converted': 0, 'kept': 0, 'bytes_before': 0, 'bytes_after': 0}
+    last_id = 0
+    try:
+        while True:
+            rows = conn.execute(select_sql, (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+
+            updates = []
+            for report_id, disease_type, text in rows:
+                last_id = report_id
+                packed = _pack_legacy(disease_type, text)
+                if packed is None:
+                    stats['kept'] += 1
+                    continue
+                updates.append((packed, report_id))
+                stats['bytes_before'] += len(text.encode('utf-8'))
+                stats['bytes_after'] += len(packed)
+
+            with conn:
+                conn.executemany(update_sql, updates)
+            stats['converted'] += len(updates)
+            print(f"  {table}: {stats['converted']} converted, {stats['kept']} kept as text (last id {last_id})")
+
+        if vacuum and stats['converted']:
+            conn.execute('VACUUM')
+    finally:
+        conn.close()
+    return stats
+
+
+def _pack_legacy(disease_type, text):
+    """Packed bytes for a legacy symptoms value, or None when packing would lose data"""
+    schema_id = SCHEMA_IDS.get(disease_type)
+    if schema_id is None:
+        return None
+    symptoms = decode_legacy_symptoms(text)
+    # Unparseable text comes back as a string; keys outside the schema or non-numeric values have no packed representation
+    if not isinstance(symptoms, dict) or not set(symptoms) <= set(SCHEMAS[schema_id][1]):
+        return None
+    try:
+        return encode_symptoms(disease_type, symptoms)
+    except (TypeError, ValueError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--vacuum', action='store_true', help='reclaim freed space afterwards')
+    args = parser.parse_args()
+
+    for db_path, table in TARGETS:
+        if not os.path.exists(db_path):
+            print(f"Skipping {db_path}: not found")
+            continue
+        try:
+            start = time.perf_counter()
+            stats = migrate_table(db_path, table, args.chunk_size, args.vacuum)
+        except sqlite3.OperationalError as e:
+            print(f"Skipping {db_path}:{table}: {e}")
+            continue
+        saved = stats['bytes_before'] - stats['bytes_after']
+        print(f"{db_path}:{table}: {stats['converted']} rows packed, {stats['kept']} kept, "
+              f"{saved} symptom bytes saved in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import OrderedDict
+
+class ModelCache:
+    """Thread-safe LRU cache that loads per-disease models on first use"""
+
+    def __init__(self, loader, max_models=None, max_bytes=None):
+        # loader(key) must return a (value, size_bytes) tuple
+        self.loader = loader
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def get(self, key):
+        """Return the cached value for key, loading it if needed"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a given key; the others wait and reuse its result
+        with load_lock:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+                self.misses += 1
+
+            start = time.perf_counter()
+            value, size = self.loader(key)
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self.loads += 1
+                self.load_seconds += elapsed
+                self._store(key, value, size)
+            return value
+
+    def put(self, key, value, size=0):
+        """Insert or replace a value without going through the loader"""
+        with self._lock:
+            self._store(key, value, size)
+
+    def invalidate(self, key=None):
+        """Drop one key, or every key when none is given"""
+        with self._lock:
+            keys = [key] if key is not None else list(self._entries)
+            for k in keys:
+                entry = self._entries.pop(k, None)
+                if entry is not None:
+                    self.total_bytes -= entry[1]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def items(self):
+        """Snapshot of the currently resident (key, value) pairs"""
+        with self._lock:
+            return [(k, entry[0]) for k, entry in self._entries.items()]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'resident': list(self._entries),
+                'resident_count': len(self._entries),
+                'resident_bytes': self.total_bytes,
+                'max_models': self.max_models,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'loads': self.loads,
+                'load_seconds': round(self.load_seconds, 6),
+                'evictions': self.evictions
+            }
+
+    def _store(self, key, value, size):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= old[1]
+        self._entries[key] = (value, size)
+        self.total_bytes += size
+
+        # Evict least recently used entries, but never the one just stored
+        while len(self._entries) > 1 and self._over_budget():
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.total_bytes -= evicted_size
+            self.evictions += 1
+
+    def _over_budget(self):
+        if self.max_models is not None and len(self._entries) > self.max_models:
+            return True
+        if self.max_bytes is not None and self.total_bytes > self.max_bytes:
+            return True
+        return False
@@ -1,6 +1,20 @@
 import joblib
+import hashlib
+import io
+import json
 import os
 
+import numpy as np
+
+# Bump when the on-disk artifact layout changes
+ARTIFACT_VERSION = 1
+
+# Bump when the meaning of the compiled tables changes; older files are recompiled
+COMPILED_VERSION = 2
+
+# Compiled tables start on cache-line boundaries inside their file
+COMPILED_ALIGNMENT = 64
+
 class ModelLoader:
     def __init__(self, models_dir='saved_models'):
         self.models_dir = models_dir
@@ -26,4 +40,153 @@ class ModelLoader:
         ml_models = ['randomforest_diabetes', 'randomforest_cancer', 'randomforest_kidney']
         
         for model in ml_models:
-            self.load_ml_model(model)
\ No newline at end of file
+            self.load_ml_model(model)
+
+    def artifact_path(self, name):
+        return os.path.join(self.models_dir, f'{name}_artifact.pkl')
+
+    def metadata_path(self, name):
+        return os.path.join(self.models_dir, f'{name}_artifact.json')
+
+    def save_artifact(self, name, model, scaler, feature_names, metadata=None):
+        """Persist a fitted model, its scaler and feature order as a versioned artifact"""
+        os.makedirs(self.models_dir, exist_ok=True)
+
+        buffer = io.BytesIO()
+        joblib.dump({
+            'model': model,
+            'scaler': scaler,
+            'feature_names': list(feature_names)
+        }, buffer)
+        data = buffer.getvalue()
+
+        info = dict(metadata or {})
+        info.update({
+            'artifact_version': ARTIFACT_VERSION,
+            'feature_names': list(feature_names),
+            'content_hash': hashlib.sha256(data).hexdigest(),
+            'size_bytes': len(data)
+        })
+
+        # Write the artifact before its metadata so a crash never leaves
+        # metadata pointing at a half-written file
+        _atomic_write(self.artifact_path(name), data)
+        _atomic_write(self.metadata_path(name), json.dumps(info, indent=2, sort_keys=True).encode('utf-8'))
+        return info
+
+    def load_metadata(self, name):
+        """Read the metadata sidecar of an artifact, or None if there is none"""
+        try:
+            with open(self.metadata_path(name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load_artifact(self, name, spec_hash=None):
+        """Load an artifact if it exists, matches the expected spec and passes its hash check"""
+        info = self.load_metadata(name)
+        if info is None:
+            return None
+        if info.get('artifact_version') != ARTIFACT_VERSION:
+            print(f"Artifact {name} has version {info.get('artifact_version')}, expected {ARTIFACT_VERSION}")
+            return None
+        if spec_hash is not None and info.get('spec_hash') != spec_hash:
+            print(f"Artifact {name} is stale (training spec changed)")
+            return None
+
+        try:
+            with open(self.artifact_path(name), 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            print(f"Error reading artifact {name}: {e}")
+            return None
+
+        if hashlib.sha256(data).hexdigest() != info.get('content_hash'):
+            print(f"Artifact {name} failed its content hash check")
+            return None
+
+        try:
+            artifact = joblib.load(io.BytesIO(data))
+        except Exception as e:
+            print(f"Error loading artifact {name}: {e}")
+            return None
+
+        artifact['metadata'] = info
+        return artifact
+
+    def compiled_path(self, name):
+        return os.path.join(self.models_dir, f'{name}_compiled.bin')
+
+    def compiled_metadata_path(self, name):
+        return os.path.join(self.models_dir, f'{name}_compiled.json')
+
+    def save_compiled(self, name, arrays, params, source_hash):
+        """Write compiled tree tables into one flat file that processes can memory-map
+
+        source_hash is the content hash of the artifact the tables were
+        compiled from; load_compiled refuses tables built from another one.
+        """
+        os.makedirs(self.models_dir, exist_ok=True)
+
+        chunks, layout = [], {}
+        offset = 0
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            padding = -offset % COMPILED_ALIGNMENT
+            chunks.append(b'\0' * padding)
+            offset += padding
+            layout[key] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            chunks.append(array.tobytes())
+            offset += array.nbytes
+
+        info = {
+            'artifact_version': ARTIFACT_VERSION,
+            'compiled_version': COMPILED_VERSION,
+            'source_hash': source_hash,
+            'arrays': layout,
+            'params': params,
+            'size_bytes': offset
+        }
+        # Replacing the file leaves processes that mapped the old one reading a consistent copy
+        _atomic_write(self.compiled_path(name), b''.join(chunks))
+        _atomic_write(self.compiled_metadata_path(name), json.dumps(info, indent=2, sort_keys=True).encode('utf-8'))
+        return info
+
+    def load_compiled(self, name, source_hash):
+        """Memory-map compiled tree tables read-only as (arrays, params), or None if missing or stale
+
+        The pages are shared through the OS page cache, so every process
+        mapping the same file holds one physical copy of the tables.
+        """
+        try:
+            with open(self.compiled_metadata_path(name), 'r', encoding='utf-8') as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (info.get('artifact_version') != ARTIFACT_VERSION or info.get('compiled_version') != COMPILED_VERSION
+                or info.get('source_hash') != source_hash):
+            return None
+
+        path = self.compiled_path(name)
+        try:
+            if os.path.getsize(path) != info['size_bytes']:
+                print(f"Compiled tables for {name} are truncated")
+                return None
+            buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        except (OSError, ValueError) as e:
+            print(f"Error mapping compiled tables for {name}: {e}")
+            return None
+
+        arrays = {}
+        for key, spec in info['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape']))
+            arrays[key] = np.frombuffer(buffer, dtype=dtype, count=count, offset=spec['offset']).reshape(spec['shape'])
+        return arrays, info['params']
+
+
+def _atomic_write(path, data):
+    tmp_path = f'{path}.tmp.{os.getpid()}'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
@@ -0,0 +1,27 @@
+"""Recompute the dashboard aggregates (report_stats, report_daily_stats) from the stored reports
+
+Reports normally keep the aggregates current as they are saved; run this
+after writing to diagnostic_reports by other means, or to repair them.
+
+Run from the project root:
+    python -m models.rebuild_stats
+"""
+import argparse
+import time
+
+from models.diagnostic_report import DiagnosticReport
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+
+    start = time.perf_counter()
+    groups = DiagnosticReport.rebuild_stats()
+    summary = DiagnosticReport.summary()
+    print(f"Rebuilt {groups} aggregate rows covering {summary['total']} reports "
+          f"in {time.perf_counter() - start:.2f}s ({DiagnosticReport.storage.db_path})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Write reports the write-behind writer could not commit back into the report store
+
+Run from the project root once the database accepts writes again:
+    python -m models.replay_reports [--path report_dead_letter.jsonl]
+
+Reports whose id is already stored are skipped, so a replay can be
+repeated safely. The file is moved to <path>.replaying before it is
+read, so reports dead-lettered during the replay go to a new file at
+<path>, and renamed to <path>.replayed afterwards. A .replaying file
+left by an interrupted replay is replayed again first.
+"""
+import argparse
+import os
+import time
+
+from models.diagnostic_report import DEFAULT_DEAD_LETTER_PATH, DiagnosticReport
+from models.report_writer import DeadLetterFile
+
+
+def replay(path, chunk_size=1000):
+    """Save every dead-lettered report not stored yet, returning (replayed, skipped)"""
+    replayed = skipped = 0
+    chunk = []
+    for record, _ in DeadLetterFile(path, DiagnosticReport.to_record).read():
+        chunk.append(DiagnosticReport(**record))
+        if len(chunk) >= chunk_size:
+            saved = _save_new(chunk)
+            replayed, skipped = replayed + saved, skipped + len(chunk) - saved
+            chunk = []
+    if chunk:
+        saved = _save_new(chunk)
+        replayed, skipped = replayed + saved, skipped + len(chunk) - saved
+    return replayed, skipped
+
+
+def _save_new(reports):
+    stored = DiagnosticReport.existing_ids(report.id for report in reports if report.id is not None)
+    # The same report may have been dead-lettered twice, e.g. by two workers sharing the file
+    new, seen = [], set(stored)
+    for report in reports:
+        if report.id is None or report.id not in seen:
+            new.append(report)
+            seen.add(report.id)
+    if new:
+        DiagnosticReport.save_many(new)
+    return len(new)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--path', default=DEFAULT_DEAD_LETTER_PATH)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    replaying = args.path + '.replaying'
+    if not os.path.exists(replaying):
+        if not os.path.exists(args.path):
+            print(f"Nothing to replay: {args.path} not found")
+            return
+        # Writers keep appending to path; they start a new file once this one is moved
+        os.replace(args.path, replaying)
+
+    DiagnosticReport.create_table()
+    start = time.perf_counter()
+    replayed, skipped = replay(replaying, args.chunk_size)
+    os.replace(replaying, args.path + '.replayed')
+    print(f"Replayed {replayed} reports, skipped {skipped} already stored, in {time.perf_counter() - start:.2f}s "
+          f"({DiagnosticReport.storage.db_path})")
+
+
+if __name__ == '__main__':
+    main()
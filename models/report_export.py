@@ -0,0 +1,50 @@
+"""Streaming serializers for report history exports
+
+Each format turns an iterator of reports (DiagnosticReport.iter_reports)
+into text chunks of a few hundred reports, so a response can stream an
+export of any size while holding only one chunk in memory.
+"""
+import csv
+import io
+import json
+
+# Reports per yielded chunk; larger chunks mean fewer writes to the socket
+CHUNK_ROWS = 500
+
+CSV_COLUMNS = ['id', 'timestamp', 'disease_type', 'prediction_result', 'confidence', 'risk_level', 'symptoms']
+
+
+def ndjson_chunks(reports, chunk_rows=CHUNK_ROWS):
+    """One JSON object per line"""
+    lines = []
+    for report in reports:
+        lines.append(json.dumps(report.to_dict()))
+        if len(lines) >= chunk_rows:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def csv_chunks(reports, chunk_rows=CHUNK_ROWS):
+    """A header row, then one row per report with the symptoms as a JSON object"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for i, report in enumerate(reports, 1):
+        record = report.to_dict()
+        record['symptoms'] = json.dumps(record['symptoms'])
+        writer.writerow([record[column] for column in CSV_COLUMNS])
+        if i % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+# Serializer and content type of every export format
+EXPORT_FORMATS = {
+    'ndjson': (ndjson_chunks, 'application/x-ndjson'),
+    'csv': (csv_chunks, 'text/csv')
+}
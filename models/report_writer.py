@@ -0,0 +1,273 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Upper bounds (in reports) of the commit batch size histogram buckets
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+class ReportIdAllocator:
+    """Hand out report ids before the row is written, reserving them in blocks
+
+    Blocks are reserved through a small sequence table in the same
+    database, so several processes writing to one table never hand out
+    the same id. Ids left in a block when a process exits are skipped.
+    """
+
+    def __init__(self, db_path, table, block_size=100):
+        self.db_path = db_path
+        self.table = table
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+        self._pid = os.getpid()
+        # Largest id this process has handed out; larger ids can't be in its writer queue
+        self.high_water = 0
+
+    def next_id(self):
+        with self._lock:
+            # A block reserved by the parent must not be reused after fork()
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._next = self._end = self.high_water = 0
+            if self._next >= self._end:
+                self._next = self._reserve_block()
+                self._end = self._next + self.block_size
+            report_id = self.high_water = self._next
+            self._next += 1
+            return report_id
+
+    def _reserve_block(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS report_id_blocks (
+                    name TEXT PRIMARY KEY,
+                    next_id INTEGER NOT NULL
+                )
+            ''')
+            row = conn.execute('SELECT next_id FROM report_id_blocks WHERE name = ?', (self.table,)).fetchone()
+            if row is None:
+                start = conn.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {self.table}').fetchone()[0]
+            else:
+                # Rows inserted without the allocator may have moved past the sequence
+                start = max(row[0], conn.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {self.table}').fetchone()[0])
+            conn.execute('INSERT OR REPLACE INTO report_id_blocks (name, next_id) VALUES (?, ?)',
+                         (self.table, start + self.block_size))
+            # Keep AUTOINCREMENT inserts from taking ids that are reserved but not yet written
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+                seq = start + self.block_size - 1
+                if conn.execute('UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?',
+                                (seq, self.table)).rowcount == 0:
+                    conn.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (self.table, seq))
+            conn.execute('COMMIT')
+            return start
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+
+class DeadLetterFile:
+    """Append-only JSON-lines file of items a writer could not commit, kept for replay
+
+    serialize(item) must return a JSON-serializable dict; read() yields
+    those dicts back with the error that stopped each item.
+    """
+
+    def __init__(self, path, serialize):
+        self.path = path
+        self.serialize = serialize
+        self._lock = threading.Lock()
+
+    def __call__(self, items, error):
+        failed_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        lines = ''.join(json.dumps({'failed_at': failed_at, 'error': str(error), 'item': self.serialize(item)}) + '\n'
+                        for item in items)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+            # The items exist nowhere else once this returns
+            os.fsync(f.fileno())
+
+    def read(self):
+        """Yield (item dict, error message) for every dead letter in the file"""
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record['item'], record['error']
+
+
+class WriteBehindWriter:
+    """Background thread that commits queued reports in grouped transactions
+
+    commit_batch(items) is called with up to max_batch items at a time
+    and must write them in one transaction. When the queue is full,
+    submit() either writes the report synchronously in the caller's
+    thread ('sync') or waits for space up to block_timeout ('block').
+    A batch that still fails after the retries is passed to
+    dead_letter(items, error), e.g. a DeadLetterFile, instead of being lost.
+    """
+
+    def __init__(self, commit_batch, max_queue=1000, max_batch=100, linger_ms=5.0,
+                 full_policy='sync', block_timeout=5.0, retries=3, dead_letter=None):
+        if full_policy not in ('sync', 'block'):
+            raise ValueError(f"Unknown queue-full policy {full_policy}")
+        self.commit_batch = commit_batch
+        self.max_batch = max_batch
+        self.linger = linger_ms / 1000.0
+        self.full_policy = full_policy
+        self.block_timeout = block_timeout
+        self.retries = retries
+        self.dead_letter = dead_letter
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+        self.submitted = 0
+        self.committed = 0
+        self.failed = 0
+        self.dead_lettered = 0
+        self.sync_writes = 0
+        self.batches = 0
+        self.batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self.lag_seconds_total = 0.0
+        self.lag_seconds_max = 0.0
+
+        self._thread = threading.Thread(target=self._run, name='report-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """Queue one report for writing"""
+        if self._stopping.is_set():
+            raise RuntimeError('Report writer is closed')
+        with self._lock:
+            self.submitted += 1
+        entry = (item, time.perf_counter())
+        try:
+            if self.full_policy == 'block':
+                self._queue.put(entry, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(entry)
+        except queue.Full:
+            if self.full_policy == 'block':
+                raise
+            # Backpressure: the caller pays for its own write instead of growing the queue
+            self._commit([entry])
+            with self._lock:
+                self.sync_writes += 1
+
+    def flush(self, timeout=None):
+        """Wait until every queued report has been committed; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Stop accepting reports, write everything still queued and stop the thread"""
+        self._stopping.set()
+        self.flush(timeout)
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            histogram = {}
+            cumulative = 0
+            for bound, count in zip(BATCH_SIZE_BUCKETS + ['+Inf'], self.batch_size_counts):
+                cumulative += count
+                histogram[str(bound)] = cumulative
+            return {
+                'queue_depth': self._queue.qsize(),
+                'submitted': self.submitted,
+                'committed': self.committed,
+                'failed': self.failed,
+                'dead_lettered': self.dead_lettered,
+                'sync_writes': self.sync_writes,
+                'batches': self.batches,
+                'mean_batch_size': self.committed / self.batches if self.batches else 0.0,
+                'batch_size_histogram': histogram,
+                'mean_lag_ms': 1000 * self.lag_seconds_total / self.committed if self.committed else 0.0,
+                'max_lag_ms': 1000 * self.lag_seconds_max
+            }
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+
+            # Linger briefly so reports arriving together share one commit
+            deadline = time.perf_counter() + self.linger
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._commit(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _commit(self, batch):
+        items = [item for item, _ in batch]
+        error = None
+        for attempt in range(self.retries):
+            try:
+                self.commit_batch(items)
+                break
+            except Exception as e:
+                error = e
+                print(f"Error writing {len(items)} report(s) (attempt {attempt + 1}): {e}")
+                time.sleep(0.05 * (attempt + 1))
+        else:
+            with self._lock:
+                self.failed += len(items)
+            self._give_up(items, error)
+            return
+
+        now = time.perf_counter()
+        with self._lock:
+            self.batches += 1
+            self.committed += len(items)
+            for _, enqueued_at in batch:
+                lag = now - enqueued_at
+                self.lag_seconds_total += lag
+                self.lag_seconds_max = max(self.lag_seconds_max, lag)
+            for i, bound in enumerate(BATCH_SIZE_BUCKETS):
+                if len(items) <= bound:
+                    self.batch_size_counts[i] += 1
+                    break
+            else:
+                self.batch_size_counts[-1] += 1
+
+    def _give_up(self, items, error):
+        ids = [getattr(item, 'id', None) for item in items]
+        print(f"Giving up on {len(items)} report(s) after {self.retries} attempts: {error} (ids {ids})")
+        if self.dead_letter is None:
+            print(f"LOST {len(items)} report(s): no dead-letter store configured")
+            return
+        try:
+            self.dead_letter(items, error)
+        except Exception as e:
+            print(f"LOST {len(items)} report(s): could not write them to the dead-letter store: {e}")
+            return
+        with self._lock:
+            self.dead_lettered += len(items)
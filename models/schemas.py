@@ -0,0 +1,124 @@
+"""Per-disease input schemas compiled once at import
+
+A schema fixes a disease's feature order, the index of every feature,
+the dtype of the model input, the accepted range of each value and the
+result labels, so requests are validated and assembled straight into a
+NumPy row without rebuilding any of that per call.
+"""
+import numpy as np
+
+DISEASE_TYPES = ['diabetes', 'covid', 'pneumonia', 'kidney_disease',
+                 'breast_cancer', 'alzheimer', 'brain_tumor', 'hepatitis_c']
+
+# Ordered model inputs for each disease
+DISEASE_FEATURES = {
+    'diabetes': ['age', 'blood_pressure', 'glucose', 'bmi', 'pregnancies', 'skin_thickness', 'insulin', 'diabetes_pedigree'],
+    'covid': ['fever', 'cough', 'fatigue', 'breathing_difficulty', 'chest_pain', 'sore_throat', 'loss_of_taste'],
+    'pneumonia': ['fever', 'cough', 'chest_pain', 'breathing_difficulty', 'fatigue', 'sweating', 'chills'],
+    'kidney_disease': ['age', 'blood_pressure', 'albumin', 'sugar', 'red_blood_cells', 'pus_cells', 'blood_glucose'],
+    'breast_cancer': ['radius_mean', 'texture_mean', 'perimeter_mean', 'area_mean', 'smoothness_mean', 'compactness_mean'],
+    'alzheimer': ['age', 'memory_loss', 'cognitive_decline', 'behavior_changes', 'mri_findings', 'genetic_risk'],
+    'brain_tumor': ['headaches', 'seizures', 'vision_problems', 'nausea', 'mri_abnormalities', 'speech_difficulty'],
+    'hepatitis_c': ['fatigue', 'jaundice', 'abdominal_pain', 'nausea', 'liver_enzymes', 'bilirubin']
+}
+
+# Accepted (low, high) values per feature, inclusive. Symptom severities use
+# the 0-10 scale of the prediction form; measurements get physical bounds.
+FEATURE_RANGES = {
+    'age': (0, 120),
+    'blood_pressure': (0, 300),
+    'glucose': (0, 1000),
+    'bmi': (0, 100),
+    'pregnancies': (0, 30),
+    'skin_thickness': (0, 200),
+    'insulin': (0, 1000),
+    'diabetes_pedigree': (0, 5),
+    'fever': (0, 45),
+    'albumin': (0, 10),
+    'sugar': (0, 1000),
+    'blood_glucose': (0, 1000),
+    'radius_mean': (0, 50),
+    'texture_mean': (0, 50),
+    'perimeter_mean': (0, 300),
+    'area_mean': (0, 3000),
+    'liver_enzymes': (0, 5000),
+    'bilirubin': (0, 50)
+}
+
+# Range of every feature not listed above
+SEVERITY_RANGE = (0, 10)
+
+
+class FeatureSchema:
+    """Compiled input schema of one disease model"""
+
+    def __init__(self, disease_type, features, labels, ranges=FEATURE_RANGES, dtype=np.float64):
+        self.disease_type = disease_type
+        self.features = tuple(features)
+        self.index = {name: i for i, name in enumerate(self.features)}
+        self.size = len(self.features)
+        self.dtype = np.dtype(dtype)
+        self.low = tuple(float(ranges.get(name, SEVERITY_RANGE)[0]) for name in self.features)
+        self.high = tuple(float(ranges.get(name, SEVERITY_RANGE)[1]) for name in self.features)
+        self.titles = tuple(name.replace('_', ' ').title() for name in self.features)
+        self.labels = tuple(labels)
+        # Everything parse() needs per field, in one tuple so the loop does no lookups
+        self._fields = tuple(zip(range(self.size), self.features, self.low, self.high, self.titles))
+
+    def new_row(self):
+        return np.zeros(self.size, dtype=self.dtype)
+
+    def parse(self, values, out=None, required=False):
+        """Validate a mapping of raw values into a feature row, returning (row, errors)
+
+        errors holds one {'field', 'code', 'message'} dict per rejected
+        value, with code 'required', 'invalid' or 'out_of_range'; the row
+        is only meaningful when errors is empty. Missing or blank values
+        are 0 unless required is set.
+        """
+        numbers = [0.0] * self.size
+        errors = []
+        for i, name, low, high, title in self._fields:
+            value = values.get(name)
+            if value is None or value == '':
+                if required:
+                    errors.append({'field': name, 'code': 'required', 'message': f"{title} is required"})
+                continue
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                errors.append({'field': name, 'code': 'invalid', 'message': f"{title} must be a number"})
+                continue
+            # NaN fails both comparisons, infinities fail the bounds
+            if not low <= number <= high:
+                errors.append({'field': name, 'code': 'out_of_range',
+                               'message': f"{title} must be between {low:g} and {high:g}"})
+                continue
+            numbers[i] = number
+
+        # One bulk copy into the row is cheaper than a NumPy item assignment per field
+        row = self.new_row() if out is None else out
+        row[:] = numbers
+        return row, errors
+
+    def assemble(self, values, out=None):
+        """Convert a mapping of values into a feature row without range checks
+
+        Missing values are 0. Raises ValueError naming the first field that
+        is not a number.
+        """
+        row = self.new_row() if out is None else out
+        try:
+            row[:] = [float(values.get(name, 0)) for name in self.features]
+        except (TypeError, ValueError):
+            for name in self.features:
+                try:
+                    float(values.get(name, 0))
+                except (TypeError, ValueError):
+                    raise ValueError(f"Symptom {name} must be a number") from None
+            raise
+        return row
+
+    def to_dict(self, row):
+        """Feature values of a row by name, as plain floats"""
+        return dict(zip(self.features, row.tolist()))
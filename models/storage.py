@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+class ReportStorage:
+    """Pooled SQLite connections in WAL mode, held by one thread at a time
+
+    A thread takes a connection on its first query and keeps it until it
+    calls release() (the app does after every request) or exits; the
+    connection then goes back to a pool of at most max_idle idle ones.
+    Reusing connections avoids the connect/close cost on every query and
+    lets sqlite3 reuse its prepared statement cache, while short-lived
+    request threads don't each leave a connection open. WAL mode lets
+    readers run while a writer commits, and a busy timeout makes
+    concurrent writers wait instead of failing with "database is locked".
+    """
+
+    def __init__(self, db_path='diagnosai.db', synchronous='NORMAL', busy_timeout=5.0,
+                 cached_statements=128, max_idle=8):
+        if synchronous.upper() not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+            raise ValueError(f"Invalid synchronous setting {synchronous}")
+        self.db_path = db_path
+        self.synchronous = synchronous.upper()
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self.max_idle = max_idle
+        self._local = threading.local()
+        # Connections held by a thread, and the thread holding each
+        self._owners = {}
+        self._idle = []
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def connection(self):
+        """Return this thread's connection, taking one from the pool on first use"""
+        conn = getattr(self._local, 'conn', None)
+        # A connection inherited across fork() must not be reused by the child
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._acquire()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def release(self):
+        """Give this thread's connection back to the pool; its next query takes one again"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        if self._local.pid != os.getpid():
+            return
+        with self._lock:
+            if self._owners.pop(conn, None) is not None:
+                self._park(conn)
+
+    def stats(self):
+        with self._lock:
+            return {'in_use': len(self._owners), 'idle': len(self._idle), 'max_idle': self.max_idle}
+
+    def _acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # The parent's connections stay with the parent
+                self._owners, self._idle, self._pid = {}, [], os.getpid()
+            # Take back connections of threads that exited without releasing them
+            for conn, thread in list(self._owners.items()):
+                if not thread.is_alive():
+                    del self._owners[conn]
+                    self._park(conn)
+            conn = self._idle.pop() if self._idle else None
+            if conn is not None:
+                self._owners[conn] = threading.current_thread()
+                return conn
+
+        conn = self._connect()
+        with self._lock:
+            self._owners[conn] = threading.current_thread()
+        return conn
+
+    def _park(self, conn):
+        # Called with the lock held
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        if len(self._idle) < self.max_idle:
+            self._idle.append(conn)
+        else:
+            conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """Run a block in one transaction, committing on success and rolling back on error"""
+        conn = self.connection()
+        # If BEGIN itself fails (e.g. database is locked) there is nothing to roll back
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+
+    @contextmanager
+    def snapshot(self):
+        """A dedicated read-only connection holding one read transaction for long scans
+
+        The scan sees a consistent view of the database while writers keep
+        committing through the WAL, and the thread's shared connection stays
+        free for other queries. The connection is closed on exit, including
+        when a streaming consumer stops early.
+        """
+        conn = sqlite3.connect(f'file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro', uri=True,
+                               timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+        try:
+            conn.execute('BEGIN')
+            yield conn
+        finally:
+            conn.close()
+
+    def close(self):
+        """Close every connection of this storage, idle or held by a thread"""
+        with self._lock:
+            for conn in list(self._owners) + self._idle:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    pass
+            self._owners, self._idle = {}, []
+        self._local = threading.local()
+
+    def _connect(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # isolation_level=None leaves transaction control to transaction()
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None,
+                               check_same_thread=False, cached_statements=self.cached_statements)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
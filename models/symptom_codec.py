@@ -0,0 +1,119 @@
+import ast
+import json
+import struct
+
+import numpy as np
+
+from models.schemas import DISEASE_FEATURES
+
+# Packed rows start with a format byte and a schema id, followed by one
+# little-endian float32 per feature in the schema's order
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<BB')
+
+# Schema ids are written into every stored row, so they must never be
+# reused. If a disease's feature list changes, register a new id and keep
+# the old entry with its original feature list so old rows still decode.
+SCHEMAS = {
+    1: ('diabetes', tuple(DISEASE_FEATURES['diabetes'])),
+    2: ('covid', tuple(DISEASE_FEATURES['covid'])),
+    3: ('pneumonia', tuple(DISEASE_FEATURES['pneumonia'])),
+    4: ('kidney_disease', tuple(DISEASE_FEATURES['kidney_disease'])),
+    5: ('breast_cancer', tuple(DISEASE_FEATURES['breast_cancer'])),
+    6: ('alzheimer', tuple(DISEASE_FEATURES['alzheimer'])),
+    7: ('brain_tumor', tuple(DISEASE_FEATURES['brain_tumor'])),
+    8: ('hepatitis_c', tuple(DISEASE_FEATURES['hepatitis_c']))
+}
+
+SCHEMA_IDS = {disease: schema_id for schema_id, (disease, _) in SCHEMAS.items()}
+
+_FEATURE_SETS = {schema_id: frozenset(features) for schema_id, (_, features) in SCHEMAS.items()}
+
+_DTYPE = np.dtype('<f4')
+
+
+def encode_symptoms(disease_type, symptoms):
+    """Pack symptoms into bytes, falling back to JSON text for diseases without a schema
+
+    Values are stored in the schema's feature order; missing features
+    are stored as NaN and left out again when decoding. Symptoms with
+    keys outside the schema have no slot to pack them into, so they are
+    stored as JSON text too rather than losing those keys.
+    """
+    schema_id = SCHEMA_IDS.get(disease_type)
+    if schema_id is None or not _FEATURE_SETS[schema_id].issuperset(symptoms):
+        return json.dumps(symptoms)
+
+    features = SCHEMAS[schema_id][1]
+    values = np.array([float(symptoms[f]) if f in symptoms else np.nan for f in features], dtype=_DTYPE)
+    return HEADER.pack(FORMAT_VERSION, schema_id) + values.tobytes()
+
+
+def decode_symptoms(value):
+    """Decode a stored symptoms value into a dict, accepting packed and legacy text formats"""
+    if not value:
+        return {}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        schema_id, values = _unpack(bytes(value))
+        features = SCHEMAS[schema_id][1]
+        # float32 holds about 7 significant digits; rounding to them turns
+        # 98.59999847 back into the 98.6 that was stored. NaN marks a missing value.
+        return {f: float('%.7g' % v) for f, v in zip(features, values.tolist()) if v == v}
+    return decode_legacy_symptoms(value)
+
+
+def decode_legacy_symptoms(text):
+    """Parse symptoms stored as JSON (app reports) or a Python dict repr (str() of a dict)
+
+    Text that is neither is returned unchanged, so one corrupt row
+    doesn't break every page that lists it.
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        # literal_eval only accepts literals, unlike the eval() it replaces
+        return ast.literal_eval(text)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return text
+
+
+def decode_matrix(values):
+    """Decode packed rows sharing one schema straight into a float32 matrix
+
+    Returns (disease_type, feature_names, matrix); missing values are NaN.
+    """
+    values = [bytes(v) for v in values]
+    if not values:
+        raise ValueError('No rows to decode')
+    schema_id, _ = _unpack(values[0])
+    disease_type, features = SCHEMAS[schema_id]
+
+    row_size = HEADER.size + _DTYPE.itemsize * len(features)
+    buffer = b''.join(values)
+    if len(buffer) != row_size * len(values):
+        raise ValueError('Rows do not share one schema')
+    rows = np.frombuffer(buffer, dtype=np.uint8).reshape(len(values), row_size)
+    if (rows[:, 1] != schema_id).any() or (rows[:, 0] != FORMAT_VERSION).any():
+        raise ValueError('Rows do not share one schema')
+    matrix = rows[:, HEADER.size:].copy().view(_DTYPE)
+    return disease_type, list(features), matrix
+
+
+def is_packed(value):
+    return isinstance(value, (bytes, bytearray, memoryview))
+
+
+def _unpack(data):
+    if len(data) < HEADER.size:
+        raise ValueError('Packed symptoms are truncated')
+    version, schema_id = HEADER.unpack_from(data)
+    if version != FORMAT_VERSION:
+        raise ValueError(f'Unsupported symptom format version {version}')
+    if schema_id not in SCHEMAS:
+        raise ValueError(f'Unknown symptom schema {schema_id}')
+    values = np.frombuffer(data, dtype=_DTYPE, offset=HEADER.size)
+    if len(values) != len(SCHEMAS[schema_id][1]):
+        raise ValueError('Packed symptoms do not match their schema')
+    return schema_id, values
@@ -0,0 +1,90 @@
+"""Train every disease model in parallel and write the artifacts to disk
+
+Run from the project root:
+    python -m models.training --workers 4 --models-dir saved_models
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from models.disease_predictor import DiseasePredictor, DISEASE_TYPES, disease_seed
+
+
+def train_disease(disease, models_dir, n_jobs=1, compile=False):
+    """Train and save one disease model; runs inside a worker process"""
+    start = time.perf_counter()
+    predictor = DiseasePredictor(models_dir=models_dir, result_cache_size=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor.train_model(disease, n_jobs=n_jobs)
+        if compile:
+            # Loading through the mmap backend compiles, checks and writes the tables
+            DiseasePredictor(models_dir=models_dir, backend='mmap', result_cache_size=0).get_model(disease)
+    info = predictor.model_info[disease]
+    return {
+        'disease': disease,
+        'seed': disease_seed(disease),
+        'train_seconds': info['train_seconds'],
+        'total_seconds': time.perf_counter() - start,
+        'content_hash': info.get('content_hash'),
+        'pid': os.getpid()
+    }
+
+
+def train_all(models_dir='saved_models', diseases=None, workers=None, n_jobs=1, compile=False):
+    """Fan per-disease training out over a process pool and return a timing report"""
+    diseases = list(diseases or DISEASE_TYPES)
+    workers = workers or min(len(diseases), os.cpu_count() or 1)
+    start = time.perf_counter()
+
+    results = []
+    if workers == 1:
+        for disease in diseases:
+            results.append(train_disease(disease, models_dir, n_jobs, compile))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(train_disease, disease, models_dir, n_jobs, compile) for disease in diseases]
+            for future in as_completed(futures):
+                results.append(future.result())
+
+    results.sort(key=lambda r: diseases.index(r['disease']))
+    return {
+        'models_dir': models_dir,
+        'workers': workers,
+        'wall_seconds': time.perf_counter() - start,
+        'serial_seconds': sum(r['total_seconds'] for r in results),
+        'diseases': results
+    }
+
+
+def print_report(report):
+    print(f"{'disease':16s} {'seed':>11s} {'train':>9s} {'total':>9s}  hash")
+    for r in report['diseases']:
+        content_hash = (r['content_hash'] or '-')[:12]
+        print(f"{r['disease']:16s} {r['seed']:11d} {r['train_seconds']:8.3f}s {r['total_seconds']:8.3f}s  {content_hash}")
+    print(f"Wall clock: {report['wall_seconds']:.3f}s with {report['workers']} worker(s) "
+          f"(sum of per-disease time {report['serial_seconds']:.3f}s)")
+    print(f"Artifacts written to {report['models_dir']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--models-dir', default='saved_models')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per disease, capped at CPU count)')
+    parser.add_argument('--n-jobs', type=int, default=1, help='threads per model while training')
+    parser.add_argument('--compile', action='store_true',
+                        help='also write the compiled tree tables served by the mmap backend')
+    parser.add_argument('diseases', nargs='*', help='diseases to train (default: all)')
+    args = parser.parse_args()
+
+    unknown = sorted(set(args.diseases) - set(DISEASE_TYPES))
+    if unknown:
+        parser.error(f"unknown disease(s): {', '.join(unknown)}; choose from {', '.join(DISEASE_TYPES)}")
+
+    print_report(train_all(args.models_dir, args.diseases, args.workers, args.n_jobs, args.compile))
+
+
+if __name__ == '__main__':
+    main()
@@ -94,17 +94,21 @@ const DiagnosAI = {
         }
     },
 
-    // Validate symptoms input
-    validateSymptoms(symptoms) {
+    // Validate symptoms input against the min/max the server renders on each field
+    validateSymptoms(symptoms, form = document) {
         const errors = [];
         
         for (const [symptom, value] of Object.entries(symptoms)) {
+            const field = form.querySelector(`[name="${symptom}"]`);
+            // Fields without bounds get the server's default 0-10 severity range
+            const min = field && field.min !== '' ? Number(field.min) : 0;
+            const max = field && field.max !== '' ? Number(field.max) : 10;
             if (value === '' || value === null || value === undefined) {
                 errors.push(`${symptom} is required`);
             } else if (isNaN(value)) {
                 errors.push(`${symptom} must be a number`);
-            } else if (value < 0 || value > 10) {
-                errors.push(`${symptom} must be between 0 and 10`);
+            } else if (value < min || value > max) {
+                errors.push(`${symptom} must be between ${min} and ${max}`);
             }
         }
         
@@ -0,0 +1,117 @@
+import contextlib
+import io
+
+import pytest
+
+from models import prediction_cache
+from models.disease_predictor import SCHEMAS, DiseasePredictor
+from models.model_cache import ModelCache
+from models.prediction_cache import PredictionCache
+
+
+def sized_loader(sizes):
+    loads = []
+
+    def loader(key):
+        loads.append(key)
+        return f'model-{key}', sizes.get(key, 1)
+    return loader, loads
+
+
+def test_model_cache_evicts_least_recently_used():
+    loader, loads = sized_loader({})
+    cache = ModelCache(loader, max_models=2)
+    cache.get('a')
+    cache.get('b')
+    cache.get('a')
+    cache.get('c')
+
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    assert cache.get('a') == 'model-a'
+    assert loads == ['a', 'b', 'c']
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (2, 3, 1)
+
+
+def test_model_cache_evicts_to_stay_within_byte_budget():
+    loader, _ = sized_loader({'a': 40, 'b': 40, 'c': 50})
+    cache = ModelCache(loader, max_bytes=100)
+    cache.get('a')
+    cache.get('b')
+    assert cache.total_bytes == 80
+
+    cache.get('c')
+    assert [key for key, _ in cache.items()] == ['b', 'c']
+    assert cache.total_bytes == 90
+
+    # A model larger than the whole budget still stays resident on its own
+    cache.put('huge', 'model-huge', 500)
+    assert [key for key, _ in cache.items()] == ['huge']
+    assert cache.total_bytes == 500
+
+
+def test_model_cache_put_replaces_size_and_invalidate_releases_it():
+    loader, _ = sized_loader({'a': 10})
+    cache = ModelCache(loader)
+    cache.get('a')
+    cache.put('a', 'new-a', 30)
+    assert cache.get('a') == 'new-a'
+    assert cache.total_bytes == 30
+
+    cache.invalidate('a')
+    assert 'a' not in cache
+    assert cache.total_bytes == 0
+
+
+def test_prediction_cache_expires_entries_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(prediction_cache.time, 'monotonic', lambda: now[0])
+    cache = PredictionCache(max_entries=10, ttl_seconds=5)
+    cache.put(('covid', 1, (1.0,)), {'risk_level': 'Low'})
+
+    now[0] += 4.9
+    assert cache.get(('covid', 1, (1.0,))) == {'risk_level': 'Low'}
+    now[0] += 0.1
+    assert cache.get(('covid', 1, (1.0,))) is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expirations'], stats['entries']) == (1, 1, 1, 0)
+
+
+def test_prediction_cache_bounds_entries_and_invalidates_by_disease():
+    cache = PredictionCache(max_entries=2, ttl_seconds=60)
+    cache.put(('covid', 1, (1.0,)), 'a')
+    cache.put(('covid', 1, (2.0,)), 'b')
+    cache.get(('covid', 1, (1.0,)))
+    cache.put(('diabetes', 1, (1.0,)), 'c')
+    assert cache.get(('covid', 1, (2.0,))) is None
+    assert cache.stats()['evictions'] == 1
+
+    cache.invalidate('covid')
+    assert cache.get(('covid', 1, (1.0,))) is None
+    assert cache.get(('diabetes', 1, (1.0,))) == 'c'
+    assert cache.stats()['invalidations'] == 1
+
+
+@pytest.fixture
+def predictor(tmp_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DiseasePredictor(models_dir=str(tmp_path), backend='sklearn')
+
+
+def test_reload_invalidates_cached_results(predictor):
+    row = SCHEMAS['covid'].new_row()
+    row[:] = 3
+    with contextlib.redirect_stdout(io.StringIO()):
+        first = predictor.predict_row('covid', row)
+        assert predictor.predict_row('covid', row) == first
+        assert predictor.result_cache_stats()['hits'] == 1
+
+        record = predictor.reload('covid')
+    assert record['outcome'] == 'success'
+    assert predictor.result_cache_stats()['entries'] == 0
+
+    # The next lookup is keyed on the new model version and runs the model again
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert predictor.predict_row('covid', row) == first
+    stats = predictor.result_cache_stats()
+    assert (stats['hits'], stats['misses'], stats['invalidations']) == (1, 2, 1)
@@ -0,0 +1,29 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from models.disease_predictor import DISEASE_TYPES, PARITY_TOLERANCE, DiseasePredictor
+from models.fast_inference import compile_model, parity_probes
+
+
+@pytest.fixture(scope='module')
+def predictor(tmp_path_factory):
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor = DiseasePredictor(models_dir=str(tmp_path_factory.mktemp('models')), backend='sklearn')
+        predictor.initialize_models()
+    return predictor
+
+
+@pytest.mark.parametrize('disease', DISEASE_TYPES)
+def test_compiled_predict_proba_matches_reference(predictor, disease):
+    model, scaler, _ = predictor._get_entry(disease)
+    compiled = compile_model(model, scaler)
+    # Every split threshold of the model, plus the whole/half-value grid the form submits
+    probes = parity_probes(compiled)
+    grid = np.arange(0, 10.5, 0.5)
+    probes = np.vstack([probes, np.repeat(grid[:, np.newaxis], compiled.n_features, axis=1)])
+
+    expected = model.predict_proba(scaler.transform(probes))
+    np.testing.assert_allclose(compiled.predict_proba(probes), expected, rtol=0, atol=PARITY_TOLERANCE)
@@ -0,0 +1,185 @@
+import contextlib
+import io
+import json
+import sqlite3
+from datetime import date, datetime
+
+import pytest
+
+from models import migrate_reports
+from models.diagnostic_report import DiagnosticReport
+from models.replay_reports import replay
+from models.report_writer import DeadLetterFile, WriteBehindWriter
+from models.storage import ReportStorage
+
+
+@pytest.fixture
+def reports(tmp_path, monkeypatch):
+    storage = ReportStorage(str(tmp_path / 'reports.db'))
+    monkeypatch.setattr(DiagnosticReport, 'storage', storage)
+    DiagnosticReport.create_table()
+    yield DiagnosticReport
+    storage.close()
+
+
+def make_report(user_id=1, disease_type='covid', risk_level='Low', confidence=50.0, timestamp=None, id=None):
+    return DiagnosticReport(id=id, user_id=user_id, disease_type=disease_type, symptoms={'fever': 38.0},
+                            prediction_result='COVID Negative', confidence=confidence, risk_level=risk_level,
+                            timestamp=timestamp or datetime(2024, 5, 1, 12, 0, 0))
+
+
+def test_get_page_walks_reports_sharing_a_timestamp(reports):
+    same = datetime(2024, 5, 1, 12, 0, 0)
+    reports.save_many([make_report(timestamp=same) for _ in range(7)])
+    make_report(timestamp=datetime(2024, 5, 2, 9, 0, 0)).save()
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = reports.get_page(limit=3, cursor=cursor, user_id=1)
+        seen.extend(report.id for report in page)
+        if cursor is None:
+            break
+
+    # The newer report first, then the tied ones by descending id, each exactly once
+    assert seen == [8, 7, 6, 5, 4, 3, 2, 1]
+
+
+def test_get_page_filters_and_rejects_bad_cursors(reports):
+    reports.save_many([make_report(user_id=1), make_report(user_id=2, risk_level='High'),
+                       make_report(user_id=1, timestamp=datetime(2024, 4, 30, 8, 0, 0))])
+
+    page, cursor = reports.get_page(limit=10, user_id=1, since=date(2024, 5, 1))
+    assert [report.id for report in page] == [1]
+    assert cursor is None
+    page, _ = reports.get_page(risk_level='High')
+    assert [report.user_id for report in page] == [2]
+    with pytest.raises(ValueError):
+        reports.get_page(cursor='not a cursor')
+
+
+def test_aggregates_follow_save_and_save_many(reports):
+    make_report(risk_level='High', confidence=80.0).save()
+    reports.save_many([
+        make_report(risk_level='Low', confidence=40.0),
+        make_report(risk_level='Low', confidence=60.0, timestamp=datetime(2024, 5, 2, 0, 30, 0)),
+        make_report(user_id=2, disease_type='diabetes', risk_level='Medium', confidence=55.0),
+    ])
+
+    summary = reports.summary(user_id=1)
+    assert summary['total'] == 3
+    assert summary['by_risk_level'] == {'High': 1, 'Low': 2}
+    assert summary['mean_confidence'] == 60.0
+    assert reports.summary()['by_disease']['diabetes'] == {'count': 1, 'mean_confidence': 55.0}
+
+    assert reports.daily_stats(user_id=1) == [
+        {'day': '2024-05-01', 'disease_type': 'covid', 'risk_level': 'High', 'count': 1, 'mean_confidence': 80.0},
+        {'day': '2024-05-01', 'disease_type': 'covid', 'risk_level': 'Low', 'count': 1, 'mean_confidence': 40.0},
+        {'day': '2024-05-02', 'disease_type': 'covid', 'risk_level': 'Low', 'count': 1, 'mean_confidence': 60.0},
+    ]
+    assert [row['day'] for row in reports.daily_stats(since='2024-05-02')] == ['2024-05-02']
+
+    # The incremental totals match a rebuild from the reports themselves
+    before = reports.summary(), reports.daily_stats()
+    reports.rebuild_stats()
+    assert (reports.summary(), reports.daily_stats()) == before
+
+
+def test_dead_lettered_reports_are_replayed_once(reports, tmp_path):
+    path = str(tmp_path / 'dead_letter.jsonl')
+
+    def failing_commit(items):
+        raise sqlite3.OperationalError('database is locked')
+
+    writer = WriteBehindWriter(failing_commit, retries=2, linger_ms=0,
+                               dead_letter=DeadLetterFile(path, DiagnosticReport.to_record))
+    with contextlib.redirect_stdout(io.StringIO()):
+        for report_id in (10, 11, 12):
+            writer.submit(make_report(id=report_id, confidence=float(report_id)))
+        writer.close()
+    assert writer.stats()['dead_lettered'] == 3
+
+    with open(path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [record['item']['id'] for record in records] == [10, 11, 12]
+    assert {record['error'] for record in records} == {'database is locked'}
+
+    reports.save_many([make_report(id=11, confidence=11.0)])
+    assert replay(path) == (2, 1)
+    assert replay(path) == (0, 3)
+    stored = reports.get_by_id(12)
+    assert (stored.confidence, stored.symptoms, stored.timestamp) == (12.0, {'fever': 38.0}, datetime(2024, 5, 1, 12, 0, 0))
+    assert reports.summary()['total'] == 3
+
+
+@pytest.fixture
+def legacy_source(tmp_path, monkeypatch):
+    path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute('''
+            CREATE TABLE diagnostic_reports (
+                id INTEGER PRIMARY KEY, disease_type TEXT, symptoms TEXT, prediction_result TEXT,
+                confidence REAL, risk_level TEXT, timestamp TEXT
+            )
+        ''')
+        conn.executemany('INSERT INTO diagnostic_reports VALUES (?, ?, ?, ?, ?, ?, ?)', [
+            (i, 'covid', json.dumps({'fever': 37.0 + i / 10}), 'COVID Negative', 50.0 + i, 'Low',
+             f'2024-01-0{i} 10:00:00.123456')
+            for i in range(1, 6)
+        ])
+    conn.close()
+    _, table, select_sql = migrate_reports.SOURCES['diagnostic_reports_legacy']
+    monkeypatch.setitem(migrate_reports.SOURCES, 'diagnostic_reports_legacy', (path, table, select_sql))
+    return 'diagnostic_reports_legacy'
+
+
+def test_migration_resumes_after_an_interrupted_chunk(reports, legacy_source, monkeypatch):
+    convert = migrate_reports._convert
+
+    def failing_convert(*fields):
+        if fields[-1].startswith('2024-01-04'):
+            raise RuntimeError('interrupted')
+        return convert(*fields)
+
+    monkeypatch.setattr(migrate_reports, '_convert', failing_convert)
+    with contextlib.redirect_stdout(io.StringIO()), pytest.raises(RuntimeError):
+        migrate_reports.migrate_source(legacy_source, chunk_size=2)
+    # The first chunk committed with its progress; the failed one left nothing behind
+    assert reports.count() == 2
+
+    monkeypatch.setattr(migrate_reports, '_convert', convert)
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = migrate_reports.migrate_source(legacy_source, chunk_size=2)
+        again = migrate_reports.migrate_source(legacy_source, chunk_size=2)
+    assert stats['copied'] == 3
+    assert again['copied'] == 0
+    assert reports.count() == 5
+
+    report = reports.get_page(limit=1)[0][0]
+    assert report.timestamp == datetime(2024, 1, 5, 10, 0, 0)
+    assert report.symptoms == {'fever': 37.5}
+    # Copied rows bypass save(), so main() rebuilds the aggregates afterwards
+    reports.rebuild_stats()
+    assert reports.summary()['total'] == 5
+
+
+def test_migration_renumbers_ids_already_taken(reports, legacy_source):
+    reports.save_many([make_report(id=2), make_report(id=4)])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = migrate_reports.migrate_source(legacy_source, keep_ids=True)
+    assert (stats['copied'], stats['renumbered']) == (5, 2)
+    assert reports.count() == 7
+    # Free ids are kept and the clashing rows get new ones past the largest id
+    assert reports.get_by_id(1).confidence == 51.0
+    assert reports.get_by_id(2).confidence == 50.0
+    assert sorted(report.confidence for report in reports.get_all() if report.id > 5) == [52.0, 54.0]
+
+
+def test_migration_renumbers_every_row_from_another_database(reports, legacy_source):
+    make_report(id=1).save()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = migrate_reports.migrate_source(legacy_source)
+    assert (stats['copied'], stats['renumbered']) == (5, 5)
+    assert sorted(report.id for report in reports.get_all()) == [1, 2, 3, 4, 5, 6]
@@ -0,0 +1,50 @@
+import math
+
+import pytest
+
+from models.schemas import FeatureSchema
+
+
+@pytest.fixture
+def schema():
+    return FeatureSchema('test', ['age', 'glucose', 'cough'], ['No', 'Yes'])
+
+
+def test_ranges_come_from_the_feature_table(schema):
+    assert schema.low == (0.0, 0.0, 0.0)
+    assert schema.high == (120.0, 1000.0, 10.0)
+
+
+@pytest.mark.parametrize('age', [0, 120, '0', '120.0', 64.5])
+def test_values_on_and_inside_the_bounds_are_accepted(schema, age):
+    row, errors = schema.parse({'age': age, 'glucose': 90, 'cough': 10})
+    assert errors == []
+    assert row.tolist() == [float(age), 90.0, 10.0]
+
+
+@pytest.mark.parametrize('age', [-0.1, 120.1, math.inf, -math.inf, math.nan, 'nan'])
+def test_values_outside_the_bounds_are_rejected(schema, age):
+    _, errors = schema.parse({'age': age})
+    assert [(error['field'], error['code']) for error in errors] == [('age', 'out_of_range')]
+    assert errors[0]['message'] == 'Age must be between 0 and 120'
+
+
+@pytest.mark.parametrize('age', ['old', [], {}])
+def test_non_numbers_are_rejected(schema, age):
+    _, errors = schema.parse({'age': age})
+    assert [(error['field'], error['code']) for error in errors] == [('age', 'invalid')]
+
+
+def test_missing_values_default_to_zero_unless_required(schema):
+    row, errors = schema.parse({'glucose': ''})
+    assert errors == []
+    assert row.tolist() == [0.0, 0.0, 0.0]
+
+    _, errors = schema.parse({'glucose': ''}, required=True)
+    assert [error['code'] for error in errors] == ['required'] * 3
+
+
+def test_every_rejected_field_is_reported(schema):
+    _, errors = schema.parse({'age': 200, 'glucose': 'high', 'cough': -1})
+    assert [(error['field'], error['code']) for error in errors] == [
+        ('age', 'out_of_range'), ('glucose', 'invalid'), ('cough', 'out_of_range')]
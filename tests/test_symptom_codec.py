@@ -0,0 +1,69 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from models.symptom_codec import SCHEMAS, decode_matrix, decode_symptoms, encode_symptoms, is_packed
+
+
+def test_packed_symptoms_round_trip():
+    symptoms = {'age': 54, 'blood_pressure': 128.5, 'glucose': 98.6, 'bmi': 31.2,
+                'pregnancies': 2, 'skin_thickness': 20, 'insulin': 85, 'diabetes_pedigree': 0.627}
+    packed = encode_symptoms('diabetes', symptoms)
+    assert is_packed(packed)
+    assert decode_symptoms(packed) == symptoms
+
+
+def test_missing_features_are_left_out_when_decoding():
+    packed = encode_symptoms('covid', {'fever': 38.5, 'cough': 4})
+    assert len(packed) == 2 + 4 * len(SCHEMAS[2][1])
+    assert decode_symptoms(packed) == {'fever': 38.5, 'cough': 4.0}
+
+
+def test_keys_outside_the_schema_are_kept_as_json_text():
+    symptoms = {'fever': 38.5, 'rash': 2}
+    encoded = encode_symptoms('covid', symptoms)
+    assert not is_packed(encoded)
+    assert decode_symptoms(encoded) == symptoms
+
+
+def test_diseases_without_a_schema_are_stored_as_json_text():
+    encoded = encode_symptoms('measles', {'rash': 7})
+    assert json.loads(encoded) == {'rash': 7}
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('{"fever": 38.5, "cough": 4}', {'fever': 38.5, 'cough': 4}),
+    ("{'fever': 38.5, 'cough': 4}", {'fever': 38.5, 'cough': 4}),
+    ('', {}),
+    (None, {}),
+])
+def test_legacy_text_is_decoded(text, expected):
+    assert decode_symptoms(text) == expected
+
+
+@pytest.mark.parametrize('text', ["{'fever': 38.5, 'cough'", '__import__("os")', '{"fever": }', '[' * 200])
+def test_corrupt_legacy_text_is_returned_unchanged(text):
+    assert decode_symptoms(text) == text
+
+
+def test_malformed_packed_rows_raise():
+    with pytest.raises(ValueError):
+        decode_symptoms(b'\x01')
+    with pytest.raises(ValueError):
+        decode_symptoms(b'\x09\x01' + b'\x00' * 32)
+    with pytest.raises(ValueError):
+        decode_symptoms(encode_symptoms('covid', {'fever': 1})[:-4])
+
+
+def test_decode_matrix_reads_rows_of_one_schema():
+    rows = [encode_symptoms('covid', {'fever': 37.0 + i, 'cough': i}) for i in range(3)]
+    disease_type, features, matrix = decode_matrix(rows)
+    assert disease_type == 'covid'
+    assert features == list(SCHEMAS[2][1])
+    np.testing.assert_array_equal(matrix[:, features.index('fever')], [37.0, 38.0, 39.0])
+    assert math.isnan(matrix[0, features.index('fatigue')])
+
+    with pytest.raises(ValueError):
+        decode_matrix(rows + [encode_symptoms('pneumonia', {'fever': 37.0})])